@@ -1,6 +1,23 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
-from muggle.core.sdk import SDK
-from muggle.core.api.main import serve
+import importlib
 
-__all__ = ['SDK', 'serve']
\ No newline at end of file
+__all__ = ['SDK', 'serve']
+
+# 按需导入: 仅使用 SDK 时不会加载服务端 (fastapi/gradio) 相关模块
+_lazy = {
+    'SDK': 'muggle.core.sdk',
+    'serve': 'muggle.core.api.main',
+}
+
+
+def __getattr__(name):
+    if name in _lazy:
+        value = getattr(importlib.import_module(_lazy[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy))
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import argparse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='muggle', description='MUGGLE command line tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    from muggle.bench import suite
+    bench_parser = suite.add_arguments(commands.add_parser('bench', help='SDK micro-benchmarks and HTTP load test'))
+    bench_parser.set_defaults(func=suite.run)
+
+    from muggle.bench import startup
+    profile_parser = startup.add_arguments(commands.add_parser('profile', help='startup phases and import-time breakdown'))
+    profile_parser.set_defaults(func=startup.run)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import json
+import time
+import random
+import atexit
+import threading
+import collections
+from muggle.config import sys_args
+from muggle.entity import LogEntity
+from muggle.logger import logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class AccessLog:
+    """
+    访问日志: 请求线程只将一个元组放入队列, 由后台线程批量格式化后写入文件 (按大小轮转, 可选 JSON Lines) 并输出到控制台;
+    成功请求按 access_log_sample 采样 (失败请求由 ServerException 直接记录, 不受影响), 队列满时丢弃并计数
+    """
+
+    def __init__(self):
+        self.queue = collections.deque()
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+        self.fd = None
+        self.inode = None
+        self.dropped = 0
+        self.written = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.after_fork)
+        atexit.register(self.close)
+
+    @property
+    def path(self) -> str:
+        return sys_args.get('access_log_file')
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path or sys_args.get('access_log_console'))
+
+    def record(self, api_type, ip, ua, project_name, consume, predictions, title=None, cached=False):
+        sample = sys_args.get('access_log_sample')
+        if sample is not None and sample < 1 and random.random() >= sample:
+            return
+        if self.pid is None:
+            if not self.enabled:
+                return
+            with self.lock:
+                self.ensure_started()
+        if len(self.queue) >= sys_args.get('access_log_queue'):
+            self.dropped += 1
+            return
+        self.queue.append((time.time(), api_type, ip, ua, project_name, consume, predictions, title, cached))
+
+    def after_fork(self):
+        # 子进程中父进程的写线程已不存在, 待写记录也已由父进程负责
+        self.queue = collections.deque()
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+        self.fd = None
+        self.inode = None
+
+    def ensure_started(self):
+        if self.pid is not None:
+            return
+        self.pid = os.getpid()
+        threading.Thread(target=self.flush_loop, name="access-log", daemon=True).start()
+
+    def flush_loop(self):
+        pid = os.getpid()
+        interval = float(sys_args.get('access_log_flush_interval') or 0.2)
+        while self.pid == pid:
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+            self.flush()
+
+    @classmethod
+    def text_line(cls, item) -> str:
+        ts, api_type, ip, ua, project_name, consume, predictions, title, cached = item
+        log_entity = LogEntity(api_type=api_type, ip=ip, ua=ua, project_name=project_name, title=title)
+        log_entity.consume = consume
+        log_entity.predictions = predictions
+        return log_entity.log_text
+
+    @classmethod
+    def json_line(cls, item) -> str:
+        ts, api_type, ip, ua, project_name, consume, predictions, title, cached = item
+        return json.dumps({
+            "time": round(ts, 3),
+            "api": api_type.value if api_type else None,
+            "ip": ip,
+            "ua": ua or None,
+            "project": project_name,
+            "consume": round(consume, 2),
+            "data": predictions[0],
+            "score": predictions[1],
+            "title": (title if isinstance(title, str) else str(title))[:100] if title else None,
+            "cached": cached,
+        }, ensure_ascii=False, default=str)
+
+    @classmethod
+    def timestamp(cls, ts) -> str:
+        return f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}.{int(ts * 1000) % 1000:03d}"
+
+    def flush(self):
+        items = []
+        try:
+            while True:
+                items.append(self.queue.popleft())
+        except IndexError:
+            pass
+        if not items:
+            return
+        with self.write_lock:
+            try:
+                texts = [self.text_line(_) for _ in items]
+                if sys_args.get('access_log_console'):
+                    for text in texts:
+                        logger.info(text)
+                if self.path:
+                    if sys_args.get('access_log_format') == 'json':
+                        lines = [self.json_line(_) for _ in items]
+                    else:
+                        lines = [f"{self.timestamp(item[0])} | {text}" for item, text in zip(items, texts)]
+                    self.write(("\n".join(lines) + "\n").encode("utf8"))
+                self.written += len(items)
+            except Exception as e:
+                logger.warning(f"访问日志写入失败 [{e}]")
+
+    def open(self):
+        if self.fd is not None:
+            os.close(self.fd)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.inode = os.fstat(self.fd).st_ino
+
+    def write(self, data: bytes):
+        """ 多个工作进程以 O_APPEND 写同一文件, 每批一次 write; 其他进程轮转后按 inode 变化重新打开 """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        if self.fd is None or stat is None or stat.st_ino != self.inode:
+            self.open()
+        elif sys_args.get('access_log_max_bytes') and stat.st_size + len(data) > sys_args['access_log_max_bytes']:
+            self.rotate(len(data))
+            self.open()
+        os.write(self.fd, data)
+
+    def rotate(self, incoming: int):
+        lock_path = f"{self.path}.lock"
+        with open(lock_path, "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # 持锁后再次检查, 其他进程可能已经完成轮转
+                if os.stat(self.path).st_size + incoming <= sys_args['access_log_max_bytes']:
+                    return
+                backups = int(sys_args.get('access_log_backups') or 0)
+                for i in range(backups - 1, 0, -1):
+                    if os.path.exists(f"{self.path}.{i}"):
+                        os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+                if backups > 0:
+                    os.replace(self.path, f"{self.path}.1")
+                else:
+                    os.remove(self.path)
+            except OSError:
+                pass
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        if self.pid != os.getpid():
+            return
+        self.flush()
+        with self.write_lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+    def stats(self) -> dict:
+        return {"queued": len(self.queue), "written": self.written, "dropped": self.dropped}
+
+
+access_log = AccessLog()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import time
+import argparse
+import tempfile
+import PIL.Image
+import numpy as np
+from muggle.engine.model import ModelEntity, ONNXRuntimeEngine
+from muggle.engine.components.preprocess import ProcessUtils
+from muggle.bench.workspace import require_onnx, save_model
+
+# (名称, 批次大小, 最小宽度, 最大宽度, width_buckets)
+CASES = [
+    ("b8_narrow", 8, 100, 180, [96, 128, 160, 192]),
+    ("b32_narrow", 32, 100, 180, [96, 128, 160, 192]),
+    ("b32_wide", 32, 80, 400, [96, 128, 160, 192, 256, 320, 384, 448]),
+    ("b32_step32", 32, 80, 400, 32),
+]
+
+
+def conv_ctc_model(path, num_classes, rng, height=64, channels=32):
+    """ 比压测工作区的 CTC 模型多两层卷积, 使推理耗时随输入宽度增长, 接近真实模型 """
+    onnx = require_onnx()
+    helper, numpy_helper, TensorProto = onnx.helper, onnx.numpy_helper, onnx.TensorProto
+    weight = lambda *shape: numpy_helper.from_array((rng.normal(size=shape) * 0.1).astype(np.float32))
+    initializers = [weight(channels, 3, 3, 3), weight(channels, channels, 3, 3), weight(channels, num_classes)]
+    for tensor, name in zip(initializers, ['conv1', 'conv2', 'weight']):
+        tensor.name = name
+    save_model(
+        [
+            helper.make_node('Conv', ['input', 'conv1'], ['x1'], pads=[1, 1, 1, 1], strides=[2, 1]),
+            helper.make_node('Relu', ['x1'], ['r1']),
+            helper.make_node('Conv', ['r1', 'conv2'], ['x2'], pads=[1, 1, 1, 1], strides=[2, 1]),
+            helper.make_node('Relu', ['x2'], ['r2']),
+            helper.make_node('ReduceMean', ['r2'], ['pooled'], axes=[2], keepdims=0),
+            helper.make_node('Transpose', ['pooled'], ['sequence'], perm=[0, 2, 1]),
+            helper.make_node('MatMul', ['sequence', 'weight'], ['output']),
+        ],
+        [helper.make_tensor_value_info('input', TensorProto.FLOAT, ['batch', 3, height, 'width'])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, ['batch', 'width', num_classes])],
+        initializers,
+        path
+    )
+
+
+def make_images(n, min_width, max_width, rng):
+    """ 高度固定为 60 的变宽验证码样本 """
+    widths = rng.integers(min_width, max_width + 1, n)
+    return [PIL.Image.fromarray(rng.integers(0, 256, (60, int(w), 3), dtype=np.uint8)) for w in widths]
+
+
+def make_utils(model_bytes, width_buckets=None) -> ProcessUtils:
+    runtime_engine = ONNXRuntimeEngine(model_bytes, cacheable=False)
+    if width_buckets:
+        runtime_engine.enable_width_buckets(width_buckets)
+    return ProcessUtils(ModelEntity(cfg={"pad_value": 255}, model_runtime=runtime_engine))
+
+
+def measure(fn, rounds):
+    fn(rounds[0])
+    st = time.perf_counter()
+    for images in rounds:
+        fn(images)
+    return (time.perf_counter() - st) * 1000 / len(rounds)
+
+
+def bench(repeat=30, seed=0):
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "model.onnx")
+        conv_ctc_model(path, 63, rng)
+        with open(path, "rb") as f:
+            model_bytes = f.read()
+    results = []
+    for name, batch_size, min_width, max_width, width_buckets in CASES:
+        # 每轮宽度分布不同, 模拟线上流量不断出现新的输入尺寸
+        rounds = [make_images(batch_size, min_width, max_width, rng) for _ in range(repeat)]
+        plain, bucketed = make_utils(model_bytes), make_utils(model_bytes, width_buckets)
+        run = plain.runtime_engine.run
+
+        def per_image(images):
+            return [run(plain.std_load_func(_)[np.newaxis])[0][0] for _ in images]
+
+        def pad_max(images):
+            return list(run(plain.batch_load_func(images))[0])
+
+        def bucket(images):
+            return bucketed.bucket_predict(images, lambda x: list(bucketed.runtime_engine.run(x)[0]))
+
+        per_image_ms = measure(per_image, rounds)
+        pad_max_ms = measure(pad_max, rounds)
+        bucket_ms = measure(bucket, rounds)
+        widths = [[plain.load_shape(_)[2] for _ in images] for images in rounds]
+        pad_max_waste = np.mean([1 - sum(w) / (max(w) * len(w)) for w in widths])
+        stats = bucketed.width_buckets.stats
+        results.append({
+            "case": name,
+            "per_image_ms": round(per_image_ms, 3),
+            "pad_max_ms": round(pad_max_ms, 3),
+            "bucket_ms": round(bucket_ms, 3),
+            "speedup_vs_pad_max": round(pad_max_ms / bucket_ms, 2),
+            "pad_max_waste": round(float(pad_max_waste), 3),
+            "bucket_waste": round(stats["padding_waste"]["avg"], 3),
+            "pad_max_shapes": len({max(w) for w in widths}),
+            "bucket_shapes": len(stats["buckets"]),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='dynamic-width batching benchmark (per image vs pad to max vs width buckets)')
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for result in bench(args.repeat, args.seed):
+        print(" | ".join(f"{k}: {v}" for k, v in result.items()))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import time
+import random
+import pkgutil
+import argparse
+from typing import List, Set
+from muggle.engine.components.corpus import CorpusIndex
+
+
+def load_builtin() -> List[str]:
+    raw_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "corpus", "builtin.dict")
+    if os.path.exists(raw_path):
+        return open(raw_path, "r", encoding="utf8").read().splitlines(False)[::-1]
+    return pkgutil.get_data("muggle.corpus", "builtin.dict").decode("utf8").splitlines(False)[::-1]
+
+
+def linear_scan(lines: List[str], dictionary: List[Set[str]], target: Set[str]) -> str:
+    result = (-1, "")
+    for index, i in enumerate(dictionary):
+        score = len(target & i) / len(target | i)
+        if score > result[0]:
+            result = (score, lines[index])
+    return result[1]
+
+
+def make_queries(lines: List[str], num: int, seed: int) -> List[Set[str]]:
+    rng = random.Random(seed)
+    alphabet = sorted({char for line in lines for char in line})
+    queries = []
+    for line in rng.sample(lines, num):
+        chars = list(line)
+        rng.shuffle(chars)
+        if rng.random() < 0.5:
+            chars[rng.randrange(len(chars))] = rng.choice(alphabet)
+        queries.append(set(chars))
+    return queries
+
+
+def bench(num_queries=500, seed=0):
+    lines = load_builtin()
+    dictionary = [set(i) for i in lines]
+
+    st = time.perf_counter()
+    index = CorpusIndex(lines)
+    build_ms = (time.perf_counter() - st) * 1000
+    queries = make_queries(lines, num_queries, seed)
+
+    st = time.perf_counter()
+    expected = [linear_scan(lines, dictionary, q) for q in queries]
+    scan_ms = (time.perf_counter() - st) * 1000 / num_queries
+
+    st = time.perf_counter()
+    actual = [index.best(q) for q in queries]
+    index_ms = (time.perf_counter() - st) * 1000 / num_queries
+
+    mismatch = sum(a != b for a, b in zip(expected, actual))
+    return {
+        "lines": len(lines),
+        "unique_lines": len(index.lines),
+        "build_ms": round(build_ms, 2),
+        "scan_ms_per_query": round(scan_ms, 4),
+        "index_ms_per_query": round(index_ms, 4),
+        "speedup": round(scan_ms / index_ms, 2) if index_ms else None,
+        "mismatch": mismatch,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Corpus word order benchmark (linear scan vs CorpusIndex)')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for k, v in bench(args.queries, args.seed).items():
+        print(f"{k:>20}: {v}")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import numpy as np
+from muggle.engine.base import BaseEngine
+
+
+class BenchCTCEngine(BaseEngine):
+    """ 压测工作区使用的 CTC 引擎: 输出 (N, W, C), 按宽度分桶后由 ProcessUtils.ctc_decode 逐桶整批解码 """
+
+    def postprocess(self, outputs):
+        return self.utils.ctc_decode(outputs)
+
+    def predict(self, image):
+        return self.postprocess(self.runtime_engine.run(self.utils.std_load_func(image)[np.newaxis])[0])[0]
+
+    def batch_outputs(self, images):
+        return self.runtime_engine.run(self.utils.batch_load_func(images))[0]
+
+    def batch_predict(self, images):
+        return self.utils.bucket_predict(images, lambda x: self.postprocess(self.runtime_engine.run(x)[0]))
+
+
+class BenchClsEngine(BaseEngine):
+    """ 压测工作区使用的分类引擎: 输出 (N, C) """
+
+    def postprocess(self, outputs):
+        return [(self.model_entity.categories[int(outputs.argmax())], 1.0)]
+
+    def predict(self, image):
+        return self.postprocess(self.runtime_engine.run(self.utils.std_load_func(image)[np.newaxis])[0][0])
+
+    def classify(self, batch, need_title=None):
+        predictions = [self.postprocess(_) for _ in self.runtime_engine.run(batch)[0]]
+        if need_title:
+            return need_title, predictions
+        return predictions
+
+    def batch_predict(self, images, need_title=None, order_func=None):
+        return self.classify(self.utils.batch_load_func(images), need_title)
+
+    def batch_predict_rois(self, image, boxes, need_title=None, order_func=None):
+        return self.classify(self.utils.roi_load_func(image, boxes), need_title)
+
+
+class BenchDetEngine(BaseEngine):
+    """ 压测工作区使用的检测引擎: 输出 [x1, y1, x2, y2, label, score] """
+
+    def predict(self, image):
+        outputs = self.runtime_engine.run(self.utils.std_load_func(image)[np.newaxis])[0]
+        return [list(map(float, box)) for box in outputs]
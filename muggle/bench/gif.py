@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import io
+import time
+import argparse
+import PIL.Image
+import PIL.ImageSequence
+import numpy as np
+from muggle.gif import GifDecoder
+
+# (名称, 图片尺寸, 帧数, 需要的帧)
+CASES = [
+    ("4f_all", (160, 60), 4, None),
+    ("8f_need3", (160, 60), 8, [1, 2, 3]),
+    ("16f_need3", (160, 60), 16, [2, 5, 8]),
+    ("16f_all", (160, 60), 16, None),
+    ("30f_need1", (200, 80), 30, [0]),
+]
+
+
+def legacy_gif_loader(im):
+    """ 改造前的 GIF 解码实现, 仅作对照 """
+    p = im.getpalette()
+    last_frame = im.convert('RGBA')
+    all_frames = []
+    try:
+        for frame in PIL.ImageSequence.Iterator(im):
+            if not frame.getpalette() and p:
+                frame.putpalette(p)
+            new_frame = PIL.Image.new('RGBA', frame.size)
+            if frame.tile and frame.tile[0][1][2:] != frame.size:
+                new_frame.paste(last_frame)
+            new_frame.paste(frame, (0, 0), frame.convert('RGBA'))
+            all_frames.append(new_frame)
+            last_frame = new_frame
+    except:
+        all_frames = [frame.convert("RGB") for frame in PIL.ImageSequence.Iterator(im)]
+    return all_frames
+
+
+def make_gif(size, n_frames, seed) -> bytes:
+    """ 生成多帧验证码样本: 固定噪声背景, 每帧在不同位置绘制若干字符色块 (部分帧只更新局部区域) """
+    rng = np.random.default_rng(seed)
+    w, h = size
+    background = rng.integers(160, 256, (h, w, 3), dtype=np.uint8)
+    frames = []
+    for i in range(n_frames):
+        arr = background.copy()
+        for _ in range(4):
+            x, y = int(rng.integers(0, w - 20)), int(rng.integers(0, h - 24))
+            arr[y: y + 24, x: x + 16] = rng.integers(0, 120, 3, dtype=np.uint8)
+        frames.append(PIL.Image.fromarray(arr).quantize(64))
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:], duration=100, loop=0, optimize=True)
+    return buffer.getvalue()
+
+
+def measure(fn, repeat):
+    fn()
+    st = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - st) * 1000 / repeat
+
+
+def bench(repeat=200, seed=0):
+    results = []
+    for name, size, n_frames, need_frames in CASES:
+        gif_bytes = make_gif(size, n_frames, seed)
+        indices = need_frames if need_frames is not None else list(range(n_frames))
+
+        def legacy_path():
+            frames = legacy_gif_loader(PIL.Image.open(io.BytesIO(gif_bytes)))
+            return [np.asarray(frames[i].convert("RGB")) for i in indices]
+
+        def decoder_path():
+            return GifDecoder.decode(PIL.Image.open(io.BytesIO(gif_bytes)), need_frames)
+
+        expected, actual = legacy_path(), decoder_path()
+        legacy_ms = measure(legacy_path, repeat)
+        decoder_ms = measure(decoder_path, repeat)
+        results.append({
+            "case": name,
+            "size_kb": round(len(gif_bytes) / 1024, 1),
+            "legacy_ms": round(legacy_ms, 4),
+            "decoder_ms": round(decoder_ms, 4),
+            "speedup": round(legacy_ms / decoder_ms, 2),
+            "identical": all(np.array_equal(a, b) for a, b in zip(expected, actual)),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GIF frame decoding benchmark (legacy loader vs GifDecoder)')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for result in bench(args.repeat, args.seed):
+        print(" | ".join(f"{k}: {v}" for k, v in result.items()))
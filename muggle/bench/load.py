@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import json
+import time
+import yaml
+import base64
+import argparse
+import threading
+import http.client
+import urllib.parse
+from collections import Counter
+from muggle.bench.stats import summarize
+
+
+def request_mix(workspace, projects=None, api="invoke") -> list:
+    """
+    由各项目 demo 目录构造请求: 每张 image.* 图片对应一条, 文本标题取 project_cfg.yaml 中 titles 的第一个
+    返回 [(project_name, path, headers, body)]
+    """
+    mix = []
+    projects_dir = os.path.join(workspace, "projects")
+    for project_name in sorted(os.listdir(projects_dir)):
+        demo_dir = os.path.join(projects_dir, project_name, "demo")
+        if (projects and project_name not in projects) or not os.path.isdir(demo_dir):
+            continue
+        with open(os.path.join(projects_dir, project_name, "project_cfg.yaml"), "r", encoding="utf8") as f:
+            titles = (yaml.safe_load(f) or {}).get('titles') or []
+        title = None
+        if titles and titles[0]['type'] not in ['image', 'images']:
+            value = titles[0]['value']
+            title = list(value.keys())[0] if isinstance(value, dict) else value
+        for filename in sorted(os.listdir(demo_dir)):
+            if not filename.startswith("image."):
+                continue
+            with open(os.path.join(demo_dir, filename), "rb") as f:
+                image_bytes = f.read()
+            if api == "raw":
+                query = urllib.parse.urlencode({"project_name": project_name, **({"title": title} if title else {})})
+                mix.append((
+                    project_name, f"/runtime/text/raw_invoke?{query}",
+                    {"Content-Type": "application/octet-stream"}, image_bytes
+                ))
+            else:
+                body = {"project_name": project_name, "image": base64.b64encode(image_bytes).decode()}
+                if title:
+                    body["title"] = title
+                mix.append((
+                    project_name, "/runtime/text/invoke",
+                    {"Content-Type": "application/json"}, json.dumps(body, ensure_ascii=False).encode("utf8")
+                ))
+    return mix
+
+
+def wait_ready(url, timeout=120.0, process=None) -> bool:
+    """ 轮询 /runtime/ready 直至预热完成 """
+    parsed = urllib.parse.urlsplit(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=5)
+            conn.request("GET", "/runtime/ready")
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+class LoadGenerator:
+    """
+    固定并发的闭环压测: 每个线程持有一个 keep-alive 连接, 轮流发送请求组合中的请求;
+    达到请求总数或持续时间 (二者先到为准) 后停止
+    """
+
+    def __init__(self, url, mix, concurrency=8, requests=1000, duration=None, timeout=30.0):
+        if not mix:
+            raise ValueError("请求组合为空, 请检查 projects/*/demo 目录下是否有 image.* 样例图片")
+        parsed = urllib.parse.urlsplit(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.mix = mix
+        self.concurrency = max(int(concurrency), 1)
+        self.requests = requests
+        self.duration = duration
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.issued = 0
+        self.latencies = {}
+        self.status = Counter()
+        self.errors = Counter()
+
+    def next_index(self):
+        with self.lock:
+            if self.requests and self.issued >= self.requests:
+                return None
+            self.issued += 1
+            return self.issued - 1
+
+    def worker(self, deadline):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        latencies = {}
+        status, errors = Counter(), Counter()
+        while (not deadline or time.perf_counter() < deadline) and (index := self.next_index()) is not None:
+            project_name, path, headers, body = self.mix[index % len(self.mix)]
+            st = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+                latency = (time.perf_counter() - st) * 1000
+                status[response.status] += 1
+                if response.status != 200 or not json.loads(payload).get("success"):
+                    errors[project_name] += 1
+                    continue
+                latencies.setdefault(project_name, []).append(latency)
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                status[type(e).__name__] += 1
+                errors[project_name] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        conn.close()
+        with self.lock:
+            for project_name, values in latencies.items():
+                self.latencies.setdefault(project_name, []).extend(values)
+            self.status.update(status)
+            self.errors.update(errors)
+
+    def run(self) -> dict:
+        st = time.perf_counter()
+        deadline = st + self.duration if self.duration else None
+        threads = [threading.Thread(target=self.worker, args=(deadline,), daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - st
+        all_latencies = [_ for values in self.latencies.values() for _ in values]
+        return {
+            "concurrency": self.concurrency,
+            "requests": self.issued,
+            "errors": sum(self.errors.values()),
+            "status": {str(k): v for k, v in self.status.items()},
+            "total": summarize(all_latencies, elapsed),
+            "projects": {
+                project_name: {**summarize(values, elapsed), "errors": self.errors.get(project_name, 0)}
+                for project_name, values in sorted(self.latencies.items())
+            },
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HTTP load generator built from projects/*/demo images')
+    parser.add_argument('--url', type=str, default="http://127.0.0.1:19199")
+    parser.add_argument('--workspace', type=str, default=".")
+    parser.add_argument('--projects', type=str, nargs='+', default=None)
+    parser.add_argument('--api', type=str, choices=['invoke', 'raw'], default='invoke')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=None)
+    args = parser.parse_args()
+    generator = LoadGenerator(
+        args.url, request_mix(args.workspace, args.projects, args.api), args.concurrency, args.requests, args.duration
+    )
+    print(json.dumps(generator.run(), ensure_ascii=False))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from muggle.bench.stats import summarize
+from muggle.bench.sdk import demo_inputs
+
+
+def run_concurrent(fn, requests, concurrency):
+    def timed(_):
+        t = time.perf_counter()
+        fn()
+        return (time.perf_counter() - t) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(concurrency)))
+        st = time.perf_counter()
+        latencies = list(pool.map(timed, range(requests)))
+    return latencies, time.perf_counter() - st
+
+
+def bench_project(project_name, requests, concurrency, workers=1) -> dict:
+    """ 同一项目分别以逐请求顺序执行与流水线模式 (每阶段 workers 个线程) 执行, 并发数相同 """
+    from muggle.core.sdk import SDK
+    from muggle.engine.session import ProjectSession, project_entities
+    from muggle.engine.components.pipeline import Pipeline
+
+    project_entity = project_entities.get(project_name)
+    image, title = demo_inputs(project_entity)
+    enabled, stage_workers = project_entity.cfg.get('pipeline'), project_entity.cfg.get('pipeline_workers')
+    result = {}
+    try:
+        for mode, flag in [("sequential", False), ("pipeline", True)]:
+            project_entity.cfg['pipeline'], project_entity.cfg['pipeline_workers'] = flag, workers
+            ProjectSession.invalidate(project_name)
+            SDK.invalidate(project_name)
+            logic = SDK.get(project_name)
+            result[mode] = summarize(*run_concurrent(lambda: logic.execute(image, title=title), requests, concurrency))
+            if flag:
+                result[mode]["stages"] = Pipeline.stats().get(project_name, {})
+    finally:
+        project_entity.cfg['pipeline'], project_entity.cfg['pipeline_workers'] = enabled, stage_workers
+        ProjectSession.invalidate(project_name)
+        SDK.invalidate(project_name)
+    result["speedup"] = round(result["pipeline"]["images_per_sec"] / result["sequential"]["images_per_sec"], 2)
+    return result
+
+
+def bench(projects=None, requests=400, concurrency=8, workers=1) -> dict:
+    """ 在当前工作目录 (projects/ 所在目录) 下对多模型项目对比流水线模式的吞吐与延迟 """
+    from muggle.engine.session import project_entities
+
+    results = {}
+    for project_name, project_entity in project_entities.all.items():
+        if projects and project_name not in projects:
+            continue
+        if len(project_entity.models) < 2 or not project_entity.input_images:
+            continue
+        results[project_name] = bench_project(project_name, requests, concurrency, workers)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='multi-model project throughput, sequential vs per-model concurrency limited stages')
+    parser.add_argument('--projects', type=str, nargs='+', default=None)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', type=str, default=None)
+    args = parser.parse_args()
+    report = json.dumps(bench(args.projects, args.requests, args.concurrency, args.workers), ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(report)
+    else:
+        print(report)
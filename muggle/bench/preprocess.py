@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import time
+import argparse
+import tracemalloc
+import cv2
+import PIL.Image
+import numpy as np
+from muggle.engine.model import ModelEntity
+from muggle.engine.components.preprocess import ProcessUtils
+
+# (名称, 图片尺寸, 图片模式, 模型输入, to_rgb)
+CASES = [
+    ("ctc_rgb", (160, 60), "RGB", (1, 3, 64, "w"), False),
+    ("ctc_rgba", (160, 60), "RGBA", (1, 3, 64, "w"), False),
+    ("cls_rgb", (120, 120), "RGB", (1, 3, 64, 64), True),
+    ("det_rgb", (344, 384), "RGB", (1, 3, 416, 416), False),
+    ("ctc_gray", (160, 60), "L", (1, 1, 64, "w"), False),
+]
+
+
+def legacy_std_load_func(utils: ProcessUtils, input_image, input_shape):
+    """ 改造前的预处理实现, 仅作对照 """
+    to_rgb = utils.model_cfg.get("to_rgb", False)
+    resize_shape = utils.resize_shape(input_image, input_shape[2:][::-1])
+    im = input_image.resize(resize_shape, resample=PIL.Image.BILINEAR)
+    if im.mode in ['P', 'L'] and not to_rgb and input_shape[1] == 3:
+        im = im.convert("RGB")
+    im = np.asarray(im)
+    shape = im.shape
+    if len(shape) > 2 and shape[2] == 4:
+        b, g, r, a = cv2.split(im)
+        mask = (a == 0)
+        b[mask] = 255
+        g[mask] = 255
+        r[mask] = 255
+        im = cv2.merge((b, g, r))
+    if to_rgb and len(shape) > 2:
+        im = cv2.cvtColor(im, cv2.COLOR_BGR2RGB)
+    elif to_rgb and len(shape) == 2:
+        im = cv2.cvtColor(im, cv2.COLOR_GRAY2RGB)
+    shape = im.shape
+    if input_shape[1] == 1 and len(shape) == 3:
+        im = cv2.cvtColor(im, cv2.COLOR_RGB2GRAY)
+        im = im[:, :] / 255.
+    elif input_shape[1] == 1 and len(shape) == 2:
+        im = im[np.newaxis, :, :]
+    elif input_shape[1] == 3 and len(shape) == 3:
+        im = utils.normalize(im, [0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    return np.array(im, dtype=np.float32)[:, :, :]
+
+
+def make_image(size, mode, seed):
+    rng = np.random.default_rng(seed)
+    w, h = size
+    channels = {"RGB": 3, "RGBA": 4, "L": 1}[mode]
+    arr = rng.integers(0, 256, (h, w, channels), dtype=np.uint8)
+    if mode == "RGBA":
+        arr[:, : w // 4, 3] = 0
+    return PIL.Image.fromarray(arr[:, :, 0] if channels == 1 else arr, mode)
+
+
+def measure(fn, repeat):
+    fn()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    st = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - st) * 1000 / repeat, peak
+
+
+def bench(repeat=300, seed=0):
+    results = []
+    for name, size, mode, input_shape, to_rgb in CASES:
+        utils = ProcessUtils(ModelEntity(cfg={"to_rgb": to_rgb}))
+        image = make_image(size, mode, seed)
+        channel, h, w = utils.load_shape(image, input_shape)
+        out = np.empty((channel, h, w), dtype=np.float32)
+
+        expected = legacy_std_load_func(utils, image, input_shape)
+        actual = utils.std_load_func(image, input_shape, out=out)
+        legacy_ms, legacy_peak = measure(lambda: legacy_std_load_func(utils, image, input_shape), repeat)
+        fused_ms, fused_peak = measure(lambda: utils.std_load_func(image, input_shape, out=out), repeat)
+        results.append({
+            "case": name,
+            "legacy_ms": round(legacy_ms, 4),
+            "fused_ms": round(fused_ms, 4),
+            "speedup": round(legacy_ms / fused_ms, 2),
+            "legacy_peak_kb": round(legacy_peak / 1024, 1),
+            "fused_peak_kb": round(fused_peak / 1024, 1),
+            "max_abs_diff": float(np.abs(expected - actual).max()),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='std_load_func benchmark (legacy vs fused float32)')
+    parser.add_argument('--repeat', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for result in bench(args.repeat, args.seed):
+        print(" | ".join(f"{k}: {v}" for k, v in result.items()))
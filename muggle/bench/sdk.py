@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import json
+import time
+import argparse
+import PIL.Image
+from muggle.bench.stats import summarize
+from muggle.utils import Core
+
+
+def demo_inputs(project_entity):
+    """ 与 SDK.warm_up 一致: 取 demo 目录下的第一张图片及配置中的第一个标题 """
+    title = None
+    if project_entity.titles:
+        item = project_entity.titles[0]
+        if item['type'] not in ['image', 'images']:
+            title = list(item['value'].keys())[0] if isinstance(item['value'], dict) else item['value']
+        else:
+            title = [PIL.Image.open(_) for _ in project_entity.title_images]
+            title = title[0] if len(title) == 1 else title
+    with open(project_entity.input_images[0], "rb") as f:
+        image = Core.bytes2entity(f.read()).pil
+    return image, title
+
+
+def measure(fn, repeat, warmup):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    st = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t) * 1000)
+    return latencies, time.perf_counter() - st
+
+
+def bench_project(project_name, repeat, warmup, batch_size):
+    from muggle.core.sdk import SDK
+    from muggle.engine.base import BaseEngine
+    from muggle.engine.session import ProjectSession, project_entities
+
+    image, title = demo_inputs(project_entities.get(project_name))
+    logic = SDK.get(project_name)
+    result = {"project": summarize(*measure(lambda: logic.execute(image, title=title), repeat, warmup)), "models": {}}
+    for model_key, engine in ProjectSession.get(project_name).engine.items():
+        model = {"type": type(engine).__name__}
+        try:
+            model["predict"] = summarize(*measure(lambda: engine.predict(image), repeat, warmup))
+            if batch_size > 1 and type(engine).batch_predict is not BaseEngine.batch_predict:
+                images = [image] * batch_size
+                latencies, elapsed = measure(lambda: engine.batch_predict(images), max(repeat // batch_size, 1), 1)
+                model["batch_predict"] = {
+                    "batch_size": batch_size, **summarize(latencies, elapsed, len(latencies) * batch_size)
+                }
+        except Exception as e:
+            # 部分引擎 (如相似度) 不接受单张图片输入, 仅记录而不中断其余项目
+            model["error"] = f"{type(e).__name__}: {e}"
+        result["models"][model_key] = model
+    return result
+
+
+def bench(projects=None, repeat=200, warmup=10, batch_size=8) -> dict:
+    """ 在当前工作目录 (projects/ 所在目录) 下对每个项目及其模型做 SDK 级基准测试 """
+    from muggle.engine.session import project_entities
+
+    results = {}
+    for project_name, project_entity in project_entities.all.items():
+        if projects and project_name not in projects:
+            continue
+        if not project_entity.input_images:
+            results[project_name] = {"error": "demo 目录下缺少 image.* 样例图片"}
+            continue
+        results[project_name] = bench_project(project_name, repeat, warmup, batch_size)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SDK micro-benchmarks per project and model')
+    parser.add_argument('--projects', type=str, nargs='+', default=None)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--output', type=str, default=None)
+    args = parser.parse_args()
+    report = json.dumps(bench(args.projects, args.repeat, args.warmup, args.batch_size), ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(report)
+    else:
+        print(report)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import sys
+import json
+import subprocess
+from collections import Counter
+from muggle.bench.suite import child_env
+
+TARGETS = {
+    'sdk': "from muggle import SDK",
+    'server': "import muggle.core.api.fastapi_app",
+}
+
+# 在子进程中依次计时: 导入 SDK / 加载项目 / 导入服务端应用, 结果以 JSON 打印到标准输出
+PHASES_CODE = """
+import sys, json, time
+server, sys.argv = '--server' in sys.argv, sys.argv[:1]
+timings = {}
+st = time.perf_counter()
+from muggle import SDK
+timings['import_sdk'] = time.perf_counter() - st
+st = time.perf_counter()
+from muggle.engine.session import model_manager, project_entities
+model_manager.load()
+timings['load_projects'] = time.perf_counter() - st
+if server:
+    st = time.perf_counter()
+    import muggle.core.api.fastapi_app
+    timings['import_server'] = time.perf_counter() - st
+print(json.dumps({
+    "phases": {k: round(v * 1000, 2) for k, v in timings.items()},
+    "projects": list(project_entities.all),
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """ 解析 -X importtime 输出: [(模块名, 自身耗时 us, 累计耗时 us, 嵌套深度)] """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def run_importtime(workspace, target) -> list:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", TARGETS[target]],
+        cwd=workspace, env=child_env(), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 [{target}] 失败: {result.stderr.strip().splitlines()[-1:]}")
+    return parse_importtime(result.stderr)
+
+
+def run_phases(workspace, target) -> dict:
+    cmd = [sys.executable, "-c", PHASES_CODE] + (["--server"] if target == 'server' else [])
+    result = subprocess.run(cmd, cwd=workspace, env=child_env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"启动阶段计时失败: {result.stderr.strip().splitlines()[-1:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def breakdown(entries, top=20) -> dict:
+    packages = Counter()
+    for name, self_us, _, _ in entries:
+        packages[name.split(".")[0]] += self_us
+    total = sum(_[1] for _ in entries)
+    to_ms = lambda x: round(x / 1000, 2)
+    return {
+        "total_ms": to_ms(total),
+        "modules": len(entries),
+        "packages": [{"package": k, "self_ms": to_ms(v)} for k, v in packages.most_common(top)],
+        "self": [
+            {"module": name, "self_ms": to_ms(self_us), "cumulative_ms": to_ms(cumulative_us)}
+            for name, self_us, cumulative_us, _ in sorted(entries, key=lambda x: x[1], reverse=True)[:top]
+        ],
+        "cumulative": [
+            {"module": name, "self_ms": to_ms(self_us), "cumulative_ms": to_ms(cumulative_us)}
+            for name, self_us, cumulative_us, _ in sorted(entries, key=lambda x: x[2], reverse=True)[:top]
+        ],
+    }
+
+
+def table(rows, columns) -> str:
+    widths = [max([len(column)] + [len(str(row[column])) for row in rows]) for column in columns]
+    lines = ["  ".join(column.ljust(width) for column, width in zip(columns, widths))]
+    lines += ["  ".join(str(row[column]).ljust(width) for column, width in zip(columns, widths)) for row in rows]
+    return "\n".join(lines)
+
+
+def render(report) -> str:
+    sections = [
+        "phases (ms): " + ", ".join(f"{k}={v}" for k, v in report["phases"].items()),
+        f"projects: {', '.join(report['projects']) or '-'}",
+        f"imports [{report['target']}]: {report['imports']['modules']} modules, {report['imports']['total_ms']} ms",
+        "\n[by package]\n" + table(report["imports"]["packages"], ["package", "self_ms"]),
+        "\n[by self]\n" + table(report["imports"]["self"], ["module", "self_ms", "cumulative_ms"]),
+        "\n[by cumulative]\n" + table(report["imports"]["cumulative"], ["module", "self_ms", "cumulative_ms"]),
+    ]
+    return "\n".join(sections)
+
+
+def run(args) -> dict:
+    workspace = os.path.abspath(args.workspace)
+    report = {
+        "target": args.target,
+        **run_phases(workspace, args.target),
+        "imports": breakdown(run_importtime(workspace, args.target), top=args.top),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2) if args.json else render(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return report
+
+
+def add_arguments(parser):
+    parser.add_argument('--workspace', type=str, default=".", help='directory containing projects/ (default .)')
+    parser.add_argument('--target', type=str, choices=list(TARGETS), default='server')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='print JSON instead of tables')
+    parser.add_argument('--output', type=str, default=None)
+    return parser
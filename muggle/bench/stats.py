@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+
+
+def summarize(latencies_ms, elapsed: float, images: int = None) -> dict:
+    """
+    latencies_ms: 每次调用耗时 (毫秒), elapsed: 总墙钟时间 (秒), images: 处理的图片总数 (默认等于调用次数)
+    """
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    images = len(latencies) if images is None else images
+    result = {"count": int(len(latencies)), "elapsed_s": round(elapsed, 4)}
+    if len(latencies):
+        result.update({f"p{p}_ms": round(float(np.percentile(latencies, p)), 4) for p in PERCENTILES})
+        result.update({
+            "mean_ms": round(float(latencies.mean()), 4),
+            "min_ms": round(float(latencies.min()), 4),
+            "max_ms": round(float(latencies.max()), 4),
+        })
+    result["images_per_sec"] = round(images / elapsed, 2) if elapsed > 0 else None
+    return result
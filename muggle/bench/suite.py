@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import platform
+import tempfile
+import subprocess
+import importlib.util
+import muggle
+from muggle.logger import logger
+from muggle.bench.load import LoadGenerator, request_mix, wait_ready
+
+package_parent = os.path.dirname(os.path.dirname(os.path.abspath(muggle.__file__)))
+
+
+def child_env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_parent, env.get('PYTHONPATH')]))
+    return env
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=package_parent, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def meta() -> dict:
+    import numpy
+    import onnxruntime
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "system": platform.platform(),
+        "numpy": numpy.__version__,
+        "onnxruntime": onnxruntime.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_sdk(workspace, args) -> dict:
+    """ 项目在导入时从当前目录加载, 因此在工作区目录下以子进程运行 """
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        output = f.name
+    cmd = [
+        sys.executable, "-m", "muggle.bench.sdk", "--output", output,
+        "--repeat", str(args.repeat), "--warmup", str(args.warmup), "--batch_size", str(args.batch_size)
+    ]
+    if args.projects:
+        cmd += ["--projects", *args.projects]
+    try:
+        subprocess.run(cmd, cwd=workspace, env=child_env(), check=True)
+        with open(output, "r", encoding="utf8") as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def start_server(workspace, port, workers):
+    # 未安装 gunicorn (如 Windows) 时退化为单进程 uvicorn
+    if importlib.util.find_spec("gunicorn") and platform.system() != 'Windows':
+        code = "from muggle import serve; serve()"
+    else:
+        code = (
+            "import uvicorn; from muggle.core.api.fastapi_app import app, cli_args; "
+            "uvicorn.run(app, host='127.0.0.1', port=cli_args.port, log_level='warning')"
+        )
+    cmd = [sys.executable, "-c", code, "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    return subprocess.Popen(cmd, cwd=workspace, env=child_env())
+
+
+def stop_server(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def run_http(workspace, args) -> dict:
+    mix = request_mix(workspace, args.projects, args.api)
+    process, url = None, args.url
+    if not url:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        process = start_server(workspace, port, args.workers)
+    try:
+        if not wait_ready(url, timeout=args.ready_timeout, process=process):
+            raise RuntimeError(f"服务 [{url}] 未能在 {args.ready_timeout} 秒内就绪")
+        result = LoadGenerator(url, mix, args.concurrency, args.requests, args.duration).run()
+        result.update({"url": url, "api": args.api, "workers": args.workers if process else None})
+        return result
+    finally:
+        if process:
+            stop_server(process)
+
+
+def run(args) -> dict:
+    workspace = args.workspace
+    if args.synthetic:
+        from muggle.bench.workspace import build_workspace
+        workspace = build_workspace(tempfile.mkdtemp(prefix="muggle-bench-"), seed=args.seed)
+        logger.info(f"已生成离线压测工作区 [{workspace}]")
+    workspace = os.path.abspath(workspace)
+    report = {"meta": {**meta(), "workspace": None if args.synthetic else workspace, "synthetic": args.synthetic}}
+    try:
+        if args.suite in ('all', 'sdk'):
+            report["sdk"] = run_sdk(workspace, args)
+        if args.suite in ('all', 'http'):
+            report["http"] = run_http(workspace, args)
+    finally:
+        if args.synthetic and not args.keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(text)
+        logger.info(f"压测结果已写入 [{args.output}]")
+    else:
+        print(text)
+    return report
+
+
+def add_arguments(parser):
+    parser.add_argument('--synthetic', action='store_true', help='generate an offline workspace with random ONNX models')
+    parser.add_argument('--workspace', type=str, default=".", help='directory containing projects/ (default .)')
+    parser.add_argument('--keep', action='store_true', help='keep the generated synthetic workspace')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--suite', type=str, choices=['all', 'sdk', 'http'], default='all')
+    parser.add_argument('--projects', type=str, nargs='+', default=None)
+    parser.add_argument('--output', type=str, default=None, help='write JSON results to this file')
+    # SDK
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--batch_size', type=int, default=8)
+    # HTTP
+    parser.add_argument('--url', type=str, default=None, help='benchmark a running server instead of starting one')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--api', type=str, choices=['invoke', 'raw'], default='invoke')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=None, help='seconds, stops at whichever of requests/duration comes first')
+    parser.add_argument('--ready_timeout', type=float, default=120)
+    return parser
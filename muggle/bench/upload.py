@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import io
+import re
+import json
+import time
+import base64
+import hashlib
+import argparse
+import PIL.Image
+import numpy as np
+from muggle.utils import Core
+from muggle.entity import RequestBody, ImageEntity
+
+SIZES_KB = [10, 30, 50]
+
+
+def legacy_text2image(source: str) -> ImageEntity:
+    """ 改造前的 base64 解码实现, 仅作对照 """
+    filter_base64 = lambda _: re.sub("data:image/.+?base64,", "", _, 1) if ',' in _ else _
+    b64_text = filter_base64(source)
+    img_bytes = base64.b64decode(filter_base64(b64_text))
+    md5 = hashlib.md5(img_bytes).hexdigest()
+    with io.BytesIO(img_bytes) as data_stream:
+        image = PIL.Image.open(data_stream)
+        image = Core.image_progress(image)
+        return ImageEntity(raw_bytes=img_bytes, pil=image.copy(), hash=md5)
+
+
+def make_image(size_kb, seed) -> bytes:
+    """ 生成约 size_kb 大小的 PNG 验证码样本: 平滑背景叠加随机噪声, 逐步加宽直至达到目标大小 """
+    rng = np.random.default_rng(seed)
+    width, height = 60, 60
+    while True:
+        bg = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+        arr = np.clip(bg + rng.normal(0, 40, (height, width, 3)), 0, 255).astype(np.uint8)
+        buffer = io.BytesIO()
+        PIL.Image.fromarray(arr, "RGB").save(buffer, format="PNG")
+        if buffer.tell() >= size_kb * 1024:
+            return buffer.getvalue()
+        width += 10
+
+
+def measure(fn, repeat):
+    fn()
+    st = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - st) * 1000 / repeat
+
+
+def bench(repeat=500, seed=0):
+    results = []
+    for size_kb in SIZES_KB:
+        img_bytes = make_image(size_kb, seed)
+        # base64 接口需要先解析 JSON 请求体, 二进制接口直接拿到请求字节
+        payload = json.dumps({"project_name": "demo", "image": base64.b64encode(img_bytes).decode()}).encode()
+
+        def legacy_path():
+            legacy_text2image(RequestBody(**json.loads(payload)).image).pil.load()
+
+        def base64_path():
+            Core.text2image(RequestBody(**json.loads(payload)).image).pil
+
+        def raw_path():
+            Core.bytes2entity(img_bytes).pil
+
+        legacy_ms = measure(legacy_path, repeat)
+        base64_ms = measure(base64_path, repeat)
+        raw_ms = measure(raw_path, repeat)
+        results.append({
+            "size_kb": round(len(img_bytes) / 1024, 1),
+            "payload_kb": round(len(payload) / 1024, 1),
+            "legacy_cpu_ms": round(legacy_ms, 4),
+            "base64_cpu_ms": round(base64_ms, 4),
+            "raw_cpu_ms": round(raw_ms, 4),
+            "raw_speedup": round(legacy_ms / raw_ms, 2),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='per-request decode CPU: base64 invoke vs raw bytes upload')
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for result in bench(args.repeat, args.seed):
+        print(" | ".join(f"{k}: {v}" for k, v in result.items()))
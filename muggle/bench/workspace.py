@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import yaml
+import PIL.Image
+import PIL.ImageDraw
+import numpy as np
+
+ENGINE_MODULE = "from muggle.bench.engines import *\n"
+STARTUP_PARAM = {"enabled_module": [], "warm_up": True}
+
+
+def require_onnx():
+    try:
+        import onnx
+        return onnx
+    except ImportError:
+        raise ModuleNotFoundError("生成压测模型需要安装 onnx: pip install onnx")
+
+
+def save_model(nodes, inputs, outputs, initializers, path):
+    onnx = require_onnx()
+    helper = onnx.helper
+    graph = helper.make_graph(nodes, os.path.basename(os.path.dirname(path)), inputs, outputs, initializers)
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 7
+    onnx.save(model, path)
+
+
+def ctc_model(path, num_classes, rng, height=64):
+    """ (N, 3, H, W) -> 沿高度求均值 -> (N, W, 3) x (3, C) -> (N, W, C) """
+    onnx = require_onnx()
+    helper, numpy_helper, TensorProto = onnx.helper, onnx.numpy_helper, onnx.TensorProto
+    save_model(
+        [
+            helper.make_node('ReduceMean', ['input'], ['pooled'], axes=[2], keepdims=0),
+            helper.make_node('Transpose', ['pooled'], ['sequence'], perm=[0, 2, 1]),
+            helper.make_node('MatMul', ['sequence', 'weight'], ['output']),
+        ],
+        [helper.make_tensor_value_info('input', TensorProto.FLOAT, ['batch', 3, height, 'width'])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, ['batch', 'width', num_classes])],
+        [numpy_helper.from_array(rng.normal(size=(3, num_classes)).astype(np.float32), 'weight')],
+        path
+    )
+
+
+def cls_model(path, num_classes, rng, size=64):
+    """ (N, 3, S, S) -> 全局均值 -> (N, 3) x (3, C) -> (N, C) """
+    onnx = require_onnx()
+    helper, numpy_helper, TensorProto = onnx.helper, onnx.numpy_helper, onnx.TensorProto
+    save_model(
+        [
+            helper.make_node('ReduceMean', ['input'], ['pooled'], axes=[2, 3], keepdims=0),
+            helper.make_node('MatMul', ['pooled', 'weight'], ['output']),
+        ],
+        [helper.make_tensor_value_info('input', TensorProto.FLOAT, ['batch', 3, size, size])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, ['batch', num_classes])],
+        [numpy_helper.from_array(rng.normal(size=(3, num_classes)).astype(np.float32), 'weight')],
+        path
+    )
+
+
+def det_model(path, rng, size=160, num_boxes=4):
+    """ 固定输出 num_boxes 个互不重叠的框, 输入只参与一次均值计算以保留真实的预处理与推理开销 """
+    onnx = require_onnx()
+    helper, numpy_helper, TensorProto = onnx.helper, onnx.numpy_helper, onnx.TensorProto
+    step = size // num_boxes
+    boxes = np.array([
+        [i * step + 4, 10, (i + 1) * step - 4, 10 + step - 8, 0, round(0.9 - i * 0.05, 2)] for i in range(num_boxes)
+    ], dtype=np.float32)
+    save_model(
+        [
+            helper.make_node('ReduceMean', ['input'], ['pooled'], keepdims=0),
+            helper.make_node('Mul', ['pooled', 'zero'], ['offset']),
+            helper.make_node('Add', ['boxes', 'offset'], ['output']),
+        ],
+        [helper.make_tensor_value_info('input', TensorProto.FLOAT, [1, 3, size, size])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, [num_boxes, 6])],
+        [numpy_helper.from_array(boxes, 'boxes'), numpy_helper.from_array(np.zeros((), np.float32), 'zero')],
+        path
+    )
+
+
+def demo_image(path, size, text, rng):
+    background = tuple(int(_) for _ in rng.integers(200, 256, 3))
+    image = PIL.Image.new('RGB', size, background)
+    draw = PIL.ImageDraw.Draw(image)
+    for i, char in enumerate(text):
+        draw.text((6 + i * (size[0] - 12) // max(len(text), 1), size[1] // 3), char, fill=(0, 0, 0))
+    for _ in range(8):
+        x1, y1, x2, y2 = (int(rng.integers(0, size[0])), int(rng.integers(0, size[1])),
+                          int(rng.integers(0, size[0])), int(rng.integers(0, size[1])))
+        draw.line((x1, y1, x2, y2), fill=tuple(int(_) for _ in rng.integers(0, 200, 3)))
+    image.save(path)
+
+
+def project(root, name, strategy, models, image_size, rng, extra=None):
+    project_dir = os.path.join(root, "projects", name)
+    os.makedirs(os.path.join(project_dir, "demo"), exist_ok=True)
+    cfg = {"title": name, "strategy": strategy, "outputs": "text", "models": {k: k for k in models}}
+    cfg.update(extra or {})
+    with open(os.path.join(project_dir, "project_cfg.yaml"), "w", encoding="utf8") as f:
+        yaml.safe_dump(cfg, f, allow_unicode=True)
+    for model_key, (model_cfg, build) in models.items():
+        model_dir = os.path.join(project_dir, "models", model_key)
+        os.makedirs(model_dir, exist_ok=True)
+        with open(os.path.join(model_dir, "model.yaml"), "w", encoding="utf8") as f:
+            yaml.safe_dump(model_cfg, f, allow_unicode=True)
+        build(os.path.join(model_dir, "model.onnx"))
+    demo_image(os.path.join(project_dir, "demo", "image.png"), image_size, "ab12", rng)
+
+
+def build_workspace(root: str, seed: int = 0) -> str:
+    """
+    生成离线压测工作区: 随机权重的 ONNX 模型 (CTC / 分类 / 点选) 及各自的 demo 图片, 不依赖任何真实项目
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(root, "ext", "engine"), exist_ok=True)
+    with open(os.path.join(root, "ext", "engine", "bench.py"), "w", encoding="utf8") as f:
+        f.write(ENGINE_MODULE)
+    with open(os.path.join(root, "startup_param.yaml"), "w", encoding="utf8") as f:
+        yaml.safe_dump(STARTUP_PARAM, f)
+    project(root, "bench_ctc", "CTCLogic", {
+        "ctc": ({"type": "BenchCTCEngine", "categories": "AlphaNumeric"}, lambda p: ctc_model(p, 63, rng)),
+    }, (160, 60), rng)
+    project(root, "bench_cls", "ClsLogic", {
+        "cls": ({"type": "BenchClsEngine", "categories": "AlphaNumeric"}, lambda p: cls_model(p, 63, rng)),
+    }, (64, 64), rng)
+    project(root, "bench_click", "ClickByTextTitleLogic", {
+        "det": ({"type": "BenchDetEngine"}, lambda p: det_model(p, rng)),
+        "cls": ({"type": "BenchClsEngine", "categories": "Chinese3755"}, lambda p: cls_model(p, 3756, rng)),
+    }, (160, 160), rng, extra={"titles": [{"type": "text", "value": "一二"}]})
+    return root
@@ -1,30 +1,71 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
 import string
+from functools import lru_cache
+from collections.abc import Mapping
 
 BLANK_TOKEN = ['_']
 OBJECT = ['DefaultObject']
-CHINESE_2W = sorted([chr(i) for i in range(ord(u'\u4e00'), ord(u'\u9fa5'))])
-CHINESE_3755 = sorted([
-        _.decode("gb2312") for _ in
-        [bytearray.fromhex('%x %x' % (c+0xa0, p+0xa0)) for c in range(16, 56) for p in range(1, 95)][:-5]
-])
 ALPHA = list(string.ascii_lowercase + string.ascii_uppercase)
 NUMERIC = list(string.digits)
 PUNCTUATION = [',', '，', '.', '。', '"', "'", "“", "”", '‘', '’', '~', '-', '_', '@', '!', '#', '￥', '$', '%', '……', '^', '&', '*', '(', ')', '[', ']', '{', '}', "|", '<', '>', '?', ':', ';', '`', '=', '+', '/', '\\', '【', '】', '《', '》']
 OPERATIONAL_SYMBOL = ['(', ')', '+', '-', '×', '÷', '=', '?']
 
 
-CATEGORIES_MAP = {
-    'Chinese2W': BLANK_TOKEN + CHINESE_2W,
-    'Chinese3755': BLANK_TOKEN + CHINESE_3755,
-    'Numeric': BLANK_TOKEN + NUMERIC,
-    'Alphabet': BLANK_TOKEN + ALPHA,
-    'AlphaNumeric': BLANK_TOKEN + NUMERIC + ALPHA,
-    'AlphaNumericLower': BLANK_TOKEN + NUMERIC + ALPHA[:len(ALPHA)//2],
-    'NumericOperators': BLANK_TOKEN + NUMERIC + OPERATIONAL_SYMBOL,
-    'AlphaNumericOperators': BLANK_TOKEN + NUMERIC + ALPHA + OPERATIONAL_SYMBOL,
-    'AlphaPunctuation': BLANK_TOKEN + ALPHA + PUNCTUATION,
-    'OCR': BLANK_TOKEN + NUMERIC + ALPHA + CHINESE_2W + PUNCTUATION,
-    'DefaultObject': OBJECT
-}
\ No newline at end of file
+@lru_cache(maxsize=None)
+def chinese_2w():
+    return sorted([chr(i) for i in range(ord(u'\u4e00'), ord(u'\u9fa5'))])
+
+
+@lru_cache(maxsize=None)
+def chinese_3755():
+    return sorted([
+        _.decode("gb2312") for _ in
+        [bytearray.fromhex('%x %x' % (c+0xa0, p+0xa0)) for c in range(16, 56) for p in range(1, 95)][:-5]
+    ])
+
+
+class Categories(Mapping):
+    """ 内置字符集在首次使用时才生成 (中文字表构造较慢), 之后缓存 """
+
+    builders = {
+        'Chinese2W': lambda: BLANK_TOKEN + chinese_2w(),
+        'Chinese3755': lambda: BLANK_TOKEN + chinese_3755(),
+        'Numeric': lambda: BLANK_TOKEN + NUMERIC,
+        'Alphabet': lambda: BLANK_TOKEN + ALPHA,
+        'AlphaNumeric': lambda: BLANK_TOKEN + NUMERIC + ALPHA,
+        'AlphaNumericLower': lambda: BLANK_TOKEN + NUMERIC + ALPHA[:len(ALPHA)//2],
+        'NumericOperators': lambda: BLANK_TOKEN + NUMERIC + OPERATIONAL_SYMBOL,
+        'AlphaNumericOperators': lambda: BLANK_TOKEN + NUMERIC + ALPHA + OPERATIONAL_SYMBOL,
+        'AlphaPunctuation': lambda: BLANK_TOKEN + ALPHA + PUNCTUATION,
+        'OCR': lambda: BLANK_TOKEN + NUMERIC + ALPHA + chinese_2w() + PUNCTUATION,
+        'DefaultObject': lambda: OBJECT
+    }
+
+    def __init__(self):
+        self.cache = {}
+
+    def __getitem__(self, name):
+        if name not in self.cache:
+            self.cache[name] = self.builders[name]()
+        return self.cache[name]
+
+    def __contains__(self, name):
+        return name in self.builders
+
+    def __iter__(self):
+        return iter(self.builders)
+
+    def __len__(self):
+        return len(self.builders)
+
+
+CATEGORIES_MAP = Categories()
+
+
+def __getattr__(name):
+    if name == 'CHINESE_2W':
+        return chinese_2w()
+    if name == 'CHINESE_3755':
+        return chinese_3755()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,7 +3,6 @@ import os
 import sys
 import argparse
 import platform
-import onnxruntime
 import multiprocessing
 import muggle
 import yaml
@@ -30,7 +29,46 @@ sys_args = {
     "encryption_key": "@~-X(193)!",
     "dirty_data": False,
     "warm_up": True,
-    "admin": ""
+    "admin": "",
+    "executor": "thread",
+    "executor_workers": None,
+    "executor_queue": 64,
+    "overload_code": 503,
+    "preload": False,
+    "session_options": {},
+    "optimized_cache_dir": ".cache/optimized",
+    "batch_invoke_limit": 512,
+    "stream_inflight": None,
+    "stream_line_limit": 16 * 1024 * 1024,
+    "warm_up_workers": None,
+    "warm_up_rounds": 3,
+    "warm_up_max_shapes": 8,
+    "warm_up_shapes_file": ".cache/warmup/shapes.json",
+    "metrics": True,
+    "metrics_dir": ".cache/metrics",
+    "metrics_flush_interval": 10,
+    "access_log_file": "logs/access.log",
+    "access_log_format": "text",
+    "access_log_console": True,
+    "access_log_sample": 1.0,
+    "access_log_queue": 10000,
+    "access_log_flush_interval": 0.2,
+    "access_log_max_bytes": 100 * 1024 * 1024,
+    "access_log_backups": 5,
+    "admin_token": None,
+    "runtime_state_dir": ".cache/runtime",
+    "runtime_sync_interval": 2,
+    "lazy_load": False,
+    "memory_budget": None,
+    "prefetch_projects": 8,
+    "prefetch_interval": 60,
+    "cache_backend": "file",
+    "cache_url": "redis://127.0.0.1:6379/0",
+    "cache_size": 100000,
+    "cache_ttl": 7 * 24 * 3600,
+    "cache_dir": ".cache/results",
+    "cache_segment_bytes": 4 * 1024 * 1024,
+    "cache_max_segments": 64,
 }
 # print(STARTUP_PARAM)
 STARTUP_PARAM_FILE = "startup_param.yaml"
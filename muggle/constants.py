@@ -2,13 +2,17 @@
 # -*- coding:utf-8 -*-
 
 import os
-import psutil
 import muggle
 import webbrowser
 from muggle.logger import logger
 from muggle.config import SYSTEM, BLACKLIST_FILE, sys_args
 from muggle.utils import Core, Exp
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 
 app_dir = os.path.dirname(muggle.__file__)
 
@@ -24,13 +28,17 @@ def description():
     logger.info(
         f'当前启用模块 | {" | ".join(modules_enabled)} |'
     )
-    memory_usage = memory_info()
     logger.info(
         f'当前操作系统 {SYSTEM}, '
         f'工作进程: {sys_args["workers"]}, '
         f'工作线程: {sys_args["threads"]}, '
-        f'内存占用: {int(memory_usage)} MB'
+        f'内存占用: {memory_usage()}'
     )
+    if sys_args.get('preload'):
+        from muggle.engine.session import model_manager
+        shared_store = model_manager.runtime_manager.shared_store
+        shared = shared_store.nbytes / 1024 ** 2 if shared_store is not None else 0
+        logger.info(f'预加载模式: 共享模型 {shared:.1f}MB, 各工作进程 fork 前后的内存占用见 [Worker-<pid>] 日志')
     if 'Docs' in modules_enabled:
         logger.info(f'调用文档 http://127.0.0.1:{sys_args["port"]}/runtime/{doc_tag}/guide\n')
     if SYSTEM == 'Windows':
@@ -55,11 +63,41 @@ def check_runtime():
             logger.info('运行时安装完成')
 
 
+def memory_stats() -> dict:
+    """ 当前进程的 RSS 与 USS (字节); 没有 psutil 时读取 /proc/self/status 的 RSS 与私有匿名页 (RssAnon, 不含共享模型) """
+    if psutil is not None:
+        process = psutil.Process()
+        try:
+            info = process.memory_full_info()
+            return {"rss": info.rss, "uss": info.uss}
+        except Exception:
+            return {"rss": process.memory_info().rss}
+    stats = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon"):
+                    stats["rss" if key == "VmRSS" else "anon"] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return stats
+
+
+def memory_usage() -> str:
+    stats = memory_stats()
+    if not stats.get("rss"):
+        return "-"
+    text = f"RSS {stats['rss'] / 1024 ** 2:.1f}MB"
+    if stats.get("uss") is not None:
+        text += f" / USS {stats['uss'] / 1024 ** 2:.1f}MB"
+    elif stats.get("anon") is not None:
+        text += f" / Anon {stats['anon'] / 1024 ** 2:.1f}MB"
+    return text
+
+
 def memory_info():
-    process = psutil.Process()
-    memory = process.memory_info().rss
-    memory_mb = memory / 1024 / 1024
-    return memory_mb
+    return (memory_stats().get("rss") or 0) / 1024 / 1024
 
 
 if SYSTEM == 'Windows' and sys_args['title']:
@@ -35,6 +35,23 @@ cli_parser.add_argument('--title', type=str, default=sys_args.get('title'))
 cli_parser.add_argument('--doc_tag', type=str, default=sys_args.get('doc_tag'))
 cli_parser.add_argument('--admin', type=str, default=sys_args.get('admin'))
 cli_parser.add_argument('--preview_prompt', type=str, default=sys_args.get('preview_prompt'))
+cli_parser.add_argument(
+    '--executor', type=str, choices=['thread', 'process'], default=sys_args.get('executor'),
+    help='Inference executor mode (default thread)'
+)
+cli_parser.add_argument(
+    '--executor_workers', type=int, default=sys_args.get('executor_workers'),
+    help='Inference executor workers (default --threads)'
+)
+cli_parser.add_argument(
+    '--executor_queue', type=int, default=sys_args.get('executor_queue'),
+    help='Max queued requests per worker before overload response (default 64)'
+)
+cli_parser.add_argument('--overload_code', type=int, default=sys_args.get('overload_code'))
+cli_parser.add_argument(
+    '--preload', action='store_true', default=sys_args.get('preload'),
+    help='Load models once in the master and share weights with forked workers (Linux/macOS only)'
+)
 
 cli_args = cli_parser.parse_args()
 
@@ -47,4 +64,11 @@ sys_args.update(
     doc_tag=cli_args.doc_tag,
     admin=cli_args.admin,
     preview_prompt=cli_args.preview_prompt,
+    workers=cli_args.workers,
+    threads=cli_args.threads,
+    executor=cli_args.executor,
+    executor_workers=cli_args.executor_workers,
+    executor_queue=cli_args.executor_queue,
+    overload_code=cli_args.overload_code,
+    preload=cli_args.preload,
 )
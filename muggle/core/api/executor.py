@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import asyncio
+import threading
+import multiprocessing
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Executor
+from muggle.logger import logger
+from muggle.config import SYSTEM, sys_args
+from muggle.constants import enable_modules
+from muggle.exception import ServerException
+
+
+def process_init():
+    """
+    进程池子进程初始化: 子进程以 spawn 启动, 导入 handler 时会再次加载模型;
+    改为按需加载 (lazy_load), 子进程只为实际收到请求的项目创建会话
+    """
+    sys_args['lazy_load'] = True
+
+
+def process_invoke(api_type, body, remote_ip=None, ua=None):
+    from muggle.core.api.handler import Handler
+    return Handler.invoke(api_type, body, None, remote_ip=remote_ip, ua=ua)
+
+
+def process_raw_invoke(api_type, body, image_bytes, title_bytes=None, remote_ip=None, ua=None):
+    from muggle.core.api.handler import Handler
+    return Handler.raw_invoke(api_type, body, image_bytes, title_bytes, None, remote_ip=remote_ip, ua=ua)
+
+
+def process_batch_invoke(body, remote_ip=None, rejected=None):
+    from muggle.core.api.handler import Handler
+    return Handler.batch_invoke(body, None, remote_ip=remote_ip, rejected=rejected)
+
+
+class InferenceExecutor:
+    """
+    推理执行器: 将同步的推理过程移出事件循环, 并限制排队请求数量
+    """
+
+    def __init__(self, mode: str, workers: int, queue_size: int, overload_code: int = 503):
+        if mode == 'process' and SYSTEM == 'Windows':
+            logger.warning("[Executor] Windows 暂不支持进程池模式, 已切换为线程池模式")
+            mode = 'thread'
+        if mode == 'process' and enable_modules('Charge'):
+            logger.warning("[Executor] 中间件<Charge>依赖进程内状态, 已切换为线程池模式")
+            mode = 'thread'
+        self.mode = mode
+        self.workers = max(int(workers), 1)
+        self.capacity = self.workers + max(int(queue_size), 0)
+        self.overload_code = overload_code
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.pool: Executor = self.create_pool()
+        logger.info(f"[Executor] 推理执行器 [{self.mode}], 并发 [{self.workers}], 排队上限 [{self.capacity}]")
+
+    @classmethod
+    def from_args(cls):
+        return cls(
+            mode=sys_args.get('executor'),
+            workers=sys_args.get('executor_workers') or sys_args.get('threads'),
+            queue_size=sys_args.get('executor_queue'),
+            overload_code=sys_args.get('overload_code'),
+        )
+
+    @property
+    def is_process(self):
+        return self.mode == 'process'
+
+    def create_pool(self) -> Executor:
+        if self.is_process:
+            logger.warning(
+                f"[Executor] 进程池模式下 [{self.workers}] 个子进程各自持有模型会话 (按需加载), "
+                f"内存占用最多约为线程池模式的 [{self.workers + 1}] 倍, 可通过 memory_budget 限制每个进程的常驻模型"
+            )
+            return ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=process_init
+            )
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+    def admit(self, api_type=None, project_name=None, request=None):
+        with self.lock:
+            if self.pending >= self.capacity:
+                raise ServerException(
+                    message="服务繁忙, 请稍后重试",
+                    code=self.overload_code,
+                    api_type=api_type,
+                    project_name=project_name,
+                    request=request,
+                    is_print=False
+                )
+            self.pending += 1
+
+    def done(self, _):
+        with self.lock:
+            self.pending -= 1
+
+    async def run(self, fn: Callable, *args, api_type=None, project_name=None, request=None, **kwargs):
+        self.admit(api_type=api_type, project_name=project_name, request=request)
+        try:
+            future = self.pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self.done(None)
+            raise
+        future.add_done_callback(self.done)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
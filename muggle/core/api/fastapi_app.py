@@ -1,20 +1,34 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
 import os
+import hmac
+import json
 import PIL
 from muggle.core.api.handler import Handler, interface
 from muggle.entity import APIType
 from muggle.core.api.cli import cli_args
 from muggle.exception import ImageException, ServerException
-from muggle.constants import description, BLACKLIST
+from muggle.constants import description, enable_modules, BLACKLIST
+from muggle.utils import Import
+from muggle.config import sys_args
+from muggle.logger import logger
+from muggle.metrics import metrics
+from muggle.access_log import access_log
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
-from muggle.entity import RequestBody, missing_request_param
+from fastapi.responses import JSONResponse, PlainTextResponse
+from muggle.entity import RequestBody, BatchRequestBody, missing_request_param
+from muggle.engine.session import model_manager
+from muggle.engine.components.pipeline import Pipeline
+from muggle.core.api.executor import InferenceExecutor, process_invoke, process_raw_invoke, process_batch_invoke
+from muggle.core.api.stream import NDJSONStream, NDJSONResponse
+from muggle.core.sdk.warmup import warm_up, ShapeStats
 from starlette.status import HTTP_422_UNPROCESSABLE_ENTITY
 from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
 
 app = interface.app
 description()
+inference_executor = InferenceExecutor.from_args()
 app_dir = os.path.dirname(__file__)
 
 
@@ -96,7 +110,19 @@ async def invoke(request: Request, body: RequestBody):
             request=request,
         ).response()
     try:
-        project_name, input_image, title = Handler.parse_params(body, request)
+        if inference_executor.is_process:
+            Handler.check_sign(APIType.TEXT, body.project_name, body, request)
+            ua = request.headers.get('user-agent')
+            r = await inference_executor.run(
+                process_invoke, APIType.TEXT, body,
+                remote_ip=request.client.host, ua=ua if (not ua) or (not ua.startswith("Mozilla")) else "-",
+                api_type=APIType.TEXT, project_name=body.project_name, request=request
+            )
+        else:
+            r = await inference_executor.run(
+                Handler.invoke, APIType.TEXT, body, request,
+                api_type=APIType.TEXT, project_name=body.project_name, request=request
+            )
     except PIL.UnidentifiedImageError:
         return ImageException(
             api_type=APIType.TEXT,
@@ -113,8 +139,112 @@ async def invoke(request: Request, body: RequestBody):
             project_name=None,
             request=request,
         ).response()
+    except ServerException as e:
+        return e.response()
+
+    response = {
+        "uuid": r.uuid,
+        "msg": "",
+        "data": r.data,
+        "code": 0,
+        "success": True,
+        "consume": r.consume,
+        "score": r.score
+    }
+    return JSONResponse(response, status_code=200)
+
+
+async def raw_params(request: Request):
+    """
+    multipart/form-data: 字段 image (文件) / title (文件或文本) / project_name / sign / token / extra;
+    其他类型: 请求体即图片字节, 其余参数取自 query 或 X-Project-Name 等请求头
+    """
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        try:
+            form = await request.form()
+        except AssertionError:
+            raise ServerException(
+                message="表单上传需要安装 python-multipart",
+                code=415,
+                api_type=APIType.TEXT,
+                project_name=None,
+                request=request,
+            )
+        image, title = form.get('image'), form.get('title')
+        image_bytes = await image.read() if hasattr(image, 'read') else None
+        title_bytes = await title.read() if hasattr(title, 'read') else None
+        fields = form
+    else:
+        image_bytes, title_bytes = await request.body(), None
+        fields = {
+            **{k[2:].replace('-', '_').lower(): v for k, v in request.headers.items() if k.lower().startswith('x-')},
+            **request.query_params
+        }
+    params = {
+        name: fields.get(name) for name in ['project_name', 'sign', 'token', 'title'] if fields.get(name) is not None
+    }
+    if title_bytes:
+        params.pop('title', None)
+    if fields.get('extra'):
+        params['extra'] = json.loads(fields.get('extra'))
+    return RequestBody(**params), image_bytes, title_bytes
+
+
+@app.post("/runtime/text/raw_invoke")
+async def raw_invoke(request: Request):
     try:
-        r = Handler.process(APIType.TEXT, project_name, body, request, input_image, title)
+        body, image_bytes, title_bytes = await raw_params(request)
+    except ServerException as e:
+        return e.response()
+    except (ValueError, TypeError):
+        return ServerException(
+            message="参数格式错误, extra 需为 JSON 对象",
+            code=400,
+            api_type=APIType.TEXT,
+            project_name=None,
+            request=request,
+        ).response()
+    missing = [name for name, value in [("project_name", body.project_name), ("image", image_bytes)] if not value]
+    if missing:
+        return ServerException(
+            message=f"Missing parameters [{', '.join(missing)}]",
+            code=400,
+            api_type=None,
+            project_name=None,
+            request=request,
+        ).response()
+    try:
+        if inference_executor.is_process:
+            Handler.check_sign(
+                APIType.TEXT, body.project_name, body, request, source=Handler.sign_source(image_bytes)
+            )
+            ua = request.headers.get('user-agent')
+            r = await inference_executor.run(
+                process_raw_invoke, APIType.TEXT, body, image_bytes, title_bytes,
+                remote_ip=request.client.host, ua=ua if (not ua) or (not ua.startswith("Mozilla")) else "-",
+                api_type=APIType.TEXT, project_name=body.project_name, request=request
+            )
+        else:
+            r = await inference_executor.run(
+                Handler.raw_invoke, APIType.TEXT, body, image_bytes, title_bytes, request,
+                api_type=APIType.TEXT, project_name=body.project_name, request=request
+            )
+    except PIL.UnidentifiedImageError:
+        return ImageException(
+            api_type=APIType.TEXT,
+            request=request,
+            project_name=body.project_name,
+            message=f"图片无法识别",
+            code=5001
+        ).response()
+    except RuntimeError as e:
+        return ServerException(
+            message=e.args[0],
+            code=500,
+            api_type=APIType.TEXT,
+            project_name=None,
+            request=request,
+        ).response()
     except ServerException as e:
         return e.response()
 
@@ -128,3 +258,171 @@ async def invoke(request: Request, body: RequestBody):
         "score": r.score
     }
     return JSONResponse(response, status_code=200)
+
+
+@app.post("/runtime/text/batch_invoke")
+async def batch_invoke(request: Request, body: BatchRequestBody):
+    if not body.items:
+        return ServerException(
+            message="Missing parameters [items]",
+            code=400,
+            api_type=None,
+            project_name=None,
+            request=request,
+        ).response()
+    if len(body.items) > sys_args.get('batch_invoke_limit'):
+        return ServerException(
+            message=f"单次批量识别不能超过 {sys_args.get('batch_invoke_limit')} 条",
+            code=400,
+            api_type=APIType.TEXT,
+            project_name=None,
+            request=request,
+        ).response()
+    try:
+        if inference_executor.is_process:
+            rejected = {}
+            for index, item in enumerate(body.items):
+                try:
+                    Handler.check_sign(APIType.TEXT, item.project_name, item, request)
+                except ServerException as e:
+                    rejected[index] = (e.code, str(e.message))
+            r = await inference_executor.run(
+                process_batch_invoke, body, remote_ip=request.client.host, rejected=rejected,
+                api_type=APIType.TEXT, request=request
+            )
+        else:
+            r = await inference_executor.run(
+                Handler.batch_invoke, body, request, api_type=APIType.TEXT, request=request
+            )
+    except ServerException as e:
+        return e.response()
+    return JSONResponse({
+        "uuid": r.uuid,
+        "msg": "",
+        "code": 0,
+        "success": True,
+        "consume": r.consume,
+        "items": [{
+            "index": item.index,
+            "success": item.success,
+            "code": item.code,
+            "msg": item.msg,
+            "data": item.data,
+            "score": item.score,
+        } for item in r.items],
+    }, status_code=200)
+
+
+@app.post("/runtime/text/stream_invoke")
+async def stream_invoke(request: Request):
+    return NDJSONResponse(NDJSONStream(request, inference_executor))
+
+
+@app.get("/runtime/stats/batching")
+async def batching_stats():
+    return JSONResponse(model_manager.runtime_manager.batching_stats(), status_code=200)
+
+
+@app.get("/runtime/stats/pipeline")
+async def pipeline_stats():
+    return JSONResponse(Pipeline.stats(), status_code=200)
+
+
+@app.get("/runtime/ready")
+async def ready():
+    status = warm_up.status
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+
+LOOPBACK_HOSTS = ['127.0.0.1', '::1', 'localhost']
+
+
+def check_admin(request: Request):
+    """
+    配置了 admin_token 时校验 X-Admin-Token 请求头; 未配置时仅当服务只监听本机地址才允许本机调用,
+    否则经本机反向代理转发的远程请求同样来自 127.0.0.1, 管理接口直接拒绝
+    """
+    if admin_token := sys_args.get('admin_token'):
+        allowed = hmac.compare_digest(
+            request.headers.get('x-admin-token', '').encode('utf8'), str(admin_token).encode('utf8')
+        )
+    else:
+        is_local = request.client is not None and request.client.host in LOOPBACK_HOSTS
+        allowed = cli_args.host in LOOPBACK_HOSTS and is_local
+    if not allowed:
+        raise ServerException(message="管理接口未授权", code=403, request=request)
+
+
+async def set_resident(request: Request, resident: bool):
+    try:
+        check_admin(request)
+        body = await request.json()
+        project_name = body.get('project_name') if isinstance(body, dict) else None
+        if not project_name:
+            raise ServerException(message="Missing parameters [project_name]", code=400, request=request)
+        result = await run_in_threadpool(model_manager.set_resident, project_name, resident)
+    except ValueError:
+        return ServerException(message="请求体需为 JSON 对象", code=400, request=request).response()
+    except RuntimeError as e:
+        return ServerException(message=e.args[0], code=404, request=request).response()
+    except ServerException as e:
+        return e.response()
+    return JSONResponse({
+        "msg": "", "code": 0, "success": True, "data": result, "loaded": model_manager.is_loaded(project_name)
+    }, status_code=200)
+
+
+@app.get("/runtime/models")
+async def resident_models(request: Request):
+    try:
+        check_admin(request)
+    except ServerException as e:
+        return e.response()
+    return JSONResponse(model_manager.resident(), status_code=200)
+
+
+@app.post("/runtime/models/load")
+async def load_models(request: Request):
+    return await set_resident(request, True)
+
+
+@app.post("/runtime/models/unload")
+async def unload_models(request: Request):
+    return await set_resident(request, False)
+
+
+@app.on_event("startup")
+def start_runtime_sync():
+    model_manager.start_sync()
+
+
+@app.on_event("startup")
+def check_admin_config():
+    if not sys_args.get('admin_token') and cli_args.host not in LOOPBACK_HOSTS:
+        logger.warning(f"未配置 admin_token 且服务监听 [{cli_args.host}], 模型管理接口 (加载/卸载) 已禁用")
+
+
+@app.on_event("shutdown")
+def save_shape_stats():
+    ShapeStats.save()
+    metrics.retire()
+    access_log.close()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    if not metrics.enabled:
+        return PlainTextResponse("", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/runtime/stats/access_log")
+async def access_log_stats():
+    return JSONResponse(access_log.stats(), status_code=200)
+
+
+@app.get("/runtime/stats/cache")
+async def cache_stats():
+    if not enable_modules('MD5Cache'):
+        return JSONResponse({}, status_code=200)
+    return JSONResponse(Import.get_class("MD5Cache").stats, status_code=200)
@@ -2,6 +2,7 @@
 # -*- coding:utf-8 -*-
 import io
 import os
+import json
 import PIL.Image
 import time
 import base64
@@ -11,7 +12,7 @@ from functools import partial
 from fastapi import Request, FastAPI
 from muggle.entity import APIType
 from muggle.logger import logger
-from typing import TypeVar, Union, Tuple, List, Optional
+from typing import TypeVar, Union, Tuple, List, Optional, Dict
 from muggle.engine.session import project_entities, model_manager
 from muggle.engine.project import ProjectEntity
 from muggle.exception import ServerException
@@ -19,11 +20,13 @@ from muggle.constants import modules_enabled, enable_modules, SYSTEM
 from muggle.logic import *
 from muggle.utils import Import, Core
 from multiprocessing import get_context
-from muggle.entity import RequestBody, ResponseBody, ImageEntity, LogEntity
+from muggle.entity import RequestBody, ResponseBody, ImageEntity
+from muggle.entity import BatchRequestBody, BatchResponseBody, BatchItemBody
 from muggle.constants import BLACKLIST, IP_COUNTS
 from muggle.config import sys_args
+from muggle.metrics import metrics
+from muggle.access_log import access_log
 from types import SimpleNamespace
-from muggle.pages.utils import BlocksFuse, BlocksEntities
 
 Logic = TypeVar('Logic', bound=BaseLogic)
 interface_map = {}
@@ -40,18 +43,20 @@ class Handler:
         sdk_module.__dict__.update({k: v for k, v in logic_module.__dict__.items() if k.endswith("Logic")})
 
     @classmethod
-    def parse_params(cls, param: RequestBody, request: Optional[Request] = None) -> Tuple[
+    def parse_params(
+            cls, param: RequestBody, request: Optional[Request] = None, remote_ip=None, image=None, title=None
+    ) -> Tuple[
         str, Union[List[ImageEntity], ImageEntity], Union[List[ImageEntity], ImageEntity, str]
     ]:
-        input_images = param.image
+        input_images = param.image if image is None else image
         project_name = param.project_name
-        title = param.title
+        title = param.title if title is None else title
         project_config = project_entities.get(project_name)
 
         if not project_name:
             project_name = list(project_entities.all.keys())[0]
         if not project_config:
-            ip = request.client.host if request else None
+            ip = request.client.host if request else remote_ip
             if ip and ip not in IP_COUNTS:
                 IP_COUNTS[ip] = 0
             elif ip and ip in IP_COUNTS:
@@ -60,16 +65,17 @@ class Handler:
                 BLACKLIST.add(ip)
             raise RuntimeError(f"项目名 [{project_name}] 不存在")
 
-        if isinstance(input_images, list):
-            input_image = [Core.text2image(_) for _ in input_images]
-        else:
-            input_image = Core.text2image(input_images)
-
-        if title and 'ImageTitle' in project_config.strategy:
-            if isinstance(title, list):
-                title = [Core.text2image(_) for _ in title]
+        with metrics.timer("parse", project=project_name):
+            if isinstance(input_images, list):
+                input_image = [Core.text2image(_) for _ in input_images]
             else:
-                title = Core.text2image(title)
+                input_image = Core.text2image(input_images)
+
+            if title and 'ImageTitle' in project_config.strategy:
+                if isinstance(title, list):
+                    title = [Core.text2image(_) for _ in title]
+                else:
+                    title = Core.text2image(title)
         return project_name, input_image, title
 
     @classmethod
@@ -82,6 +88,25 @@ class Handler:
             input_image: InputImage,
             title: Title = None,
             **kwargs
+    ) -> ResponseBody:
+        # 按需加载模式下请求期间项目不会被淘汰, 淘汰后的首个请求单独统计耗时
+        st = time.time()
+        with model_manager.lru.use(project_name) as cold:
+            response = cls.process_loaded(api_type, project_name, param, request, input_image, title, **kwargs)
+        if cold:
+            metrics.observe("cold_start", (time.time() - st) * 1000, project=project_name)
+        return response
+
+    @classmethod
+    def process_loaded(
+            cls,
+            api_type: APIType,
+            project_name: str,
+            param: RequestBody,
+            request: Optional[Request],
+            input_image: InputImage,
+            title: Title = None,
+            **kwargs
     ) -> ResponseBody:
         st = time.time()
         if project_name not in project_entities.all:
@@ -93,57 +118,30 @@ class Handler:
                 code=4049
             )
 
-        if request and ("Sign" in modules_enabled and api_type != APIType.IMAGE):
-            try:
-                Import.get_class("Sign").check_sign(request, project_name, param.image, param.sign)
-            except ModuleNotFoundError:
-                raise ServerException(
-                    api_type=api_type,
-                    project_name=project_name,
-                    request=request,
-                    message=f"中间件<Sign>加载失败",
-                    code=4040
-                )
+        if request:
+            cls.check_sign(api_type, project_name, param, request, source=kwargs.get('sign_source'))
         # print(request)
         if request:
             ua: str = request.headers.get('user-agent')
             ua = ua if (not ua) or (not ua.startswith("Mozilla")) else "-"
             ip = request.client.host
         else:
-            ua = ""
+            ua = kwargs.get('ua') or ""
             ip = kwargs.get('remote_ip')
         logic = Strategy.get(project_name, param.extra)
         use_cache = logic.project_config.get('cache')
-        log_entity = LogEntity(
-            api_type=api_type,
-            ip=ip,
-            ua=ua,
-            project_name=project_name,
-            title=title,
-        )
-        # TODO 计费提前，扣费在后
-        if 'Charge' in modules_enabled and api_type == APIType.TEXT:
-            request_token = param.token
-            token = Import.get_class('Charge').get(request_token)
-            admin = sys_args.get('admin')
-            if not token or not token.available(project_name=project_name):
-                raise ServerException(
-                    message=f"中间件<Charge>过程失败: 当前授权不存在或者已过期, 请联系管理员{f', {admin}' if admin else ''}",
-                    code=4053,
-                    api_type=api_type,
-                    project_name=project_name,
-                    request=request
-                )
-            token.consume()
-            charge.dumps()
+        cls.charge(api_type, project_name, param, request)
         is_text_outputs = (api_type is APIType.TEXT) or (logic.project_entity.outputs in ['text', None])
-        if use_cache and "MD5Cache" in modules_enabled and is_text_outputs:
-            Import.get_class("MD5Cache").dumps_task()
-            if result_data := Import.get_class("MD5Cache").get(input_image.hash):
+        cache_key = None
+        if use_cache and "MD5Cache" in modules_enabled:
+            cache_key = Import.get_class("MD5Cache").key(project_name, input_image, title=title, extra=param.extra)
+        if cache_key and is_text_outputs:
+            with metrics.timer("cache", project=project_name):
+                result_data = Import.get_class("MD5Cache").get(cache_key)
+            if result_data:
                 consume = (time.time() - st) * 1000
-                log_entity.consume = consume
-                log_entity.predictions = (result_data, -1)
-                logger.info(log_entity.log_text)
+                metrics.observe("total", consume, project=project_name, cached="true")
+                access_log.record(api_type, ip, ua, project_name, consume, (result_data, -1), title, cached=True)
 
                 return ResponseBody(
                     uuid=Core.uuid(),
@@ -153,6 +151,9 @@ class Handler:
                 )
         try:
             blocks = logic.process(input_image, title=title)
+        except PIL.UnidentifiedImageError:
+            # 图片延迟到推理时才解码, 仍按图片无法识别返回
+            raise
         except Exception as e:
             with open("runtime-error.log", "w") as f:
                 f.write(traceback.format_exc())
@@ -170,9 +171,10 @@ class Handler:
             score = (sum(score) / len(score)) if score else 0
 
         consume = (time.time() - st) * 1000
-        log_entity.consume = consume
-        log_entity.predictions = (blocks if logic.print_process else result_data, score)
-        logger.info(log_entity.log_text)
+        metrics.observe("total", consume, project=project_name, cached="false")
+        access_log.record(
+            api_type, ip, ua, project_name, consume, (blocks if logic.print_process else result_data, score), title
+        )
 
         if "Draw" in modules_enabled and logic.project_entity.outputs == 'image' and api_type == APIType.IMAGE:
             try:
@@ -208,10 +210,181 @@ class Handler:
             consume=consume,
             score=round(score, 4)
         )
-        if use_cache and "MD5Cache" in modules_enabled:
-            Import.get_class("MD5Cache").put(input_image.hash, result_data)
+        if cache_key:
+            Import.get_class("MD5Cache").put(cache_key, result_data)
         return response
 
+    @classmethod
+    def invoke(cls, api_type: APIType, param: RequestBody, request: Optional[Request] = None, **kwargs) -> ResponseBody:
+        project_name, input_image, title = cls.parse_params(param, request, remote_ip=kwargs.get('remote_ip'))
+        return cls.process(api_type, project_name, param, request, input_image, title, **kwargs)
+
+    @classmethod
+    def raw_invoke(
+            cls, api_type: APIType, param: RequestBody, image_bytes: bytes, title_bytes: Optional[bytes] = None,
+            request: Optional[Request] = None, **kwargs
+    ) -> ResponseBody:
+        """
+        二进制上传: 图片直接由请求字节解码, 不经过 base64; 图片标题可以是文本 (param.title) 或图片字节
+        """
+        image = Core.bytes2entity(image_bytes)
+        title = Core.bytes2entity(title_bytes) if title_bytes else None
+        project_name, input_image, title = cls.parse_params(
+            param, request, remote_ip=kwargs.get('remote_ip'), image=image, title=title
+        )
+        return cls.process(
+            api_type, project_name, param, request, input_image, title, sign_source=cls.sign_source(image_bytes), **kwargs
+        )
+
+    @classmethod
+    def sign_source(cls, image_bytes: bytes) -> str:
+        # 签名取 base64 文本的前100个字符, 即原始字节的前75个字节
+        return base64.b64encode(image_bytes[:75]).decode()
+
+    @classmethod
+    def charge(cls, api_type: APIType, project_name: str, param: RequestBody, request: Optional[Request]):
+        # TODO 计费提前，扣费在后
+        if 'Charge' not in modules_enabled or api_type != APIType.TEXT:
+            return
+        request_token = param.token
+        token = Import.get_class('Charge').get(request_token)
+        admin = sys_args.get('admin')
+        if not token or not token.available(project_name=project_name):
+            raise ServerException(
+                message=f"中间件<Charge>过程失败: 当前授权不存在或者已过期, 请联系管理员{f', {admin}' if admin else ''}",
+                code=4053,
+                api_type=api_type,
+                project_name=project_name,
+                request=request
+            )
+        token.consume()
+        charge.dumps()
+
+    @classmethod
+    def batch_error(cls, index: int, e: BaseException) -> BatchItemBody:
+        if isinstance(e, ServerException):
+            code, message = e.code, e.message
+        elif isinstance(e, PIL.UnidentifiedImageError):
+            code, message = 5001, "图片无法识别"
+        else:
+            code, message = 500, e.args[0] if e.args else str(e)
+        return BatchItemBody(index=index, success=False, code=code, msg=str(message))
+
+    @classmethod
+    def batch_invoke(cls, param: BatchRequestBody, request: Optional[Request] = None, **kwargs) -> BatchResponseBody:
+        """
+        批量识别: 逐条校验后按 项目+附加参数 分组, 组内通过 batch_process 分块批量推理, 按原顺序返回各条结果
+        """
+        st = time.time()
+        api_type = APIType.TEXT
+        remote_ip = request.client.host if request else kwargs.get('remote_ip')
+        results: List[Optional[BatchItemBody]] = [None] * len(param.items)
+        groups: Dict[Tuple[str, str], List[Tuple[int, RequestBody, ImageEntity, Title]]] = {}
+        rejected = kwargs.get('rejected') or {}
+        for index, item in enumerate(param.items):
+            if index in rejected:
+                code, message = rejected[index]
+                results[index] = BatchItemBody(index=index, success=False, code=code, msg=message)
+                continue
+            try:
+                project_name, input_image, title = cls.parse_params(item, request, remote_ip=remote_ip)
+                if request:
+                    cls.check_sign(api_type, project_name, item, request)
+                cls.charge(api_type, project_name, item, request)
+            except (ServerException, Exception) as e:
+                results[index] = cls.batch_error(index, e)
+                continue
+            group_key = (project_name, json.dumps(item.extra, sort_keys=True, default=str))
+            groups.setdefault(group_key, []).append((index, item, input_image, title))
+
+        for (project_name, _), entries in groups.items():
+            cls.batch_process(api_type, project_name, entries, results, remote_ip=remote_ip)
+
+        consume = (time.time() - st) * 1000
+        logger.info(
+            f"{api_type}  IP [{remote_ip}]  批量 [{len(param.items)}] 条, "
+            f"失败 [{sum(not _.success for _ in results)}] 条  - 总耗时 [{round(consume, 2)} 毫秒] -"
+        )
+        return BatchResponseBody(uuid=Core.uuid(), items=results, consume=consume)
+
+    @classmethod
+    def batch_process(cls, api_type: APIType, project_name: str, entries: list, results: list, remote_ip=None):
+        st = time.time()
+        try:
+            with model_manager.lru.use(project_name) as cold:
+                cls.batch_process_loaded(api_type, project_name, entries, results, remote_ip=remote_ip)
+        except Exception as e:
+            # 项目加载失败时整组条目返回同一错误
+            for index, *_ in entries:
+                results[index] = results[index] or cls.batch_error(index, e)
+            return
+        if cold:
+            metrics.observe("cold_start", (time.time() - st) * 1000, project=project_name)
+
+    @classmethod
+    def batch_process_loaded(
+            cls, api_type: APIType, project_name: str, entries: list, results: list, remote_ip=None
+    ):
+        logic = Strategy.get(project_name, entries[0][1].extra)
+        use_cache = logic.project_config.get('cache') and "MD5Cache" in modules_enabled
+        pending = []
+        for index, item, input_image, title in entries:
+            cache_key = Import.get_class("MD5Cache").key(
+                project_name, input_image, title=title, extra=item.extra
+            ) if use_cache else None
+            if cache_key and (result_data := Import.get_class("MD5Cache").get(cache_key)):
+                results[index] = BatchItemBody(index=index, data=result_data, score=-1)
+                continue
+            pending.append((index, input_image, title, cache_key))
+        if not pending:
+            return
+        images = [_[1] for _ in pending]
+        titles = [_[2] for _ in pending]
+        try:
+            responses = logic.batch_process(images, titles)
+        except Exception:
+            # 批量推理失败时逐条重试, 将错误定位到具体条目
+            responses = []
+            for image, title in zip(images, titles):
+                try:
+                    responses.append(logic.process(image, title=title))
+                except Exception as e:
+                    responses.append(e)
+        for (index, _, _, cache_key), response in zip(pending, responses):
+            if isinstance(response, PIL.UnidentifiedImageError):
+                results[index] = cls.batch_error(index, response)
+                continue
+            if isinstance(response, Exception):
+                results[index] = BatchItemBody(
+                    index=index, success=False, code=4049, msg=str(response)
+                )
+                logger.error(f"{api_type}  IP [{remote_ip}]  [{project_name}]  批量条目 [{index}] 失败 [{response}]")
+                continue
+            result_data, score = logic.dumps(response)
+            if isinstance(score, list) or isinstance(score, tuple):
+                score = (sum(score) / len(score)) if score else 0
+            results[index] = BatchItemBody(index=index, data=result_data, score=round(score, 4))
+            if cache_key:
+                Import.get_class("MD5Cache").put(cache_key, result_data)
+
+    @classmethod
+    def check_sign(cls, api_type: APIType, project_name: str, param: RequestBody, request: Request, source=None):
+        if "Sign" not in modules_enabled or api_type == APIType.IMAGE:
+            return
+        try:
+            Import.get_class("Sign").check_sign(request, project_name, source or param.image, param.sign)
+        except ModuleNotFoundError:
+            raise ServerException(
+                api_type=api_type,
+                project_name=project_name,
+                request=request,
+                message=f"中间件<Sign>加载失败",
+                code=4040
+            )
+
+
+# 服务端在导入时 (gunicorn fork 之前) 加载全部项目, 仅使用 SDK 时推迟到首次调用
+model_manager.load()
 
 if enable_modules('Sign'):
     Import.dynamic_import("muggle.middleware.verification.Sign")
@@ -237,9 +410,12 @@ elif enable_modules('Draw'):
     preview_layout = Import.get_class('Draw').layout
     interface_map["preview"] = preview_layout
 else:
+    from muggle.pages.utils import BlocksEntities
     interface = BlocksEntities.empty_blocks()
 
 if enable_modules('Docs|Draw'):
+    # 页面相关模块仅在启用 Draw/Docs 时导入
+    from muggle.pages.utils import BlocksFuse
     interface = BlocksFuse(**interface_map)
     interface.setting_routes()
 
@@ -273,6 +449,9 @@ if enable_modules('MemoryLoader'):
     memory_loader = Import.get_class('MemoryLoader')
     memory_loader.iters_crypto_projects()
 
-if sys_args['warm_up']:
-    # memory_loader = globals().get('memory_loader', None)
+if not sys_args['warm_up']:
+    from muggle.core.sdk.warmup import warm_up
+    warm_up.mark_ready()
+elif sys_args.get('server') != 'gunicorn':
+    # gunicorn 模式下由各工作进程在 fork 之后自行预热
     Strategy.warm_up_task()
@@ -3,13 +3,22 @@
 
 
 def serve():
-    from muggle.config import SYSTEM
+    from muggle.config import SYSTEM, sys_args
     from muggle.core.api.cli import cli_args
 
     import logging
     import uvicorn.server
     from muggle.logger import logger
+    if SYSTEM != 'Windows':
+        sys_args['server'] = 'gunicorn'
+    # 旧版 .cache 文件需在加载模型 (创建 .cache/ 下各目录) 之前移走
+    from muggle.middleware.cache_backend import migrate_legacy_cache
+    migrate_legacy_cache()
     from muggle.core.api.fastapi_app import app
+    from muggle.metrics import metrics
+    from muggle.engine.session import model_manager
+    metrics.reset()
+    model_manager.residency.reset()
 
     def info(x, *args, **kwargs):
         return logger.info(x % args, **kwargs)
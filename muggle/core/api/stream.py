@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import json
+import asyncio
+import PIL
+from typing import AsyncIterator, Optional
+from fastapi import Request
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from pydantic import ValidationError
+from muggle.logger import logger
+from muggle.config import sys_args
+from muggle.entity import APIType, RequestBody, missing_request_param
+from muggle.exception import ServerException
+from muggle.core.api.handler import Handler
+from muggle.core.api.executor import InferenceExecutor, process_invoke
+
+
+class NDJSONResponse(StreamingResponse):
+    """
+    请求体由 body_iterator 边读边处理, 不能像 StreamingResponse 那样并发监听 receive, 否则会抢走请求体分块;
+    客户端断开由读取请求体时的 ClientDisconnect 或写出失败感知
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+
+class NDJSONStream:
+    """
+    流式批量识别: 边读取请求体中的 NDJSON 条目边提交推理, 每条完成后立即输出一行结果 (按完成顺序, 以 index 对应);
+    在途与待输出的条目数均不超过 stream_inflight, 超出时暂停读取请求体, 内存占用与总条数无关
+    """
+
+    def __init__(self, request: Request, executor: InferenceExecutor, inflight=None, line_limit=None):
+        self.request = request
+        self.executor = executor
+        self.inflight = max(int(inflight or sys_args.get('stream_inflight') or executor.workers * 2), 1)
+        self.line_limit = int(line_limit or sys_args.get('stream_line_limit'))
+        self.api_type = APIType.TEXT
+        ua = request.headers.get('user-agent')
+        self.ua = ua if (not ua) or (not ua.startswith("Mozilla")) else "-"
+        self.remote_ip = request.client.host if request.client else None
+        self.total = 0
+        self.failed = 0
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        # 按分块切分, 只有跨分块的半行才累积到 buffer, 每个字节只复制常数次
+        buffer = bytearray()
+        async for chunk in self.request.stream():
+            parts = chunk.split(b"\n")
+            if len(parts) > 1:
+                buffer += parts[0]
+                yield bytes(buffer)
+                for line in parts[1:-1]:
+                    yield line
+                buffer = bytearray(parts[-1])
+            else:
+                buffer += chunk
+            if len(buffer) > self.line_limit:
+                raise ServerException(
+                    message=f"单行数据超过 {self.line_limit} 字节",
+                    code=413,
+                    api_type=self.api_type,
+                    project_name=None,
+                    request=self.request,
+                    is_print=False
+                )
+        if buffer:
+            yield bytes(buffer)
+
+    @classmethod
+    def error_line(cls, index: int, code: int, message) -> dict:
+        return {"index": index, "success": False, "code": code, "msg": str(message), "data": None}
+
+    def parse(self, index: int, line: bytes) -> RequestBody:
+        try:
+            body = RequestBody(**json.loads(line))
+        except (ValueError, TypeError, ValidationError) as e:
+            raise ServerException(
+                message=f"第 [{index}] 条数据格式错误: {e}",
+                code=400,
+                api_type=self.api_type,
+                project_name=None,
+                request=self.request,
+                is_print=False
+            )
+        missing_entity = missing_request_param(["project_name", "image"], body)
+        if missing_entity.is_missing:
+            raise ServerException(
+                message=f"Missing parameters [{', '.join(missing_entity.names)}]",
+                code=400,
+                api_type=self.api_type,
+                project_name=body.project_name,
+                request=self.request,
+                is_print=False
+            )
+        return body
+
+    async def run_item(self, index: int, body: RequestBody) -> dict:
+        try:
+            if self.executor.is_process:
+                Handler.check_sign(self.api_type, body.project_name, body, self.request)
+                r = await self.executor.run(
+                    process_invoke, self.api_type, body, remote_ip=self.remote_ip, ua=self.ua,
+                    api_type=self.api_type, project_name=body.project_name, request=self.request
+                )
+            else:
+                r = await self.executor.run(
+                    Handler.invoke, self.api_type, body, self.request,
+                    api_type=self.api_type, project_name=body.project_name, request=self.request
+                )
+        except PIL.UnidentifiedImageError:
+            return self.error_line(index, 5001, "图片无法识别")
+        except ServerException as e:
+            return self.error_line(index, e.code, e.message)
+        except Exception as e:
+            return self.error_line(index, 500, e.args[0] if e.args else e)
+        return {
+            "index": index, "uuid": r.uuid, "success": True, "code": 0, "msg": "",
+            "data": r.data, "score": r.score, "consume": r.consume
+        }
+
+    async def produce(self, outputs: asyncio.Queue, slots: asyncio.Semaphore):
+        tasks = set()
+
+        async def run(index, body):
+            try:
+                await outputs.put(await self.run_item(index, body))
+            finally:
+                slots.release()
+
+        try:
+            try:
+                index = -1
+                async for line in self.lines():
+                    if not line.strip():
+                        continue
+                    index += 1
+                    try:
+                        body = self.parse(index, line)
+                    except ServerException as e:
+                        await outputs.put(self.error_line(index, e.code, e.message))
+                        continue
+                    # 在途条目已满时暂停读取请求体
+                    await slots.acquire()
+                    task = asyncio.create_task(run(index, body))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            except ServerException as e:
+                await outputs.put(self.error_line(-1, e.code, e.message))
+            except ClientDisconnect:
+                # 读取请求体时客户端断开, 已提交的推理不再输出
+                for task in tasks:
+                    task.cancel()
+                tasks.clear()
+            except Exception as e:
+                # 其余异常同样以错误行结束, 否则输出端会一直等待结束标记
+                logger.exception(e)
+                await outputs.put(self.error_line(-1, 500, e.args[0] if e.args else e))
+            # 读取请求体出错时, 已提交的条目仍输出结果后再结束
+            if tasks:
+                await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            # 客户端断开, 已提交的推理不再输出
+            for task in tasks:
+                task.cancel()
+            raise
+        await outputs.put(None)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        outputs: asyncio.Queue = asyncio.Queue(maxsize=self.inflight)
+        slots = asyncio.Semaphore(self.inflight)
+        producer: Optional[asyncio.Task] = asyncio.create_task(self.produce(outputs, slots))
+        try:
+            while (item := await outputs.get()) is not None:
+                if item['index'] >= 0:
+                    self.total += 1
+                    self.failed += not item['success']
+                yield (json.dumps(item, ensure_ascii=False) + "\n").encode("utf8")
+        finally:
+            if not producer.done():
+                producer.cancel()
+            logger.info(
+                f"{self.api_type}  IP [{self.remote_ip}]  UA [{self.ua}]  流式识别 [{self.total}] 条, "
+                f"失败 [{self.failed}] 条"
+            )
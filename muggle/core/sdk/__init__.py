@@ -3,13 +3,12 @@
 import builtins
 import os
 import io
-import threading
 
 import PIL.Image
 import importlib
 from muggle.engine.session import project_entities
 from muggle.engine.project import Path
-from typing import TypeVar
+from typing import TypeVar, Dict
 from muggle.logic import *
 from muggle.logger import logger
 
@@ -19,6 +18,8 @@ Logic = TypeVar('Logic', bound=BaseLogic)
 
 class SDK:
 
+    pipelines: Dict[str, Logic] = {}
+
     @classmethod
     def load_logics(cls, logic_dir):
         logic_paths = [
@@ -31,15 +32,24 @@ class SDK:
             globals().update({k: v for k, v in logic_module.__dict__.items() if k.endswith("Logic")})
 
     @classmethod
-    def get(cls, project_name, param=None) -> Logic:
+    def build(cls, project_name) -> Logic:
         project_entity = project_entities.get(project_name)
         logic_dir = project_entity.project_path.logic_dir
         logic_name = project_entity.strategy
         if logic_name not in globals() and os.path.exists(logic_dir):
             cls.load_logics(logic_dir)
-        return globals()[logic_name](
-            project_name=project_name, param=param
-        )
+        return globals()[logic_name](project_name=project_name)
+
+    @classmethod
+    def get(cls, project_name, param=None) -> Logic:
+        if not (logic := cls.pipelines.get(project_name)):
+            logic = cls.pipelines.setdefault(project_name, cls.build(project_name))
+        logic.param = param
+        return logic
+
+    @classmethod
+    def invalidate(cls, project_name):
+        cls.pipelines.pop(project_name, None)
 
     @classmethod
     def warm_up(cls, project_entity, fs=None):
@@ -77,21 +87,8 @@ class SDK:
 
     @classmethod
     def warm_up_task(cls, fs=None):
-        if fs:
-            th = threading.Thread(target=cls.batch_warm_up, args=(fs, ))
-        else:
-            th = threading.Thread(target=cls.batch_warm_up)
-        th.start()
+        from muggle.core.sdk.warmup import warm_up
+        warm_up.start(fs)
 
-    @classmethod
-    def batch_warm_up(cls, fs=None):
-        logger.info("<模型预热任务> 正在后台进行...")
-        threads = []
-        for _, project_entity in project_entities.all.items():
-            th = threading.Thread(target=cls.warm_up, args=(project_entity, fs))
-            threads.append(th)
 
-        for t in threads:
-            t.start()
-            t.join()
-        logger.info(f"{len(threads)}个 <模型预热任务> 已完成.")
+project_entities.subscribe(SDK.invalidate)
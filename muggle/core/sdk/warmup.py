@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import json
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+from muggle.logger import logger
+from muggle.config import sys_args, CPU_COUNT
+from muggle.engine.session import project_entities, model_manager, ProjectSession
+from muggle.engine.model import RuntimeEngineType
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+ORT_DTYPE_MAP = {
+    'tensor(float)': np.float32,
+    'tensor(float16)': np.float16,
+    'tensor(double)': np.float64,
+    'tensor(int64)': np.int64,
+    'tensor(int32)': np.int32,
+    'tensor(uint8)': np.uint8,
+    'tensor(int8)': np.int8,
+    'tensor(bool)': np.bool_,
+}
+
+
+class ShapeStats:
+    """
+    记录线上流量实际出现的输入尺寸 (按模型哈希), 持久化后供下次启动预热使用
+    """
+
+    @classmethod
+    def path(cls) -> str:
+        return sys_args.get('warm_up_shapes_file')
+
+    @classmethod
+    def load(cls) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(cls.path(), "r", encoding="utf8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @classmethod
+    def encode(cls, shape) -> str:
+        return "x".join(str(_) for _ in shape)
+
+    @classmethod
+    def decode(cls, text: str) -> Tuple[int, ...]:
+        return tuple(int(_) for _ in text.split("x"))
+
+    @classmethod
+    def save(cls):
+        """ 多个工作进程各自退出时写入同一文件, 在文件锁内读取并累加本进程的计数 """
+        try:
+            os.makedirs(os.path.dirname(cls.path()) or ".", exist_ok=True)
+            with open(f"{cls.path()}.lock", "w") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    stats = cls.load()
+                    for model_hash, runtime_engine in model_manager.runtime_manager.session_map.items():
+                        counts = stats.setdefault(model_hash, {})
+                        for shape, count in runtime_engine.pop_shape_counts().items():
+                            key = cls.encode(shape)
+                            counts[key] = counts.get(key, 0) + count
+                    tmp_path = f"{cls.path()}.{os.getpid()}.tmp"
+                    with open(tmp_path, "w", encoding="utf8") as f:
+                        json.dump(stats, f)
+                    os.replace(tmp_path, cls.path())
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        except Exception as e:
+            logger.warning(f"<模型预热> 输入尺寸统计写入失败: {e}")
+
+    @classmethod
+    def top_shapes(cls, stats: Dict[str, Dict[str, int]], model_hash: str, limit: int) -> List[Tuple[int, ...]]:
+        counts = stats.get(model_hash, {})
+        return [cls.decode(_) for _ in sorted(counts, key=counts.get, reverse=True)[:limit]]
+
+
+class WarmUp:
+    """
+    模型预热: 有界线程池并发预热各项目, 每个项目预热全部模型 (含历史流量中出现过的动态尺寸),
+    并执行一次演示样本; 预热完成前 /runtime/ready 返回未就绪
+    """
+
+    def __init__(self, workers=None, rounds=None, max_shapes=None):
+        self.workers = int(workers or sys_args.get('warm_up_workers') or min(4, CPU_COUNT))
+        self.rounds = max(int(rounds or sys_args.get('warm_up_rounds')), 1)
+        self.max_shapes = int(max_shapes or sys_args.get('warm_up_max_shapes'))
+        self.ready = threading.Event()
+        self.started = False
+        self.lock = threading.Lock()
+        self.report: Dict[str, dict] = {}
+        self.errors: Dict[str, str] = {}
+        self.consume = None
+
+    def start(self, fs=None):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, args=(fs, ), name="warm-up", daemon=True).start()
+
+    def mark_ready(self):
+        self.ready.set()
+
+    def run(self, fs=None):
+        st = time.time()
+        logger.info("<模型预热任务> 正在后台进行...")
+        stats = ShapeStats.load()
+        if model_manager.lru.enabled:
+            # 按需加载时只预热上次运行的热点项目
+            model_manager.lru.prefetch()
+            project_names = [_ for _ in project_entities.all if model_manager.is_loaded(_)]
+        else:
+            project_names = list(project_entities.all.keys())
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="warm-up") as pool:
+                futures = {
+                    pool.submit(self.warm_project, project_name, stats, fs): project_name
+                    for project_name in project_names
+                }
+                for future in as_completed(futures):
+                    if e := future.exception():
+                        self.errors[futures[future]] = str(e)
+                        logger.warning(f"项目 [{futures[future]}] 预热失败 [{e}]")
+        finally:
+            self.consume = (time.time() - st) * 1000
+            self.ready.set()
+        logger.info(f"{len(project_names)}个 <模型预热任务> 已完成, 耗时 [{round(self.consume, 2)} 毫秒]")
+
+    def warm_project(self, project_name, stats, fs=None):
+        from muggle.core.sdk import SDK
+        session = ProjectSession.get(project_name)
+        for model_key, model_entity in session.models.items():
+            shapes = ShapeStats.top_shapes(stats, model_entity.model_hash, self.max_shapes)
+            self.warm_model(project_name, model_key, model_entity.model_runtime, shapes)
+        cold, warm = self.timeit(lambda: SDK.warm_up(project_entities.get(project_name), fs))
+        self.report[project_name] = {"cold_ms": cold, "warm_ms": warm, **self.report.get(project_name, {})}
+        logger.info(f"项目 [{project_name}] 预热完成, 首次 [{cold} 毫秒], 预热后 [{warm} 毫秒]")
+
+    def timeit(self, fn) -> Tuple[float, float]:
+        st = time.perf_counter()
+        fn()
+        cold = (time.perf_counter() - st) * 1000
+        costs = []
+        for _ in range(self.rounds):
+            st = time.perf_counter()
+            fn()
+            costs.append((time.perf_counter() - st) * 1000)
+        return round(cold, 2), round(float(np.median(costs)), 2)
+
+    @classmethod
+    def static_shape(cls, runtime_engine: RuntimeEngineType):
+        shape = runtime_engine.input_shape
+        if all(isinstance(_, int) for _ in shape[1:]):
+            return (1, *shape[1:])
+        return None
+
+    @classmethod
+    def dummy_inputs(cls, runtime_engine: RuntimeEngineType, shape) -> list:
+        inputs = []
+        for idx, node in enumerate(runtime_engine.session.get_inputs()):
+            node_shape = shape if idx == 0 else tuple(_ if isinstance(_, int) else 1 for _ in node.shape)
+            inputs.append(np.zeros(node_shape, dtype=ORT_DTYPE_MAP.get(node.type, np.float32)))
+        return inputs
+
+    def warm_model(self, project_name, model_key, runtime_engine: RuntimeEngineType, shapes):
+        static_shape = self.static_shape(runtime_engine)
+        if static_shape and static_shape not in shapes:
+            shapes = [static_shape] + shapes
+        # 启用宽度分桶时每个桶宽都预热一次
+        buckets = runtime_engine.width_buckets
+        bucket_shapes = buckets.warm_shapes(runtime_engine.input_shape) if buckets else []
+        shapes = shapes + [_ for _ in bucket_shapes if _ not in shapes]
+        results = {}
+        for shape in shapes:
+            feeds = self.dummy_inputs(runtime_engine, shape)
+            try:
+                # 预热使用的假数据不计入流量统计, 预热期间已到达的线上请求照常记录
+                with runtime_engine.untracked_shapes():
+                    cold, warm = self.timeit(lambda: runtime_engine.session_run(*feeds))
+            except Exception as e:
+                logger.warning(f"模型 [{project_name}/{model_key}] 尺寸 {shape} 预热失败 [{e}]")
+                continue
+            results[ShapeStats.encode(shape)] = {"cold_ms": cold, "warm_ms": warm}
+            if shape in bucket_shapes:
+                buckets.mark_warm(shape[3], cold)
+        self.report.setdefault(project_name, {}).setdefault("models", {})[model_key] = results
+        if results:
+            logger.info(f"模型 [{project_name}/{model_key}] 预热尺寸 {list(results.keys())}")
+
+    @property
+    def status(self) -> dict:
+        return {
+            "ready": self.ready.is_set(),
+            "started": self.started,
+            "consume": self.consume,
+            "errors": self.errors,
+            "report": self.report,
+        }
+
+
+warm_up = WarmUp()
@@ -11,27 +11,57 @@ from typing import Union, TypeVar, List
 from muggle.engine.model import ModelEntity, RuntimeEngineType, InputShape
 from muggle.engine.project import ProjectEntity
 from muggle.engine.components.preprocess import ProcessUtils
+from muggle.metrics import metrics
 
 
 class BaseEngine:
 
     utils_cls = ProcessUtils
+    # 子类直接赋值 session / input_shape 时保存覆盖值, 未赋值时从运行时引擎读取
+    _session = None
+    _input_shape = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in ['predict', 'batch_predict', 'batch_predict_rois']:
+            if name in cls.__dict__:
+                setattr(cls, name, metrics.instrument(name, cls.metric_labels)(cls.__dict__[name]))
 
     def __init__(self, model_entity: ModelEntity, project_entity: ProjectEntity):
         self.model_entity: ModelEntity = model_entity
         self.runtime_engine: RuntimeEngineType = self.model_entity.model_runtime
         self.project_entity: ProjectEntity = project_entity
-        self.session = self.runtime_engine.session
-        self.input_shape: InputShape = self.runtime_engine.input_shape
         self.with_postprocess = self.get_cfg('postprocess', True)
         self.utils = self.utils_cls(model_entity)
 
+    @property
+    def session(self):
+        return self._session if self._session is not None else self.runtime_engine.session
+
+    @session.setter
+    def session(self, value):
+        self._session = value
+
+    @property
+    def input_shape(self) -> InputShape:
+        return self._input_shape if self._input_shape is not None else self.runtime_engine.input_shape
+
+    @input_shape.setter
+    def input_shape(self, value: InputShape):
+        self._input_shape = value
+
     @property
     def hash(self):
         if not self.runtime_engine:
             raise RuntimeError("请先初始化运行时引擎 [BaseEngine -> runtime_engine] ")
         return self.runtime_engine.hash
 
+    def metric_labels(self) -> dict:
+        return {
+            "project": self.project_entity.project_name if self.project_entity else "",
+            "model": self.model_entity.model_name if self.model_entity else "",
+        }
+
     def get_cfg(self, name, default=None):
         if name in self.model_cfg:
             return self.model_cfg.get(name)
@@ -61,6 +91,13 @@ class BaseEngine:
     @abstractmethod
     def batch_predict(self, *args, **kwargs): pass
 
+    def batch_predict_rois(self, image: PIL.Image.Image, boxes, *args, **kwargs):
+        """
+        按检测框裁剪后批量预测, 默认逐框 crop 后交给 batch_predict;
+        引擎可重写为直接消费 ProcessUtils.roi_load_func 生成的 [N, C, H, W] 张量
+        """
+        return self.batch_predict([image.crop(tuple(_)) for _ in ProcessUtils.crop_boxes(boxes).tolist()], *args, **kwargs)
+
     def close(self):
         return self.runtime_engine.close()
 
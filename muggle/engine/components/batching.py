@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import math
+import time
+import queue
+import bisect
+import threading
+import numpy as np
+from concurrent.futures import Future
+from typing import Callable, List, Tuple, Dict, Optional, Sequence
+from muggle.logger import logger
+from muggle.metrics import Histogram, DEPTH_BUCKETS, SIZE_BUCKETS, RATIO_BUCKETS
+
+PendingItem = Tuple[tuple, Future]
+
+
+class BatchScheduler:
+    """
+    动态批处理: 收集并发请求, 达到 max_batch 或等待超过 max_wait_ms 后合并为一次会话调用
+    """
+
+    def __init__(self, runner: Callable, max_batch: int, max_wait_ms: float, name: str = ""):
+        self.runner = runner
+        self.max_batch = max(int(max_batch), 1)
+        self.max_wait = max(float(max_wait_ms), 0.) / 1000
+        self.name = name
+        self.splittable = True
+        self.queue: Optional["queue.Queue[Optional[PendingItem]]"] = None
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+        self.batch_size = Histogram(SIZE_BUCKETS)
+        self.is_running = True
+        self.lock = threading.Lock()
+        self.pid = None
+        self.thread: Optional[threading.Thread] = None
+
+    def ensure_started(self):
+        # 模型可能在 gunicorn 主进程中加载, 线程不会随 fork 进入子进程, 每个进程在首次提交时各自启动
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = queue.Queue()
+            self.thread = threading.Thread(target=self.loop, name=f"batching-{self.name[:8]}", daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    @classmethod
+    def batch_of(cls, input_arr) -> int:
+        if not input_arr or any(not isinstance(_, np.ndarray) or _.ndim == 0 for _ in input_arr):
+            return 0
+        sizes = {_.shape[0] for _ in input_arr}
+        return sizes.pop() if len(sizes) == 1 else 0
+
+    @classmethod
+    def shape_key(cls, input_arr) -> tuple:
+        return tuple((_.shape[1:], _.dtype.str) for _ in input_arr)
+
+    def submit(self, *input_arr):
+        n = self.batch_of(input_arr)
+        if not self.is_running or not self.splittable or n == 0 or n >= self.max_batch:
+            return self.runner(*input_arr)
+        self.ensure_started()
+        future = Future()
+        self.queue.put((input_arr, future))
+        return future.result()
+
+    def collect(self, first: PendingItem) -> List[PendingItem]:
+        pending = [first]
+        total = self.batch_of(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while total < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self.is_running = False
+                break
+            pending.append(item)
+            total += self.batch_of(item[0])
+        return pending
+
+    def loop(self):
+        while self.is_running:
+            first = self.queue.get()
+            if first is None:
+                break
+            pending = self.collect(first)
+            self.queue_depth.observe(self.queue.qsize())
+            buckets = {}
+            for item in pending:
+                buckets.setdefault(self.shape_key(item[0]), []).append(item)
+            for items in buckets.values():
+                for chunk in self.chunks(items):
+                    self.dispatch(chunk)
+        self.drain()
+
+    def chunks(self, items: List[PendingItem]):
+        chunk, total = [], 0
+        for item in items:
+            n = self.batch_of(item[0])
+            if chunk and total + n > self.max_batch:
+                yield chunk
+                chunk, total = [], 0
+            chunk.append(item)
+            total += n
+        if chunk:
+            yield chunk
+
+    def dispatch(self, chunk: List[PendingItem]):
+        if len(chunk) == 1:
+            return self.run_single(chunk[0])
+        sizes = [self.batch_of(item[0]) for item in chunk]
+        total = sum(sizes)
+        try:
+            merged = [np.concatenate(arrays, axis=0) for arrays in zip(*[item[0] for item in chunk])]
+            outputs = self.runner(*merged)
+        except Exception as e:
+            for _, future in chunk:
+                future.set_exception(e)
+            return
+        self.batch_size.observe(total)
+        if any(not isinstance(_, np.ndarray) or _.ndim == 0 or _.shape[0] != total for _ in outputs):
+            self.splittable = False
+            logger.warning(f"模型 [{self.name}] 输出不满足批次维度拆分条件, 已停用动态批处理")
+            for item in chunk:
+                self.run_single(item)
+            return
+        offsets = np.cumsum([0] + sizes)
+        for (_, future), start, end in zip(chunk, offsets[:-1], offsets[1:]):
+            future.set_result([output[start:end] for output in outputs])
+
+    def run_single(self, item: PendingItem):
+        input_arr, future = item
+        try:
+            future.set_result(self.runner(*input_arr))
+        except Exception as e:
+            future.set_exception(e)
+            return
+        self.batch_size.observe(self.batch_of(input_arr))
+
+    def drain(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[1].set_exception(RuntimeError("引擎已卸载或尚未初始化"))
+
+    def close(self):
+        self.is_running = False
+        if self.pid == os.getpid():
+            self.queue.put(None)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "enabled": self.splittable,
+            "queue_depth": self.queue_depth.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
+
+
+class WidthBuckets:
+    """
+    动态宽度分桶: 宽度向上取整到预设的桶宽, 同桶图片按背景值补齐后合并为一个批次, 会话只会见到少数几种输入尺寸;
+    超过最大桶宽时按 step 继续向上取整. 记录各桶的批次数、是否已预热 (首次调用耗时) 及补齐浪费比例
+    """
+
+    def __init__(self, widths: Sequence[int] = (), step: int = 0):
+        self.widths: Tuple[int, ...] = tuple(sorted({int(_) for _ in widths}))
+        if not step and self.widths:
+            step = self.widths[-1] - self.widths[-2] if len(self.widths) > 1 else self.widths[-1]
+        if int(step) <= 0:
+            raise ValueError("width_buckets 需为正整数 (步长) 或桶宽列表")
+        self.step = int(step)
+        self.padding_waste = Histogram(RATIO_BUCKETS)
+        self.buckets: Dict[int, dict] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, value) -> Optional["WidthBuckets"]:
+        if not value:
+            return None
+        if isinstance(value, int):
+            return cls(step=value)
+        return cls(widths=value)
+
+    def bucket(self, width: int) -> int:
+        idx = bisect.bisect_left(self.widths, width)
+        if idx < len(self.widths):
+            return self.widths[idx]
+        base = self.widths[-1] if self.widths else 0
+        return base + math.ceil((width - base) / self.step) * self.step
+
+    def group(self, widths: Sequence[int]) -> Dict[int, List[int]]:
+        """ 桶宽 -> 属于该桶的图片序号 """
+        groups = {}
+        for idx, width in enumerate(widths):
+            groups.setdefault(self.bucket(width), []).append(idx)
+        return groups
+
+    def state(self, bucket: int) -> dict:
+        if (state := self.buckets.get(bucket)) is None:
+            with self.lock:
+                state = self.buckets.setdefault(bucket, {"batches": 0, "images": 0, "warm": False, "cold_ms": None})
+        return state
+
+    def is_warm(self, bucket: int) -> bool:
+        return bucket in self.buckets and self.buckets[bucket]["warm"]
+
+    def mark_warm(self, bucket: int, cold_ms: float):
+        state = self.state(bucket)
+        with self.lock:
+            if not state["warm"]:
+                state["warm"], state["cold_ms"] = True, round(cold_ms, 3)
+
+    def observe_padding(self, bucket: int, widths: Sequence[int]):
+        self.padding_waste.observe(1 - sum(widths) / (bucket * len(widths)))
+        state = self.state(bucket)
+        with self.lock:
+            state["batches"] += 1
+            state["images"] += len(widths)
+
+    def warm_shapes(self, input_shape) -> List[tuple]:
+        """ 预热用的 [1, C, H, 桶宽] 尺寸, 仅适用于宽度为动态维度的模型 """
+        _, channel, height, width = input_shape
+        if not isinstance(width, str) or not isinstance(channel, int) or not isinstance(height, int):
+            return []
+        return [(1, channel, height, _) for _ in self.widths]
+
+    @property
+    def stats(self) -> dict:
+        with self.lock:
+            buckets = {str(k): dict(v) for k, v in sorted(self.buckets.items())}
+        return {
+            "widths": list(self.widths),
+            "step": self.step,
+            "padding_waste": self.padding_waste.snapshot(),
+            "buckets": buckets,
+        }
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import numpy as np
+from typing import List, Set, Dict, Tuple, Optional, Iterable
+
+Match = Tuple[float, int]
+
+
+class CorpusIndex:
+    """
+    语料倒排索引: 按行去重后的字符集合长度分桶, 每个桶内维护 字符 -> 行号 的倒排表,
+    查询时仅遍历与目标存在交集的候选行, 并按 Jaccard 上界提前结束
+    """
+
+    def __init__(self, lines: Iterable[str] = (), base: Optional["CorpusIndex"] = None):
+        self.lines: List[str] = list(dict.fromkeys(lines))
+        self.base = base
+        self.buckets: Dict[int, Dict[str, np.ndarray]] = {}
+        self._sets: Optional[List[Set[str]]] = None
+        postings: Dict[int, Dict[str, List[int]]] = {}
+        for line_id, line in enumerate(self.lines):
+            chars = set(line)
+            bucket = postings.setdefault(len(chars), {})
+            for char in chars:
+                bucket.setdefault(char, []).append(line_id)
+        for length, bucket in postings.items():
+            self.buckets[length] = {char: np.asarray(ids, dtype=np.int32) for char, ids in bucket.items()}
+
+    def __len__(self):
+        return len(self.lines) + (len(self.base) if self.base else 0)
+
+    @property
+    def all_lines(self) -> List[str]:
+        return self.lines + (self.base.all_lines if self.base else [])
+
+    @property
+    def all_sets(self) -> List[Set[str]]:
+        if self._sets is None:
+            self._sets = [set(_) for _ in self.all_lines]
+        return self._sets
+
+    def __iter__(self):
+        return iter((self.all_lines, self.all_sets))
+
+    def __getitem__(self, item):
+        return (self.all_lines, self.all_sets)[item]
+
+    def line(self, line_id: int) -> str:
+        if line_id < len(self.lines):
+            return self.lines[line_id]
+        return self.base.line(line_id - len(self.lines))
+
+    def local_top_k(self, target: Set[str], k: int) -> List[Match]:
+        size = len(target)
+        order = sorted(self.buckets.keys(), key=lambda n: min(size, n) / max(size, n, 1), reverse=True)
+        matches: List[Match] = []
+        for length in order:
+            bound = min(size, length) / max(size, length, 1)
+            if bound <= 0 or (len(matches) >= k and bound < matches[k - 1][0]):
+                break
+            bucket = self.buckets[length]
+            postings = [bucket[char] for char in target if char in bucket]
+            if not postings:
+                continue
+            ids, inter = np.unique(np.concatenate(postings), return_counts=True)
+            scores = inter / (size + length - inter)
+            top = np.lexsort((ids, -scores))[:k]
+            candidates = [(float(scores[i]), int(ids[i])) for i in top]
+            matches = sorted(matches + candidates, key=lambda t: (-t[0], t[1]))[:k]
+        return matches
+
+    def top_k_ids(self, target: Set[str], k: int) -> List[Match]:
+        matches = self.local_top_k(target, k) if target else []
+        if self.base:
+            offset = len(self.lines)
+            matches += [(score, offset + line_id) for score, line_id in self.base.top_k_ids(target, k)]
+            matches = sorted(matches, key=lambda t: (-t[0], t[1]))[:k]
+        return matches
+
+    def top_k(self, target: Set[str], k: int = 1) -> List[Tuple[float, str]]:
+        return [(score, self.line(line_id)) for score, line_id in self.top_k_ids(target, k)]
+
+    def best(self, target: Set[str]) -> str:
+        if matches := self.top_k(target, k=1):
+            return matches[0][1]
+        return self.line(0) if len(self) else ""
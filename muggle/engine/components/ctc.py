@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import math
+import numpy as np
+from typing import List, Tuple, Optional, Sequence, Set
+from muggle.categories import CATEGORIES_MAP
+from muggle.engine.components.corpus import CorpusIndex
+
+Items = List[Tuple[str, float]]
+EMPTY: Items = [("", 1.0)]
+NEG_INF = float('-inf')
+
+
+def log_add(a: float, b: float) -> float:
+    if a == NEG_INF:
+        return b
+    if b == NEG_INF:
+        return a
+    return max(a, b) + math.log1p(math.exp(-abs(a - b)))
+
+
+class CTCDecoder:
+    """
+    CTC 解码: 贪心解码对整个批次一次完成 (argmax / 合并重复 / 去除空白 / 逐字置信度),
+    配置了字符集、长度或语料约束时改用前缀束搜索; 多帧动图可按帧平均概率或按位置取最高分投票.
+    模型配置 model.yaml:
+        ctc_decoder: greedy / beam, beam_width: 束宽 (默认 10)
+        ctc_charset: CATEGORIES_MAP 中的名称 (如 Numeric) 或字符列表, 只在该字符集内解码
+        ctc_length: 定长 (如 4) 或 [最短, 最长]
+        ctc_corpus: true 时结果必须是语料 (corpus.txt, 无则内置语料) 中的一行
+    """
+
+    def __init__(
+            self,
+            categories: Sequence[str],
+            blank: int = 0,
+            charset: Optional[Sequence[str]] = None,
+            length: Optional[Tuple[int, Optional[int]]] = None,
+            lexicon: Optional[Sequence[str]] = None,
+            beam_width: int = 1,
+            prune: float = 1e-3,
+    ):
+        self.categories = np.asarray(list(categories), dtype=object)
+        self.blank = blank
+        self.allowed: Optional[np.ndarray] = None
+        if charset is not None:
+            charset = set(charset)
+            self.allowed = np.asarray([_ in charset for _ in categories], dtype=bool)
+            self.allowed[blank] = True
+        self.min_length, self.max_length = length if length else (0, None)
+        self.lexicon: Optional[Set[str]] = set(lexicon) if lexicon is not None else None
+        self._prefixes: Optional[Set[str]] = None
+        self.beam_width = max(int(beam_width), 1)
+        self.prune = prune
+
+    @classmethod
+    def from_config(cls, categories: Sequence[str], cfg: dict, corpus: Optional[CorpusIndex] = None) -> "CTCDecoder":
+        charset = cfg.get('ctc_charset')
+        if isinstance(charset, str) and charset in CATEGORIES_MAP:
+            charset = CATEGORIES_MAP[charset]
+        length = cfg.get('ctc_length')
+        if isinstance(length, int):
+            length = (length, length)
+        lexicon = None
+        if cfg.get('ctc_corpus') and corpus is not None and len(corpus):
+            lexicon = corpus.lines or corpus.all_lines
+        # 字符集约束贪心解码即可满足, 长度与语料约束需要束搜索
+        beam = cfg.get('ctc_decoder') == 'beam' or bool(length) or lexicon is not None
+        return cls(
+            categories,
+            charset=charset,
+            length=tuple(length) if length else None,
+            lexicon=lexicon,
+            beam_width=int(cfg.get('beam_width', 10)) if beam else 1,
+        )
+
+    @property
+    def prefixes(self) -> Set[str]:
+        if self._prefixes is None:
+            self._prefixes = {line[:i] for line in self.lexicon for i in range(1, len(line) + 1)}
+        return self._prefixes
+
+    @property
+    def constrained(self) -> bool:
+        return self.beam_width > 1 or self.lexicon is not None or self.min_length > 0 or self.max_length is not None
+
+    @classmethod
+    def softmax(cls, x: np.ndarray, axis=-1) -> np.ndarray:
+        x = np.exp(x - x.max(axis=axis, keepdims=True))
+        x /= x.sum(axis=axis, keepdims=True)
+        return x
+
+    @classmethod
+    def probabilities(cls, outputs: np.ndarray, apply_softmax: Optional[bool] = None) -> np.ndarray:
+        """ 未指定时按取值自动判断输出是否已经过 softmax """
+        outputs = np.asarray(outputs, dtype=np.float32)
+        if apply_softmax is None:
+            apply_softmax = outputs.min() < 0 or not np.allclose(outputs[..., :1, :].sum(-1), 1, atol=1e-3)
+        return cls.softmax(outputs) if apply_softmax else outputs
+
+    def items(self, chars, scores) -> Items:
+        return list(zip(chars, scores)) or list(EMPTY)
+
+    def greedy(self, probs: np.ndarray) -> List[Items]:
+        """ probs: [N, T, C]; 连续相同类别只保留一个, 其置信度取该段内的最大概率 """
+        if self.allowed is not None:
+            probs = np.where(self.allowed, probs, 0)
+        n, t = probs.shape[:2]
+        index = probs.argmax(-1)
+        confidence = np.take_along_axis(probs, index[..., np.newaxis], -1)[..., 0]
+        starts = np.ones((n, t), dtype=bool)
+        starts[:, 1:] = index[:, 1:] != index[:, :-1]
+        offsets = np.flatnonzero(starts)
+        run_index = index.ravel()[offsets]
+        run_score = np.maximum.reduceat(confidence.ravel(), offsets)
+        keep = run_index != self.blank
+        counts = np.bincount(offsets[keep] // t, minlength=n)
+        chars = self.categories[run_index[keep]].tolist()
+        scores = run_score[keep].tolist()
+        results, start = [], 0
+        for count in counts.tolist():
+            results.append(self.items(chars[start: start + count], scores[start: start + count]))
+            start += count
+        return results
+
+    def accept(self, text: str, length: int) -> bool:
+        if self.max_length is not None and length > self.max_length:
+            return False
+        return self.lexicon is None or text in self.prefixes
+
+    def complete(self, text: str, length: int) -> bool:
+        return length >= self.min_length and (self.lexicon is None or text in self.lexicon)
+
+    def beam_search(self, probs: np.ndarray) -> Items:
+        """
+        probs: [T, C]; 前缀束搜索, 每帧只扩展概率最高的 beam_width 个允许类别 (低于 prune 的忽略),
+        同一前缀的多条路径合并时逐字置信度取较大值
+        """
+        candidate_scores = np.where(self.allowed, probs, -1) if self.allowed is not None else probs.copy()
+        candidate_scores[:, self.blank] = -1
+        width = min(self.beam_width, probs.shape[1] - 1)
+        top = np.argpartition(-candidate_scores, width - 1, axis=1)[:, :width]
+        top_scores = np.take_along_axis(candidate_scores, top, axis=1)
+        log_probs = np.log(np.maximum(probs, 1e-30))
+        # 前缀 -> [以空白结尾的对数概率, 以字符结尾的对数概率, 文本, 逐字置信度]
+        beams = {(): [0.0, NEG_INF, "", ()]}
+        for t in range(probs.shape[0]):
+            lp, p_t = log_probs[t].tolist(), probs[t].tolist()
+            candidates = [c for c, score in zip(top[t].tolist(), top_scores[t].tolist()) if score >= self.prune]
+            step = {}
+
+            def entry(prefix, text, confidences):
+                if (current := step.get(prefix)) is None:
+                    current = step[prefix] = [NEG_INF, NEG_INF, text, confidences]
+                elif confidences != current[3]:
+                    current[3] = tuple(max(a, b) for a, b in zip(current[3], confidences))
+                return current
+
+            for prefix, (pb, pnb, text, confidences) in beams.items():
+                total = log_add(pb, pnb)
+                current = entry(prefix, text, confidences)
+                current[0] = log_add(current[0], total + lp[self.blank])
+                if prefix:
+                    last = prefix[-1]
+                    current = entry(prefix, text, confidences[:-1] + (max(confidences[-1], p_t[last]),))
+                    current[1] = log_add(current[1], pnb + lp[last])
+                for c in candidates:
+                    new_text = text + self.categories[c]
+                    if not self.accept(new_text, len(prefix) + 1):
+                        continue
+                    extended = entry(prefix + (c,), new_text, confidences + (p_t[c],))
+                    extended[1] = log_add(extended[1], (pb if prefix and c == prefix[-1] else total) + lp[c])
+            beams = dict(sorted(step.items(), key=lambda kv: log_add(kv[1][0], kv[1][1]), reverse=True)[:self.beam_width])
+        ranked = sorted(beams.items(), key=lambda kv: log_add(kv[1][0], kv[1][1]), reverse=True)
+        # 没有满足约束的完整结果时退回概率最高的前缀
+        prefix, (_, _, _, confidences) = next(
+            (kv for kv in ranked if self.complete(kv[1][2], len(kv[0]))), ranked[0]
+        )
+        return self.items(self.categories[list(prefix)].tolist(), list(confidences))
+
+    def decode(self, outputs: np.ndarray, apply_softmax: Optional[bool] = None) -> List[Items]:
+        """ outputs: [N, T, C] 或 [T, C] 的 logits / 概率 """
+        probs = self.probabilities(outputs, apply_softmax)
+        if probs.ndim == 2:
+            probs = probs[np.newaxis]
+        if not self.constrained:
+            return self.greedy(probs)
+        return [self.beam_search(_) for _ in probs]
+
+    def vote(self, outputs: np.ndarray, apply_softmax: Optional[bool] = None) -> Items:
+        """ 多帧投票: outputs 为 [F, T, C], 各帧概率取平均后解码 (要求各帧宽度一致) """
+        probs = self.probabilities(outputs, apply_softmax).mean(axis=0, keepdims=True)
+        return self.decode(probs, apply_softmax=False)[0]
+
+    @classmethod
+    def vote_items(cls, frame_items: List[Items]) -> List[list]:
+        """
+        按位置投票 (与原 GIFAllFramesCTCLogic 一致): 以首帧的字符数为准, 每个位置取各帧中置信度最高的字符,
+        同分取靠前的帧; 首帧为空时返回空列表, 某位置各帧置信度均不大于 0 时为 ["", 0]
+        """
+        if not frame_items or not (length := len(frame_items[0])):
+            return []
+        scores = np.zeros((len(frame_items), length))
+        chars = np.full((len(frame_items), length), "", dtype=object)
+        for idx, items in enumerate(frame_items):
+            items = items[:length]
+            if items:
+                chars[idx, :len(items)], scores[idx, :len(items)] = zip(*items)
+        positions = np.arange(length)
+        best = scores.argmax(axis=0)
+        return [
+            [char, score] if score > 0 else ["", 0]
+            for char, score in zip(chars[best, positions].tolist(), scores[best, positions].tolist())
+        ]
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import time
+import queue
+import threading
+import functools
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+from muggle.logger import logger
+from muggle.config import sys_args
+from muggle.metrics import metrics, Histogram, DEPTH_BUCKETS, LATENCY_BUCKETS
+
+StageItem = Tuple[Callable, tuple, dict, Future, float]
+
+
+class PipelineStage:
+    """
+    流水线阶段: 每个模型一组独立的工作线程与有界队列, 队列满时提交方阻塞 (背压);
+    请求线程提交后同步等待结果, 因此阶段不会增加并发, 只限制单个模型同时进行的会话调用数
+    """
+
+    def __init__(self, project_name: str, name: str, workers: int = 1, capacity: int = 8):
+        self.project_name = project_name
+        self.name = name
+        self.workers = max(int(workers), 1)
+        self.capacity = max(int(capacity), 1)
+        self.lock = threading.Lock()
+        # 提交与关闭互斥, 保证关闭后不会再有调用进入已无人消费的队列
+        self.submit_lock = threading.Lock()
+        self.pid = None
+        self.is_running = True
+        self.queue: Optional["queue.Queue[Optional[StageItem]]"] = None
+        self.threads = []
+        self.reset()
+
+    def reset(self):
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+        self.wait_ms = Histogram(LATENCY_BUCKETS)
+        self.processed = 0
+        self.busy = 0.
+        self.started_at = time.time()
+
+    def ensure_started(self):
+        # 工作线程不会随 fork 进入子进程, 每个进程在首次调用时各自启动
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=self.capacity)
+            self.reset()
+            self.threads = [
+                threading.Thread(target=self.loop, name=f"pipeline-{self.name}-{idx}", daemon=True)
+                for idx in range(self.workers)
+            ]
+            for thread in self.threads:
+                thread.start()
+            self.pid = os.getpid()
+
+    def call(self, fn: Callable, *args, **kwargs):
+        if threading.current_thread() in self.threads:
+            return fn(*args, **kwargs)
+        future = Future()
+        with self.submit_lock:
+            if self.is_running:
+                self.ensure_started()
+                self.queue_depth.observe(self.queue.qsize())
+                self.queue.put((fn, args, kwargs, future, time.perf_counter()))
+            else:
+                future = None
+        if future is None:
+            return fn(*args, **kwargs)
+        return future.result()
+
+    def loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            fn, args, kwargs, future, enqueued_at = item
+            st = time.perf_counter()
+            wait_ms = (st - enqueued_at) * 1000
+            self.wait_ms.observe(wait_ms)
+            metrics.observe("pipeline_wait", wait_ms, project=self.project_name, model=self.name)
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            with self.lock:
+                self.busy += time.perf_counter() - st
+                self.processed += 1
+
+    def close(self):
+        """ 已排队的调用执行完后工作线程退出, 之后的调用直接在请求线程中执行 """
+        with self.submit_lock:
+            self.is_running = False
+            if self.pid == os.getpid():
+                for _ in self.threads:
+                    self.queue.put(None)
+
+    @property
+    def stats(self) -> dict:
+        uptime = time.time() - self.started_at
+        with self.lock:
+            busy, processed = self.busy, self.processed
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "processed": processed,
+            "busy_s": round(busy, 3),
+            "uptime_s": round(uptime, 3),
+            "utilization": round(busy / (uptime * self.workers), 4) if uptime > 0 else 0,
+            "queue_depth": self.queue_depth.snapshot(),
+            "wait_ms": self.wait_ms.snapshot(),
+        }
+
+
+class StageEngine:
+    """ 流水线模式下的引擎代理: 推理方法提交到所属阶段执行, 其余属性直接转发给原引擎 """
+
+    methods = ('predict', 'batch_predict', 'batch_predict_rois', 'batch_outputs')
+
+    def __init__(self, engine, stage: PipelineStage):
+        self.engine = engine
+        self.stage = stage
+
+    def __getattr__(self, name):
+        attr = getattr(self.engine, name)
+        if name in self.methods and callable(attr):
+            return functools.partial(self.stage.call, attr)
+        return attr
+
+
+class Pipeline:
+    """
+    项目级流水线, 由项目参数 pipeline 开启, 用于限制每个模型的并发会话调用数 (以吞吐换取更稳定的尾延迟), 并非吞吐优化:
+        pipeline_workers: 每个阶段的工作线程数, 默认与推理线程池 (executor_workers) 相同;
+            不小于推理线程数时阶段不构成限制, 只增加线程交接开销, 此时不启用流水线
+        pipeline_queue: 每个阶段的队列长度 (默认 8)
+    """
+
+    pipelines: Dict[str, "Pipeline"] = {}
+
+    def __init__(self, project_name: str, cfg: dict):
+        self.project_name = project_name
+        self.executor_workers = int(sys_args.get('executor_workers') or sys_args.get('threads') or 1)
+        self.workers = int(cfg.get('pipeline_workers') or self.executor_workers)
+        self.capacity = int(cfg.get('pipeline_queue') or 8)
+        self.stages: Dict[str, PipelineStage] = {}
+
+    @classmethod
+    def enabled(cls, cfg: dict) -> bool:
+        return bool(cfg.get('pipeline'))
+
+    @classmethod
+    def create(cls, project_name: str, cfg: dict) -> Optional["Pipeline"]:
+        cls.remove(project_name)
+        pipeline = cls(project_name, cfg)
+        if pipeline.workers >= pipeline.executor_workers:
+            logger.warning(
+                f"项目 [{project_name}] 流水线每阶段线程 [{pipeline.workers}] 不小于推理线程数 [{pipeline.executor_workers}], "
+                f"不会限制模型并发, 已跳过流水线"
+            )
+            return None
+        cls.pipelines[project_name] = pipeline
+        logger.info(f"项目 [{project_name}] 已启用流水线, 每阶段线程 [{pipeline.workers}], 队列长度 [{pipeline.capacity}]")
+        return pipeline
+
+    def wrap(self, name: str, engine) -> StageEngine:
+        stage = self.stages.setdefault(name, PipelineStage(self.project_name, name, self.workers, self.capacity))
+        return StageEngine(engine, stage)
+
+    def close(self):
+        for stage in self.stages.values():
+            stage.close()
+
+    @classmethod
+    def remove(cls, project_name: str):
+        if pipeline := cls.pipelines.pop(project_name, None):
+            pipeline.close()
+
+    @classmethod
+    def stats(cls) -> Dict[str, dict]:
+        return {
+            project_name: {name: stage.stats for name, stage in pipeline.stages.items()}
+            for project_name, pipeline in list(cls.pipelines.items())
+        }
@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
 import cv2
+import time
 import PIL.Image
 import PIL.GifImagePlugin
-import PIL.ImageSequence
 import numpy as np
-from typing import Union
-from muggle.engine.base import ProjectEntity
+from typing import Union, List, Optional, Callable, Tuple
 from muggle.engine.model import ModelEntity, InputImage, GifImage, InputImages
+from muggle.gif import GifDecoder
+from muggle.engine.components.ctc import CTCDecoder, Items
+from muggle.engine.components.batching import WidthBuckets
+
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
 
 
 class ProcessUtils:
@@ -19,25 +24,44 @@ class ProcessUtils:
         self.model_entity = model_entity
         self.runtime_engine = self.model_entity.model_runtime
         self.model_cfg = model_entity.cfg
+        self.to_rgb = self.model_cfg.get("to_rgb", False)
+        mean = np.asarray(self.model_cfg.get("mean", MEAN), dtype=np.float32).reshape(-1, 1, 1)
+        std = np.asarray(self.model_cfg.get("std", STD), dtype=np.float32).reshape(-1, 1, 1)
+        # (x / 255 - mean) / std 合并为 x * scale + bias
+        self.scale = np.broadcast_to(1 / (255 * std), (3, 1, 1)).astype(np.float32)
+        self.bias = np.broadcast_to(-mean / std, (3, 1, 1)).astype(np.float32)
+        self.white = self.scale * 255 + self.bias
+        # 动态宽度补齐使用的背景像素值 (0-255), 未配置时补零
+        self.pad_value = self.model_cfg.get("pad_value")
+        self._ctc: Optional[CTCDecoder] = None
 
     @classmethod
     def gif_load_func(cls, im: GifImage) -> InputImages:
-        p = im.getpalette()
-        last_frame = im.convert('RGBA')
-        all_frames = []
-        try:
-            for frame in PIL.ImageSequence.Iterator(im):
-                if not frame.getpalette() and p:
-                    frame.putpalette(p)
-                new_frame = PIL.Image.new('RGBA', frame.size)
-                if frame.tile and frame.tile[0][1][2:] != frame.size:
-                    new_frame.paste(last_frame)
-                new_frame.paste(frame, (0, 0), frame.convert('RGBA'))
-                all_frames.append(new_frame)
-                last_frame = new_frame
-        except:
-            all_frames = [frame.convert("RGB") for frame in PIL.ImageSequence.Iterator(im)]
-        return all_frames
+        return GifDecoder.to_pil(GifDecoder.decode(im))
+
+    @property
+    def ctc(self) -> CTCDecoder:
+        """ CTC 引擎共用的解码器, 按模型类别与配置 (ctc_decoder / ctc_charset / ctc_length / ctc_corpus) 构建 """
+        if self._ctc is None:
+            self._ctc = CTCDecoder.from_config(self.model_entity.categories, self.model_cfg, self.model_entity.corpus)
+        return self._ctc
+
+    def ctc_decode(self, outputs: np.ndarray, apply_softmax: Optional[bool] = None) -> List[Items]:
+        """ outputs: [N, T, C] 的 logits / 概率, 返回每张图片的 [(字符, 置信度)] """
+        return self.ctc.decode(outputs, apply_softmax)
+
+    @property
+    def width_buckets(self) -> Optional[WidthBuckets]:
+        return getattr(self.runtime_engine, 'width_buckets', None)
+
+    def padding(self, channel: int):
+        """ 补齐区域在张量中的取值, 与 std_load_func 对同一像素值的变换一致 """
+        if self.pad_value is None:
+            return 0
+        pixel = float(self.pad_value)
+        if channel == 3:
+            return self.scale * pixel + self.bias
+        return pixel / 255 if channel == 1 else pixel
 
     @classmethod
     def softmax(cls, x, axis=1):
@@ -91,37 +115,185 @@ class ProcessUtils:
         w0 = int(h0 / h1 * w1)
         return w0, h0
 
-    def std_load_func(self, input_image: InputImage, input_shape=None):
-        to_rgb = self.model_cfg.get("to_rgb", False)
+    def load_shape(self, input_image: InputImage, input_shape=None):
         input_shape = self.runtime_engine.input_shape if input_shape is None else input_shape
+        w, h = self.resize_shape(input_image, input_shape[2:][::-1])
+        return input_shape[1], h, w
 
-        resize_shape = input_shape[2:][::-1]
+    def std_load_func(self, input_image: InputImage, input_shape=None, out: Optional[np.ndarray] = None):
+        to_rgb = self.to_rgb
+        input_shape = self.runtime_engine.input_shape if input_shape is None else input_shape
         if isinstance(input_image, list):
             input_image = input_image[0]
-        resize_shape = self.resize_shape(input_image, resize_shape)
-        im = input_image.resize(resize_shape, resample=PIL.Image.BILINEAR)
-        if im.mode in ['P', 'L'] and not to_rgb and input_shape[1] == 3:
+        channel, h, w = self.load_shape(input_image, input_shape)
+        im = input_image.resize((w, h), resample=PIL.Image.BILINEAR)
+        if im.mode in ['P', 'L'] and not to_rgb and channel == 3:
             im = im.convert("RGB")
         im = np.asarray(im)
-        shape = im.shape
-        if len(shape) > 2 and shape[2] == 4:
-            b, g, r, a = cv2.split(im)
-            mask = (a == 0)
-            b[mask] = 255
-            g[mask] = 255
-            r[mask] = 255
-            im = cv2.merge((b, g, r))
-        if to_rgb and len(shape) > 2:
-            im = cv2.cvtColor(im, cv2.COLOR_BGR2RGB)
-        elif to_rgb and len(shape) == 2:
-            im = cv2.cvtColor(im, cv2.COLOR_GRAY2RGB)
-        shape = im.shape
-        if input_shape[1] == 1 and len(shape) == 3:
-            im = cv2.cvtColor(im, cv2.COLOR_RGB2GRAY)
-            im = im[:, :] / 255.
-        elif input_shape[1] == 1 and len(shape) == 2:
-            im = im[np.newaxis, :, :]
-        elif input_shape[1] == 3 and len(shape) == 3:
-            im = self.normalize(im, [0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-        arr = np.array(im, dtype=np.float32)[:, :, :]
+
+        if channel == 3:
+            out = np.empty((3, h, w), dtype=np.float32) if out is None else out
+            if im.ndim == 2:
+                src = np.broadcast_to(im, (3, h, w))
+            else:
+                src = im.transpose(2, 0, 1)
+                src = src[2::-1] if to_rgb else src[:3]
+            np.multiply(src, self.scale, out=out)
+            out += self.bias
+            if im.ndim == 3 and im.shape[2] == 4:
+                np.copyto(out, self.white, where=(im[:, :, 3] == 0)[np.newaxis])
+            return out
+
+        if channel == 1:
+            out = np.empty((1, h, w), dtype=np.float32) if out is None else out
+            if im.ndim == 2 and not to_rgb:
+                # 单通道输入保持原始像素值
+                out[0] = im
+                return out
+            if im.ndim == 3:
+                code = {
+                    (3, False): cv2.COLOR_RGB2GRAY, (3, True): cv2.COLOR_BGR2GRAY,
+                    (4, False): cv2.COLOR_RGBA2GRAY, (4, True): cv2.COLOR_BGRA2GRAY,
+                }[(im.shape[2], bool(to_rgb))]
+                gray = cv2.cvtColor(im, code)
+                if im.shape[2] == 4:
+                    gray[im[:, :, 3] == 0] = 255
+            else:
+                gray = im
+            np.multiply(gray, np.float32(1 / 255.), out=out[0])
+            return out
+
+        arr = np.asarray(im, dtype=np.float32)
+        if out is not None:
+            out[...] = arr
+            return out
         return arr
+
+    @classmethod
+    def crop_boxes(cls, boxes) -> np.ndarray:
+        """ 与 PIL.Image.crop 一致: 坐标四舍五入为整数 """
+        boxes = np.asarray([list(_)[:4] for _ in boxes], dtype=np.float64).reshape(-1, 4)
+        return np.rint(boxes).astype(np.int64)
+
+    @classmethod
+    def crop_array(cls, src: np.ndarray, box) -> Optional[np.ndarray]:
+        """ 从 [H, W, K] 数组裁剪, 超出原图的部分补零 (同 PIL.Image.crop), 空框返回 None """
+        x0, y0, x1, y1 = box
+        if x1 <= x0 or y1 <= y0:
+            return None
+        height, width = src.shape[:2]
+        if x0 >= 0 and y0 >= 0 and x1 <= width and y1 <= height:
+            return src[y0:y1, x0:x1]
+        crop = np.zeros((y1 - y0, x1 - x0, src.shape[2]), dtype=src.dtype)
+        cx0, cy0, cx1, cy1 = max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)
+        if cx1 > cx0 and cy1 > cy0:
+            crop[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0] = src[cy0:cy1, cx0:cx1]
+        return crop
+
+    def roi_load_func(self, image: PIL.Image.Image, boxes, input_shape=None, out: Optional[np.ndarray] = None):
+        """
+        检测框批量裁剪 + 缩放: 整图只转换一次为数组, 各框由 cv2 缩放后写入同一块 [N, H, W, K] uint8 缓冲区,
+        再整批归一化到 [N, C, H, W] 张量, 不创建中间 PIL 图像; 结果与逐框 crop + std_load_func 的差异仅来自插值实现,
+        RGBA 图片仍由 PIL 逐框缩放 (预乘 alpha), 与原流程完全一致
+        """
+        input_shape = self.runtime_engine.input_shape if input_shape is None else input_shape
+        channel, h, w = input_shape[1:4]
+        boxes = self.crop_boxes(boxes)
+        if not all(isinstance(_, int) for _ in (h, w)) or channel not in (1, 3):
+            return self.batch_load_func([image.crop(tuple(_)) for _ in boxes.tolist()], input_shape, out=out)
+        to_rgb = self.to_rgb
+        if image.mode not in (('RGB', 'RGBA', 'L') if channel == 1 else ('RGB', 'RGBA')):
+            image = image.convert("RGB")
+        # RGBA 逐框由 PIL 缩放, 不需要整图数组
+        src = None if image.mode == 'RGBA' else np.asarray(image)
+        if src is not None and src.ndim == 2:
+            src = src[:, :, np.newaxis]
+        n, k = len(boxes), 4 if src is None else src.shape[2]
+        resized = np.zeros((n, h, w, k), dtype=np.uint8)
+        for idx, box in enumerate(boxes.tolist()):
+            if k == 4:
+                # PIL 缩放 RGBA 时预乘 alpha, 缩放后的透明边界与 cv2 不同, 会改变补白区域; RGBA 逐框由 PIL 缩放, 结果与原流程一致
+                if box[2] > box[0] and box[3] > box[1]:
+                    resized[idx] = np.asarray(image.crop(tuple(box)).resize((w, h), resample=PIL.Image.BILINEAR))
+                continue
+            if (crop := self.crop_array(src, box)) is None:
+                continue
+            # 缩小时 INTER_AREA 更接近 PIL 带抗锯齿的双线性插值
+            interpolation = cv2.INTER_AREA if crop.shape[0] > h and crop.shape[1] > w else cv2.INTER_LINEAR
+            resized[idx] = cv2.resize(crop, (w, h), interpolation=interpolation).reshape(h, w, k)
+
+        out = np.empty((n, channel, h, w), dtype=np.float32) if out is None else out[:n]
+        if channel == 3:
+            np.multiply((resized[..., 2::-1] if to_rgb else resized[..., :3]).transpose(0, 3, 1, 2), self.scale, out=out)
+            out += self.bias
+            if k == 4:
+                np.copyto(out, self.white, where=(resized[..., 3] == 0)[:, np.newaxis])
+            return out
+        if k == 1:
+            if not to_rgb:
+                # 单通道输入保持原始像素值
+                out[:, 0] = resized[..., 0]
+                return out
+            gray = resized[..., 0]
+        else:
+            code = {
+                (3, False): cv2.COLOR_RGB2GRAY, (3, True): cv2.COLOR_BGR2GRAY,
+                (4, False): cv2.COLOR_RGBA2GRAY, (4, True): cv2.COLOR_BGRA2GRAY,
+            }[(k, bool(to_rgb))]
+            gray = cv2.cvtColor(resized.reshape(n * h, w, k), code).reshape(n, h, w)
+            if k == 4:
+                gray[resized[..., 3] == 0] = 255
+        np.multiply(gray, np.float32(1 / 255.), out=out[:, 0])
+        return out
+
+    def dynamic_width(self, input_shape=None) -> bool:
+        input_shape = self.runtime_engine.input_shape if input_shape is None else input_shape
+        return isinstance(input_shape[3], str)
+
+    def batch_load_func(
+            self, input_images: List[InputImage], input_shape=None, out: Optional[np.ndarray] = None, shapes=None
+    ):
+        """
+        批量预处理, 直接写入预分配的 [N, C, H, W] 张量, 动态宽度按最大宽度 (启用分桶时为其所在桶宽) 右侧补齐
+        """
+        shapes = shapes or [self.load_shape(_, input_shape) for _ in input_images]
+        channel, h = shapes[0][0], shapes[0][1]
+        w = max(_[2] for _ in shapes)
+        if self.width_buckets and self.dynamic_width(input_shape):
+            w = self.width_buckets.bucket(w)
+        if out is None:
+            out = np.empty((len(input_images), channel, h, w), dtype=np.float32)
+        if any(_[2] != w for _ in shapes):
+            out[:len(input_images), :, :, :w] = self.padding(channel)
+        for idx, (input_image, shape) in enumerate(zip(input_images, shapes)):
+            self.std_load_func(input_image, input_shape, out=out[idx, :, :, :shape[2]])
+        return out[:len(input_images), :, :, :w]
+
+    def bucket_load_func(self, input_images: List[InputImage], input_shape=None) -> List[Tuple[List[int], np.ndarray]]:
+        """
+        按宽度分桶的批量预处理, 返回 [(图片序号, [n, C, H, 桶宽] 张量)];
+        未启用分桶或模型宽度固定时整体作为一个批次
+        """
+        shapes = [self.load_shape(_, input_shape) for _ in input_images]
+        if not self.width_buckets or not self.dynamic_width(input_shape):
+            return [(list(range(len(input_images))), self.batch_load_func(input_images, input_shape, shapes=shapes))]
+        batches = []
+        for bucket, indices in self.width_buckets.group([_[2] for _ in shapes]).items():
+            self.width_buckets.observe_padding(bucket, [shapes[_][2] for _ in indices])
+            batch = self.batch_load_func(
+                [input_images[_] for _ in indices], input_shape, shapes=[shapes[_] for _ in indices]
+            )
+            batches.append((indices, batch))
+        return batches
+
+    def bucket_predict(self, input_images: List[InputImage], fn: Callable[[np.ndarray], list], input_shape=None) -> list:
+        """ fn 接收一个桶的批量张量并返回逐张结果, 各桶结果按原始顺序合并 """
+        results = [None] * len(input_images)
+        for indices, batch in self.bucket_load_func(input_images, input_shape):
+            st = time.perf_counter()
+            outputs = fn(batch)
+            if self.width_buckets and not self.width_buckets.is_warm(batch.shape[3]):
+                self.width_buckets.mark_warm(batch.shape[3], (time.perf_counter() - st) * 1000)
+            for idx, output in zip(indices, outputs):
+                results[idx] = output
+        return results
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Set, Callable, Optional, Dict, List
+from muggle.config import sys_args
+from muggle.logger import logger
+from muggle.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def rss() -> Optional[int]:
+    from muggle.constants import memory_stats
+    return memory_stats().get("rss")
+
+
+class ResidencyState:
+    """
+    多工作进程时管理接口只会落到其中一个进程: 期望状态 (被手动卸载的项目) 写入共享文件,
+    各进程定期检查文件变化并将本进程的模型注册表与之对齐
+    """
+
+    FILENAME = "unloaded.json"
+
+    def __init__(self):
+        self.mtime = None
+        self.pid = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(sys_args.get('runtime_state_dir'), self.FILENAME)
+
+    def read(self) -> Set[str]:
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                return set(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return set()
+
+    def update(self, project_name: str, unloaded: bool) -> Set[str]:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                projects = self.read()
+                if unloaded:
+                    projects.add(project_name)
+                else:
+                    projects.discard(project_name)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf8") as f:
+                    json.dump(sorted(projects), f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self.mtime = self.stat()
+        return projects
+
+    def stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def changed(self) -> bool:
+        if (mtime := self.stat()) == self.mtime:
+            return False
+        self.mtime = mtime
+        return True
+
+    def watch(self, on_change: Callable[[Set[str]], None]):
+        """ 每个进程启动一个轮询线程, 仅在文件变化时回调 """
+        if self.pid == os.getpid():
+            return
+        self.pid = pid = os.getpid()
+        interval = float(sys_args.get('runtime_sync_interval') or 0)
+        if interval <= 0:
+            return
+
+        def loop():
+            while self.pid == pid:
+                time.sleep(interval)
+                if self.changed():
+                    on_change(self.read())
+
+        threading.Thread(target=loop, name="runtime-sync", daemon=True).start()
+
+    def reset(self):
+        """ 服务启动时 (fork 之前) 清空上次运行遗留的状态 """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.mtime = None
+
+
+class LRUResidency:
+    """
+    按需加载 (lazy_load): 启动时只索引项目, 首次请求时才创建会话; 已加载的项目按最近使用排序,
+    常驻模型超过 memory_budget 时淘汰最久未用且没有在途请求的项目; 按近期流量记录热度, 启动时及后台定期预取热点项目
+    """
+
+    HOT_FILENAME = "hot.json"
+
+    def __init__(self, model_manager):
+        self.model_manager = model_manager
+        self.recent: "OrderedDict[str, float]" = OrderedDict()
+        self.pins: Dict[str, int] = {}
+        self.scores: Dict[str, float] = {}
+        self.loading: Dict[str, threading.Lock] = {}
+        self.evicting: Set[str] = set()
+        self.lock = threading.Lock()
+        self.pid = None
+        self.cold_loads = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(sys_args.get('lazy_load'))
+
+    @property
+    def budget(self) -> Optional[int]:
+        budget = sys_args.get('memory_budget')
+        return int(float(budget) * 1024 ** 2) if budget else None
+
+    @property
+    def hot_path(self) -> str:
+        return os.path.join(sys_args.get('runtime_state_dir'), self.HOT_FILENAME)
+
+    @contextmanager
+    def use(self, project_name):
+        """ 请求期间固定项目不被淘汰; 返回本次是否触发了冷加载 """
+        if not self.enabled or not self.model_manager.project_entities.get(project_name):
+            yield False
+            return
+        cold = self.acquire(project_name)
+        try:
+            yield cold
+        finally:
+            with self.lock:
+                self.pins[project_name] -= 1
+
+    def acquire(self, project_name) -> bool:
+        with self.lock:
+            self.pins[project_name] = self.pins.get(project_name, 0) + 1
+            self.recent[project_name] = time.time()
+            self.recent.move_to_end(project_name)
+            self.scores[project_name] = self.scores.get(project_name, 0.) + 1
+            if project_name not in self.evicting and self.model_manager.is_loaded(project_name):
+                return False
+            load_lock = self.loading.setdefault(project_name, threading.Lock())
+        try:
+            return self.load(project_name, load_lock)
+        except BaseException:
+            with self.lock:
+                self.pins[project_name] -= 1
+            raise
+
+    def load(self, project_name, load_lock: threading.Lock) -> bool:
+        # 同一项目的并发首个请求只加载一次
+        with load_lock:
+            if self.model_manager.is_loaded(project_name):
+                return False
+            st = time.perf_counter()
+            self.model_manager.load_project(project_name)
+            consume = (time.perf_counter() - st) * 1000
+        metrics.observe("cold_load", consume, project=project_name)
+        self.cold_loads += 1
+        logger.info(f"项目 [{project_name}] 按需加载完成, 耗时 [{round(consume, 2)} 毫秒]")
+        self.evict(keep=project_name)
+        return True
+
+    def resident_bytes(self) -> int:
+        # 以创建会话时的内存增量计, 未测得时以模型文件大小估算
+        return sum(max(_['memory'] or 0, _['size'] or 0) for _ in self.model_manager.runtime_manager.resident())
+
+    def evict(self, keep=None):
+        if not (budget := self.budget):
+            return
+        while (used := self.resident_bytes()) > budget:
+            with self.lock:
+                # 未经请求加载的项目 (管理接口加载等) 视为最久未用
+                order = [_ for _ in self.model_manager.project_entities.all if _ not in self.recent] + list(self.recent)
+                candidates = [
+                    _ for _ in order if _ != keep and not self.pins.get(_) and self.model_manager.is_loaded(_)
+                ]
+                # 在锁内占住被淘汰项目的加载锁并标记, 此后到达的请求会等待卸载完成后重新加载, 不会用到正在释放的会话
+                for project_name in candidates:
+                    load_lock = self.loading.setdefault(project_name, threading.Lock())
+                    if load_lock.acquire(blocking=False):
+                        break
+                else:
+                    logger.warning(f"常驻模型 [{used / 1024 ** 2:.1f}MB] 超出预算, 但没有可淘汰的空闲项目")
+                    return
+                self.evicting.add(project_name)
+                self.recent.pop(project_name, None)
+            try:
+                self.model_manager.unload_project(project_name)
+            finally:
+                with self.lock:
+                    self.evicting.discard(project_name)
+                load_lock.release()
+            self.evictions += 1
+            logger.info(f"项目 [{project_name}] 已淘汰, 常驻模型 [{used / 1024 ** 2:.1f}MB] 超出预算")
+
+    def estimate(self, project_name) -> int:
+        project_entity = self.model_manager.project_entities.get(project_name)
+        size = 0
+        for model_name in project_entity.models.values():
+            for path in [
+                os.path.join(project_entity.project_path.model_dir, model_name, "model.onnx"),
+                os.path.join(project_entity.project_path.model_dir, model_name, "model.crypto"),
+            ]:
+                if os.path.exists(path):
+                    size += os.path.getsize(path)
+        return size
+
+    def hot(self) -> List[str]:
+        with self.lock:
+            return [_ for _ in sorted(self.scores, key=self.scores.get, reverse=True) if self.scores[_] >= 1]
+
+    def prefetch(self, project_names: List[str] = None) -> List[str]:
+        """ 按热度预取未加载的项目, 只使用预算内的剩余空间, 不为预取淘汰其他项目 """
+        if project_names is None:
+            project_names = self.hot() or self.read_hot()
+        budget, loaded = self.budget, []
+        for project_name in project_names[:int(sys_args.get('prefetch_projects') or 0)]:
+            if not self.model_manager.project_entities.get(project_name) or self.model_manager.is_loaded(project_name):
+                continue
+            if budget and self.resident_bytes() + self.estimate(project_name) > budget:
+                continue
+            try:
+                self.model_manager.load_project(project_name)
+            except Exception as e:
+                logger.warning(f"项目 [{project_name}] 预取失败: {e}")
+                continue
+            with self.lock:
+                self.recent.setdefault(project_name, time.time())
+                self.recent.move_to_end(project_name, last=False)
+            loaded.append(project_name)
+        if loaded:
+            logger.info(f"已预取热点项目 [{'|'.join(loaded)}]")
+        return loaded
+
+    def read_hot(self) -> List[str]:
+        try:
+            with open(self.hot_path, "r", encoding="utf8") as f:
+                return list(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def save_hot(self):
+        if not (hot := self.hot()):
+            return
+        try:
+            os.makedirs(os.path.dirname(self.hot_path) or ".", exist_ok=True)
+            tmp_path = f"{self.hot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf8") as f:
+                json.dump(hot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.hot_path)
+        except Exception as e:
+            logger.warning(f"热点项目写入失败: {e}")
+
+    def decay(self, factor=0.5):
+        with self.lock:
+            self.scores = {k: v * factor for k, v in self.scores.items() if v * factor >= 0.01}
+
+    def start(self):
+        """ 每个进程启动一个后台线程: 定期记录热点项目、衰减热度并预取 """
+        if not self.enabled or self.pid == os.getpid():
+            return
+        self.pid = pid = os.getpid()
+        interval = float(sys_args.get('prefetch_interval') or 0)
+        if interval <= 0:
+            return
+
+        def loop():
+            while self.pid == pid:
+                time.sleep(interval)
+                self.save_hot()
+                self.prefetch(self.hot())
+                self.decay()
+
+        threading.Thread(target=loop, name="runtime-prefetch", daemon=True).start()
+
+    def stats(self) -> dict:
+        with self.lock:
+            pinned = {k: v for k, v in self.pins.items() if v}
+            recent = list(self.recent)[::-1]
+        return {
+            "enabled": self.enabled,
+            "budget": self.budget,
+            "resident": self.resident_bytes(),
+            "cold_loads": self.cold_loads,
+            "evictions": self.evictions,
+            "recent": recent,
+            "pinned": pinned,
+            "hot": self.hot(),
+        }
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import mmap
+import importlib.util
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Optional
+from muggle.logger import logger
+
+# onnx 仅在拆分权重时用到, 导入较慢, 延迟到首次使用
+onnx_supported = importlib.util.find_spec("onnx") is not None
+
+ALIGNMENT = 64
+MIN_SHARED_BYTES = 1024
+
+
+def tensor_dtype(data_type) -> np.dtype:
+    import onnx
+    if hasattr(onnx.helper, 'tensor_dtype_to_np_dtype'):
+        return np.dtype(onnx.helper.tensor_dtype_to_np_dtype(data_type))
+    return np.dtype(onnx.mapping.TENSOR_TYPE_TO_NP_TYPE[data_type])
+
+
+@dataclass
+class SharedModel:
+    model_hash: str
+    buffer: mmap.mmap
+    graph: Optional[bytes] = None
+    initializers: List[Tuple[str, str, tuple, int]] = field(default_factory=list)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer)
+
+    @property
+    def model_bytes(self) -> bytes:
+        return bytes(self.buffer)
+
+    def external_initializers(self):
+        import onnxruntime
+        names, values = [], []
+        for name, dtype, shape, offset in self.initializers:
+            count = int(np.prod(shape)) if shape else 1
+            array = np.frombuffer(self.buffer, dtype=np.dtype(dtype), count=count, offset=offset).reshape(shape)
+            names.append(name)
+            values.append(onnxruntime.OrtValue.ortvalue_from_numpy(array))
+        return names, values
+
+
+class SharedModelStore:
+    """
+    预加载模式: 主进程一次性读取/解密模型, 写入匿名共享内存, fork 后的工作进程共享同一份物理内存;
+    安装了 onnx 时会将权重拆分为外部初始化器, 工作进程的会话直接引用共享内存中的权重
+    """
+
+    def __init__(self):
+        self.models: Dict[str, SharedModel] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(_.nbytes for _ in self.models.values())
+
+    @classmethod
+    def allocate(cls, size: int) -> mmap.mmap:
+        return mmap.mmap(-1, max(size, 1))
+
+    @classmethod
+    def split(cls, model_bytes: bytes):
+        import onnx
+        from onnx import TensorProto
+        model = onnx.ModelProto()
+        model.ParseFromString(model_bytes)
+        tensors = [
+            t for t in model.graph.initializer
+            if t.data_location != TensorProto.EXTERNAL and len(t.raw_data) >= MIN_SHARED_BYTES
+        ]
+        layout, size = [], 0
+        for tensor in tensors:
+            size = (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+            layout.append((tensor, size))
+            size += len(tensor.raw_data)
+        buffer = cls.allocate(size)
+        initializers = []
+        for tensor, offset in layout:
+            buffer[offset: offset + len(tensor.raw_data)] = tensor.raw_data
+            initializers.append((tensor.name, tensor_dtype(tensor.data_type).str, tuple(tensor.dims), offset))
+            tensor.ClearField('raw_data')
+            tensor.data_location = TensorProto.EXTERNAL
+            location = tensor.external_data.add()
+            location.key, location.value = 'location', 'shared'
+        return model.SerializeToString(), buffer, initializers
+
+    def add(self, model_hash: str, model_bytes: bytes) -> SharedModel:
+        if model_hash in self.models:
+            return self.models[model_hash]
+        shared_model = None
+        if onnx_supported:
+            try:
+                graph, buffer, initializers = self.split(model_bytes)
+                shared_model = SharedModel(model_hash, buffer, graph=graph, initializers=initializers)
+            except Exception as e:
+                logger.warning(f"模型 [{model_hash}] 权重拆分失败, 将共享完整模型: {e}")
+        if shared_model is None:
+            buffer = self.allocate(len(model_bytes))
+            buffer[:len(model_bytes)] = model_bytes
+            shared_model = SharedModel(model_hash, buffer)
+        self.models[model_hash] = shared_model
+        logger.info(
+            f"模型 [{model_hash}] 已写入共享内存 [{shared_model.nbytes / 1024 ** 2:.1f}MB], "
+            f"外部权重 [{len(shared_model.initializers)}]"
+        )
+        return shared_model
+
+    def remove(self, model_hash: str):
+        # 已 fork 的工作进程各自持有映射, 这里只释放本进程的引用
+        self.models.pop(model_hash, None)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import json
+import hashlib
+import onnxruntime
+from dataclasses import dataclass, asdict, fields
+from typing import Optional
+from muggle.config import sys_args, CPU_COUNT
+
+EXECUTION_MODE_MAP = {
+    'sequential': onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+GRAPH_OPTIMIZATION_MAP = {
+    'disable': onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+@dataclass
+class SessionProfile:
+    """
+    会话调优配置: 全局配置 startup_param.yaml -> session_options, 模型配置 model.yaml -> session,
+    模型配置优先; intra_op_num_threads 未指定时按 CPU核数 / 工作进程数 自动分配, 避免多进程抢占
+    """
+    intra_op_num_threads: Optional[int] = None
+    inter_op_num_threads: int = 1
+    execution_mode: str = 'sequential'
+    graph_optimization_level: str = 'all'
+    enable_cpu_mem_arena: bool = True
+    enable_mem_pattern: bool = True
+    optimized_cache: bool = False
+
+    @classmethod
+    def from_cfg(cls, *cfgs: Optional[dict]) -> "SessionProfile":
+        names = {_.name for _ in fields(cls)}
+        merged = {}
+        for cfg in cfgs:
+            merged.update({k: v for k, v in (cfg or {}).items() if k in names})
+        profile = cls(**merged)
+        if profile.execution_mode not in EXECUTION_MODE_MAP:
+            raise ValueError(f"execution_mode 仅支持 {list(EXECUTION_MODE_MAP.keys())}")
+        if profile.graph_optimization_level not in GRAPH_OPTIMIZATION_MAP:
+            raise ValueError(f"graph_optimization_level 仅支持 {list(GRAPH_OPTIMIZATION_MAP.keys())}")
+        if not profile.intra_op_num_threads:
+            profile.intra_op_num_threads = cls.auto_threads()
+        return profile
+
+    @classmethod
+    def auto_threads(cls) -> int:
+        return max(1, CPU_COUNT // max(int(sys_args.get('workers') or 1), 1))
+
+    def session_options(self) -> onnxruntime.SessionOptions:
+        sess_options = onnxruntime.SessionOptions()
+        sess_options.intra_op_num_threads = int(self.intra_op_num_threads)
+        sess_options.inter_op_num_threads = int(self.inter_op_num_threads)
+        sess_options.execution_mode = EXECUTION_MODE_MAP[self.execution_mode]
+        sess_options.graph_optimization_level = GRAPH_OPTIMIZATION_MAP[self.graph_optimization_level]
+        sess_options.enable_cpu_mem_arena = bool(self.enable_cpu_mem_arena)
+        sess_options.enable_mem_pattern = bool(self.enable_mem_pattern)
+        return sess_options
+
+    def cache_path(self, model_hash: str, providers: list) -> str:
+        key = json.dumps({
+            "hash": model_hash,
+            "profile": {k: v for k, v in asdict(self).items() if k != 'optimized_cache'},
+            "providers": providers,
+            "version": onnxruntime.__version__,
+        }, sort_keys=True)
+        cache_dir = sys_args.get('optimized_cache_dir') or os.path.join(".cache", "optimized")
+        return os.path.join(cache_dir, f"{hashlib.md5(key.encode('utf8')).hexdigest()}.onnx")
+
+    def describe(self) -> str:
+        return ", ".join(f"{k}={v}" for k, v in asdict(self).items())
@@ -9,20 +9,27 @@ import pkgutil
 import yaml
 import base64
 import threading
+from contextlib import contextmanager
 import PIL.Image
 import PIL.GifImagePlugin
 import onnxruntime
 import numpy as np
 from abc import abstractmethod
 from muggle.logger import logger
-from typing import List, Tuple, Dict, Union, TypeVar, Set
+from typing import List, Tuple, Dict, Union, TypeVar, Set, Optional
 from dataclasses import dataclass, field
-from muggle.config import sys_args, MUGGLE_DIR, sys_args
+from muggle.config import sys_args, MUGGLE_DIR, SYSTEM
 from muggle.engine.utils import Path, MODEL_PATH, PROJECT_PATH
 from muggle.entity import RuntimeType
 from muggle.exception import ModelException
 from muggle.engine.project import ProjectEntity, ProjectEntities
+from muggle.engine.components.batching import BatchScheduler, WidthBuckets
+from muggle.engine.components.corpus import CorpusIndex
+from muggle.engine.components.shared import SharedModel, SharedModelStore
+from muggle.engine.components.tuning import SessionProfile
+from muggle.engine.components.residency import ResidencyState, LRUResidency, rss
 from muggle.categories import CATEGORIES_MAP
+from muggle.metrics import metrics
 
 
 RUNTIME_MAP = {
@@ -57,6 +64,13 @@ class RuntimeEngine:
         self.path_or_bytes = path_or_bytes
         self._hash = None
         self._session = None
+        self.batcher: Optional[BatchScheduler] = None
+        self.width_buckets: Optional[WidthBuckets] = None
+        self.shape_counts: Dict[tuple, int] = {}
+        self.shape_lock = threading.Lock()
+        self.untracked = threading.local()
+        # 创建会话前后的进程 RSS 差值, 并发加载时仅供参考
+        self.memory: Optional[int] = None
 
     @property
     @abstractmethod
@@ -69,6 +83,10 @@ class RuntimeEngine:
             raise RuntimeError("引擎已卸载或尚未初始化")
         return self._session
 
+    @property
+    def is_loaded(self) -> bool:
+        return self._session is not None
+
     @classmethod
     @abstractmethod
     def cuda_available(cls): pass
@@ -85,29 +103,71 @@ class RuntimeEngine:
     def run(self, *input_arr):
         pass
 
+    def enable_batching(self, max_batch: int, max_wait_ms: float):
+        if self.batcher:
+            return self.batcher
+        self.batcher = BatchScheduler(self.session_run, max_batch, max_wait_ms, name=self.hash)
+        logger.info(f"模型 [{self.hash}] 已启用动态批处理, max_batch [{max_batch}], max_wait_ms [{max_wait_ms}]")
+        return self.batcher
+
+    def enable_width_buckets(self, value):
+        if self.width_buckets:
+            return self.width_buckets
+        self.width_buckets = WidthBuckets.from_config(value)
+        logger.info(f"模型 [{self.hash}] 已启用宽度分桶 [{value}]")
+        return self.width_buckets
+
+    @abstractmethod
+    def session_run(self, *input_arr):
+        pass
+
+    def observe_shape(self, input_arr):
+        if getattr(self.untracked, 'active', False):
+            return
+        if input_arr and (shape := getattr(input_arr[0], 'shape', None)) is not None:
+            with self.shape_lock:
+                self.shape_counts[shape] = self.shape_counts.get(shape, 0) + 1
+
+    def pop_shape_counts(self) -> Dict[tuple, int]:
+        with self.shape_lock:
+            shape_counts, self.shape_counts = self.shape_counts, {}
+        return shape_counts
+
+    @contextmanager
+    def untracked_shapes(self):
+        """ 当前线程内的调用不计入输入尺寸统计 (预热使用的假数据), 其他线程的线上流量照常记录 """
+        self.untracked.active = True
+        try:
+            yield
+        finally:
+            self.untracked.active = False
+
     def release(self):
-        if self._session is None:
+        if self._session is None and getattr(self, 'shared_model', None) is None:
             raise RuntimeError("引擎已卸载或尚未初始化")
-        del self._session
+        if self.batcher:
+            self.batcher.close()
+            self.batcher = None
+        if hasattr(self, 'shared_model'):
+            self.shared_model = None
+        self._session = None
         del self
 
 
 class ONNXRuntimeEngine(RuntimeEngine):
 
-    def __init__(self, model_bytes):
+    def __init__(self, model_bytes, shared_model: SharedModel = None, profile: SessionProfile = None, cacheable=True):
         super(ONNXRuntimeEngine, self).__init__(model_bytes)
-        self.sess_options = onnxruntime.SessionOptions()
-
-        # self.sess_options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
-        # self.sess_options.intra_op_num_threads = multiprocessing.cpu_count()
-        # self.sess_options.inter_op_num_threads = 24
-        # self.sess_options.intra_op_num_threads = multiprocessing.cpu_count() // 2
-        # self.sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
-        # self.sess_options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
-        # self.model_bytes = model_bytes
+        self.profile = profile or SessionProfile.from_cfg(sys_args.get('session_options'))
+        self.cacheable = cacheable
+        self.shared_model = shared_model
+        self.shared_values = None
+        self.lock = threading.Lock()
+        self.outputs_names, self.inputs_names = [], []
+        if shared_model:
+            self._hash = shared_model.model_hash
+            return
         self.set_session(self.path_or_bytes)
-        self.outputs_names = [_.name for _ in self.session.get_outputs()]
-        self.inputs_names = [_.name for _ in self.session.get_inputs()]
         # self.warm_up()
 
     @property
@@ -116,17 +176,85 @@ class ONNXRuntimeEngine(RuntimeEngine):
             raise RuntimeError(f"[ONNXRuntimeEngine] 尚未初始化")
         return self._hash
 
-    def set_session(self, model_bytes):
-        sess_options = onnxruntime.SessionOptions()
-        providers = [p for p in onnxruntime.get_available_providers() if p in [
+    @property
+    def session(self):
+        if self._session is None and self.shared_model is not None:
+            self.load_shared()
+        return super().session
+
+    @classmethod
+    def providers(cls):
+        return [p for p in onnxruntime.get_available_providers() if p in [
             'CUDAExecutionProvider', 'CPUExecutionProvider'
         ]]
-        self._session = onnxruntime.InferenceSession(
-            model_bytes, sess_options, providers=providers
-        )
-        self._hash = hashlib.md5(self.path_or_bytes).hexdigest()
+
+    def set_session(self, model_bytes):
+        self._hash = hashlib.md5(model_bytes).hexdigest()
+        before = rss()
+        sess_options = self.profile.session_options()
+        if self.cacheable and self.profile.optimized_cache:
+            self._session = self.cached_session(model_bytes, sess_options)
+        else:
+            self._session = onnxruntime.InferenceSession(
+                model_bytes, sess_options, providers=self.providers()
+            )
         self._session._model_bytes = None
         self.path_or_bytes = None
+        self.set_io_names()
+        self.memory = (rss() - before) if before is not None else None
+
+    def cached_session(self, model_bytes, sess_options):
+        cache_path = self.profile.cache_path(self._hash, self.providers())
+        if os.path.exists(cache_path):
+            try:
+                sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+                session = onnxruntime.InferenceSession(cache_path, sess_options, providers=self.providers())
+                logger.info(f"模型 [{self._hash}] 已加载优化缓存 [{cache_path}]")
+                return session
+            except Exception as e:
+                logger.warning(f"模型 [{self._hash}] 优化缓存加载失败, 将重新生成: {e}")
+                sess_options = self.profile.session_options()
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            sess_options.optimized_model_filepath = tmp_path
+            session = onnxruntime.InferenceSession(model_bytes, sess_options, providers=self.providers())
+            os.replace(tmp_path, cache_path)
+            return session
+        except Exception as e:
+            logger.warning(f"模型 [{self._hash}] 优化缓存写入失败: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return onnxruntime.InferenceSession(
+            model_bytes, self.profile.session_options(), providers=self.providers()
+        )
+
+    def set_io_names(self):
+        self.outputs_names = [_.name for _ in self._session.get_outputs()]
+        self.inputs_names = [_.name for _ in self._session.get_inputs()]
+
+    def load_shared(self):
+        with self.lock:
+            if self._session is not None:
+                return
+            shared_model = self.shared_model
+            before = rss()
+            sess_options = self.profile.session_options()
+            if shared_model.graph is not None:
+                names, values = shared_model.external_initializers()
+                if names:
+                    sess_options.add_session_config_entry('session.disable_prepacking', '1')
+                    sess_options.add_external_initializers(names, values)
+                self.shared_values = values
+                session = onnxruntime.InferenceSession(shared_model.graph, sess_options, providers=self.providers())
+            else:
+                session = onnxruntime.InferenceSession(
+                    shared_model.model_bytes, sess_options, providers=self.providers()
+                )
+            session._model_bytes = None
+            self._session = session
+            self.set_io_names()
+            self.memory = (rss() - before) if before is not None else None
 
     @property
     def input_shape(self) -> InputShape:
@@ -142,9 +270,16 @@ class ONNXRuntimeEngine(RuntimeEngine):
         return 'CUDAExecutionProvider' in onnxruntime.get_available_providers() and onnxruntime.get_device() == 'GPU'
 
     def run(self, *input_arr):
-        return self.session.run(
-            self.outputs_names, {input_name: input_arr[idx] for idx, input_name in enumerate(self.inputs_names)}
-        )
+        if self.batcher:
+            return self.batcher.submit(*input_arr)
+        return self.session_run(*input_arr)
+
+    def session_run(self, *input_arr):
+        self.observe_shape(input_arr)
+        with metrics.timer("runtime", model=self._hash):
+            return self.session.run(
+                self.outputs_names, {input_name: input_arr[idx] for idx, input_name in enumerate(self.inputs_names)}
+            )
 
 
 RuntimeEngineType = TypeVar('RuntimeEngineType', bound=RuntimeEngine)
@@ -155,6 +290,11 @@ class RuntimeManager:
     def __init__(self):
         self.engine_type: RuntimeType = RUNTIME_MAP[sys_args.get('engine_backend')]
         self.session_map = {}
+        # 模型哈希 -> 引用该会话的 项目/模型, 最后一个引用释放时才卸载
+        self.owners: Dict[str, Set[str]] = {}
+        self.model_info: Dict[str, dict] = {}
+        self.lock = threading.RLock()
+        self.shared_store: Optional[SharedModelStore] = SharedModelStore() if self.preload else None
         if self.engine_type == RuntimeType.ONNXRuntime:
             self.runtime_engine = ONNXRuntimeEngine
         else:
@@ -162,6 +302,10 @@ class RuntimeManager:
         cuda_available = self.runtime_engine.cuda_available()
         logger.info(f'当前设备类型 [{"GPU" if cuda_available else "CPU"}]')
 
+    @property
+    def preload(self) -> bool:
+        return bool(sys_args.get('preload')) and SYSTEM != 'Windows'
+
     @classmethod
     def read_model(cls, model_path, independent_key=None, open_fn=builtins.open):
         ext = os.path.splitext(model_path)[-1]
@@ -180,23 +324,97 @@ class RuntimeManager:
     def calc_hash(cls, model_bytes):
         return hashlib.md5(model_bytes).hexdigest()
 
-    def add(self, model_path, independent_key=None, open_fn=builtins.open) -> RuntimeEngineType:
+    def add(
+            self, model_path, independent_key=None, open_fn=builtins.open, session_cfg=None, owner=None
+    ) -> RuntimeEngineType:
         model_bytes = self.read_model(model_path, independent_key=independent_key, open_fn=open_fn)
-        if (model_hash := self.calc_hash(model_bytes)) in self.session_map:
+        model_hash = self.calc_hash(model_bytes)
+        with self.lock:
+            if model_hash not in self.session_map:
+                self.session_map[model_hash] = self.create(model_path, model_hash, model_bytes, session_cfg)
+                self.model_info[model_hash] = {"path": model_path, "size": len(model_bytes), "loaded_at": time.time()}
+            if owner:
+                self.owners.setdefault(model_hash, set()).add(owner)
             return self.session_map[model_hash]
-        self.session_map[model_hash] = self.runtime_engine(model_bytes)
-        return self.session_map[model_hash]
+
+    def create(self, model_path, model_hash, model_bytes, session_cfg=None) -> RuntimeEngineType:
+        profile = SessionProfile.from_cfg(sys_args.get('session_options'), session_cfg)
+        # 加密模型不落盘优化后的明文图
+        cacheable = os.path.splitext(model_path)[-1] != '.crypto'
+        if self.shared_store is not None:
+            shared_model = self.shared_store.add(model_hash, model_bytes)
+            runtime_engine = self.runtime_engine(None, shared_model=shared_model, profile=profile, cacheable=False)
+        else:
+            runtime_engine = self.runtime_engine(model_bytes, profile=profile, cacheable=cacheable)
+        logger.info(f"模型 [{model_hash}] 会话配置 [{profile.describe()}]")
+        return runtime_engine
+
+    def release(self, model_hash: str, owner: str) -> bool:
+        """ 释放 owner 对会话的引用, 没有其他引用时卸载会话并返回 True """
+        with self.lock:
+            owners = self.owners.get(model_hash, set())
+            owners.discard(owner)
+            if owners or model_hash not in self.session_map:
+                return False
+            runtime_engine = self.session_map.pop(model_hash)
+            self.owners.pop(model_hash, None)
+            self.model_info.pop(model_hash, None)
+            if self.shared_store is not None:
+                self.shared_store.remove(model_hash)
+        if runtime_engine.is_loaded or getattr(runtime_engine, 'shared_model', None) is not None:
+            runtime_engine.release()
+        logger.info(f"模型 [{model_hash}] 已卸载")
+        return True
+
+    def resident(self) -> List[dict]:
+        with self.lock:
+            items = [(k, v, sorted(self.owners.get(k, [])), self.model_info.get(k, {})) for k, v in self.session_map.items()]
+        return [{
+            "model_hash": model_hash,
+            "owners": owners,
+            "path": info.get('path'),
+            "size": info.get('size'),
+            "loaded": runtime_engine.is_loaded,
+            "memory": runtime_engine.memory,
+            "batching": runtime_engine.batcher is not None,
+            "loaded_at": info.get('loaded_at'),
+        } for model_hash, runtime_engine, owners, info in items]
+
+    def load_all(self):
+        for runtime_engine in self.session_map.values():
+            if getattr(runtime_engine, 'shared_model', None) is not None:
+                runtime_engine.load_shared()
 
     def get(self, model_hash: str) -> RuntimeEngineType:
         return self.session_map.get(model_hash)
 
+    def enable_batching(self, model_hash: str, max_batch: int, max_wait_ms: float):
+        if not (runtime_engine := self.get(model_hash)):
+            raise RuntimeError(f"模型 [{model_hash}] 不存在")
+        return runtime_engine.enable_batching(max_batch, max_wait_ms)
+
+    def enable_width_buckets(self, model_hash: str, value):
+        if not (runtime_engine := self.get(model_hash)):
+            raise RuntimeError(f"模型 [{model_hash}] 不存在")
+        return runtime_engine.enable_width_buckets(value)
+
+    def batching_stats(self) -> Dict[str, dict]:
+        stats = {}
+        for model_hash, runtime_engine in self.session_map.items():
+            item = runtime_engine.batcher.stats if runtime_engine.batcher else {}
+            if runtime_engine.width_buckets:
+                item["width_buckets"] = runtime_engine.width_buckets.stats
+            if item:
+                stats[model_hash] = item
+        return stats
+
 
 @dataclass
 class ModelEntity:
     model_name: str = field(default_factory=str)
     model_path: str = field(default_factory=str)
     categories: list = field(default_factory=list)
-    corpus: tuple = field(default_factory=lambda: tuple([[], []]))
+    corpus: CorpusIndex = field(default_factory=CorpusIndex)
     cfg: dict = field(default_factory=lambda: {})
     model_runtime: RuntimeEngine = None
 
@@ -222,7 +440,7 @@ class ModelEntity:
         self.model_name = model_name
         self.cfg = cfg
         self.categories = categories if categories else []
-        self.corpus = corpus if corpus else ([], [])
+        self.corpus = corpus if corpus is not None else CorpusIndex()
 
 
 class ModelManager:
@@ -230,44 +448,151 @@ class ModelManager:
     def __init__(self, project_entities: ProjectEntities):
         self.runtime_manager: RuntimeManager = RuntimeManager()
         self.project_entities: ProjectEntities = project_entities
-        self.builtin_corpus: Tuple[List[str], List[Set[str]]] = self.get_builtin_corpus()
+        self._builtin_corpus: Optional[CorpusIndex] = None
+        # 项目/模型 -> 模型实体; 不同项目可能共用同一会话, 但类别与配置各自独立
         self.model_maps: Dict[str, ModelEntity] = {}
-        self.path_maps: Dict[str, str] = {}
-        self.iter_models()
+        self.lock = threading.RLock()
+        self.residency = ResidencyState()
+        self.lru = LRUResidency(self)
+        self.loaded = False
+        self.loading = False
+
+    @property
+    def builtin_corpus(self) -> Optional[CorpusIndex]:
+        if self._builtin_corpus is None and sys_args.get('use_builtin_corpus', True):
+            self._builtin_corpus = self.get_builtin_corpus()
+        return self._builtin_corpus
+
+    def load(self):
+        """ 导入时只索引项目, 首次使用 (或服务启动 fork 之前) 才加载模型, 重复调用无开销 """
+        if self.loaded:
+            return
+        with self.lock:
+            # 其他线程在锁上等待加载完成; 加载过程中同一线程的重入直接返回
+            if self.loaded or self.loading:
+                return
+            self.loading = True
+            try:
+                self.iter_models()
+            finally:
+                self.loading = False
+            self.loaded = True
+        if loaded_project_names := '|'.join(self.project_entities.all.keys()):
+            logger.info(f"加载引擎 [{loaded_project_names}]")
 
     def timer_release(self, project_name, seconds=60):
         def unload():
-            project_entity = self.project_entities.get(project_name)
-            for _, model_name in project_entity.models.items():
-                model_entity = self.from_project(project_name, model_name)
-                model_entity.model_runtime.release()
+            self.unload_project(project_name)
             self.project_entities.remove(project_name)
             logger.info(f"项目 [{project_name}] 已到期释放")
         th = threading.Timer(seconds, unload)
         th.start()
 
-    def from_id(self, model_id) -> ModelEntity:
-        return self.model_maps.get(model_id)
+    @classmethod
+    def model_key(cls, project_name, model_name) -> str:
+        return f"{project_name}/{model_name}"
 
     def from_project(self, project_name, model_name) -> ModelEntity:
-        model_id = self.path_maps.get(f"{project_name}/{model_name}")
-        return self.from_id(model_id)
+        self.load()
+        return self.model_maps.get(self.model_key(project_name, model_name))
+
+    def is_loaded(self, project_name) -> bool:
+        self.load()
+        project_entity = self.project_entities.get(project_name)
+        return bool(project_entity) and all(
+            self.model_key(project_name, model_name) in self.model_maps for model_name in project_entity.models.values()
+        )
+
+    def register(self, project_entity: ProjectEntity, model_name, model_entity: ModelEntity):
+        self.model_maps[self.model_key(project_entity.project_name, model_name)] = model_entity
+        self.setup_batching(project_entity, model_entity)
+
+    def load_project(self, project_name, notify=True) -> List[str]:
+        """ 从磁盘加载项目的全部模型, 已加载的跳过, 返回新加载的模型名 """
+        project_entity = self.project_entities.get(project_name)
+        if not project_entity:
+            raise RuntimeError(f"项目 [{project_name}] 不存在")
+        loaded = []
+        with self.lock:
+            for model_name in project_entity.models.values():
+                if (key := self.model_key(project_name, model_name)) in self.model_maps:
+                    continue
+                model_path = Path.model_path(project_entity.project_path, model_name)
+                if not (model_entity := self.get_model(model_name, model_path, owner=key)):
+                    continue
+                self.register(project_entity, model_name, model_entity)
+                loaded.append(model_name)
+        if loaded and notify:
+            self.project_entities.notify(project_name)
+        return loaded
+
+    def unload_project(self, project_name) -> List[str]:
+        """ 释放项目对各会话的引用, 返回实际卸载的模型哈希 (仍被其他项目使用的会话保留) """
+        prefix = self.model_key(project_name, "")
+        released = []
+        with self.lock:
+            for key in [_ for _ in self.model_maps if _.startswith(prefix)]:
+                model_entity = self.model_maps.pop(key)
+                if self.runtime_manager.release(model_entity.model_hash, key):
+                    released.append(model_entity.model_hash)
+        self.project_entities.notify(project_name)
+        return released
+
+    def set_resident(self, project_name, resident: bool) -> List[str]:
+        """ 管理接口: 本进程立即加载/卸载, 并写入共享状态由其他工作进程同步 """
+        if not self.project_entities.get(project_name):
+            raise RuntimeError(f"项目 [{project_name}] 不存在")
+        self.load()
+        result = self.load_project(project_name) if resident else self.unload_project(project_name)
+        self.residency.update(project_name, unloaded=not resident)
+        return result
+
+    def sync(self, unloaded: Set[str]):
+        for project_name, project_entity in list(self.project_entities.all.items()):
+            # 内存导入的项目无法从磁盘重新加载, 不参与同步
+            if not os.path.exists(project_entity.project_path.config_path):
+                continue
+            try:
+                if project_name in unloaded and self.is_loaded(project_name):
+                    self.unload_project(project_name)
+                elif project_name not in unloaded and not self.is_loaded(project_name) and not self.lru.enabled:
+                    self.load_project(project_name)
+            except Exception as e:
+                logger.warning(f"项目 [{project_name}] 同步加载状态失败: {e}")
+
+    def start_sync(self):
+        self.residency.watch(self.sync)
+        self.lru.start()
+
+    def resident(self) -> dict:
+        self.load()
+        models = self.runtime_manager.resident()
+        return {
+            "projects": {
+                project_name: self.is_loaded(project_name) for project_name in self.project_entities.all
+            },
+            "models": models,
+            "size": sum(_['size'] or 0 for _ in models),
+            "memory": sum(_['memory'] or 0 for _ in models),
+            "rss": rss(),
+            "lazy_load": self.lru.stats() if self.lru.enabled else None,
+        }
 
     @classmethod
-    def get_corpus(cls, path, open_fn=builtins.open) -> Tuple[List[str], List[Set[str]]]:
+    def get_corpus(cls, path, open_fn=builtins.open, base: CorpusIndex = None) -> CorpusIndex:
         lines = open_fn(path, encoding="utf-8").read().splitlines(False)[::-1]
-        return lines, [set(i) for i in lines]
+        return CorpusIndex(lines, base=base)
 
     @classmethod
-    def get_builtin_corpus(cls) -> Tuple[List[str], List[Set[str]]]:
+    def get_builtin_corpus(cls) -> CorpusIndex:
         if os.path.exists(raw_path := os.path.join(MUGGLE_DIR, "corpus", "builtin.dict")):
             lines = open(raw_path, "r", encoding="utf8").read().splitlines(False)[::-1]
             logger.info('发现并加载 [内置语料字典]')
         else:
             lines = pkgutil.get_data("muggle.corpus", "builtin.dict").decode("utf8").splitlines(False)[::-1]
-        return lines, [set(i) for i in lines]
+        return CorpusIndex(lines)
 
-    def get_model(self, model_name, model_path: MODEL_PATH, open_fn=builtins.open, fs=None):
+    def get_model(self, model_name, model_path: MODEL_PATH, open_fn=builtins.open, fs=None, owner=None):
 
         def exists(x):
             return os.path.exists(x) or x in getattr(fs, 'files', [])
@@ -284,22 +609,23 @@ class ModelManager:
             categories = []
 
         if exists(model_path.corpus_path):
-            attach_corpus: Tuple[List[str], List[Set[str]]] = self.get_corpus(model_path.corpus_path, open_fn=open_fn)
+            corpus = self.get_corpus(model_path.corpus_path, open_fn=open_fn, base=self.builtin_corpus)
         else:
-            attach_corpus: Tuple[List[str], List[Set[str]]] = [], []
-
-        corpus = (attach_corpus[0] + self.builtin_corpus[0], attach_corpus[1] + self.builtin_corpus[1])
+            corpus = self.builtin_corpus if self.builtin_corpus else CorpusIndex()
         model_entity = ModelEntity()
         if exists(model_path.crypto_path):
             independent_key = model_cfg.get('encryption_key', None)
             runtime_model = self.runtime_manager.add(
-                model_path.crypto_path, independent_key=independent_key, open_fn=open_fn
+                model_path.crypto_path, independent_key=independent_key, open_fn=open_fn,
+                session_cfg=model_cfg.get('session'), owner=owner
             )
             model_entity.load_model(
                 model_cfg, runtime_model, model_name, model_path.crypto_path, categories, corpus
             )
         elif exists(model_path.onnx_path):
-            runtime_model = self.runtime_manager.add(model_path.onnx_path, open_fn=open_fn)
+            runtime_model = self.runtime_manager.add(
+                model_path.onnx_path, open_fn=open_fn, session_cfg=model_cfg.get('session'), owner=owner
+            )
             model_entity.load_model(
                 model_cfg, runtime_model, model_name, model_path.onnx_path, categories, corpus
             )
@@ -307,23 +633,30 @@ class ModelManager:
             return None
         return model_entity
 
+    def setup_batching(self, project_entity: ProjectEntity, model_entity: ModelEntity):
+        cfg = {**project_entity.cfg, **model_entity.cfg}
+        if width_buckets := cfg.get('width_buckets'):
+            self.runtime_manager.enable_width_buckets(model_entity.model_hash, width_buckets)
+        if not (max_batch := cfg.get('max_batch')) or int(max_batch) <= 1:
+            return
+        self.runtime_manager.enable_batching(
+            model_entity.model_hash, max_batch=int(max_batch), max_wait_ms=float(cfg.get('max_wait_ms', 5))
+        )
+
     def add_model(self, project_name, model_name, open_fn, fs):
         project_path = Path.project_path(project_name)
         model_path = Path.model_path(project_path, model_name)
-        model_entity = self.get_model(model_name, model_path, open_fn, fs)
-        self.model_maps[model_entity.model_hash] = model_entity
-        self.path_maps[f"{project_name}/{model_name}"] = model_entity.model_hash
+        model_entity = self.get_model(
+            model_name, model_path, open_fn, fs, owner=self.model_key(project_name, model_name)
+        )
+        with self.lock:
+            self.register(self.project_entities.get(project_name), model_name, model_entity)
+        self.project_entities.notify(project_name)
 
     def iter_models(self) -> dict:
-        for project_name, project_entity in self.project_entities.all.items():
-            project_path = Path.project_path(project_name)
-            models = project_entity.cfg.get(f'models')
-            for key_name, model_name in models.items():
-                model_path = Path.model_path(project_path, model_name)
-                model_entity = self.get_model(model_name, model_path)
-                if not model_entity:
-                    continue
-                self.model_maps[model_entity.model_hash] = model_entity
-                self.path_maps[f"{project_name}/{model_name}"] = model_entity.model_hash
-
+        if self.lru.enabled:
+            # 按需加载: 启动时只索引项目, 会话在首次请求时创建
+            return self.model_maps
+        for project_name in self.project_entities.all:
+            self.load_project(project_name, notify=False)
         return self.model_maps
@@ -7,7 +7,7 @@ import yaml
 import importlib
 import base64
 from muggle.logger import logger
-from typing import List, Tuple, Dict, Literal
+from typing import List, Tuple, Dict, Literal, Callable
 from collections import OrderedDict, namedtuple
 from dataclasses import dataclass, field
 from muggle.engine.utils import Path, base_projects_dir, PROJECT_PATH
@@ -74,6 +74,7 @@ class ProjectEntities:
 
     def __init__(self):
         self.all: OrderedDict[str, ProjectEntity] = self.iter_projects_from_dirs()
+        self.listeners: List[Callable[[str], None]] = []
 
     @property
     def titles(self):
@@ -92,9 +93,18 @@ class ProjectEntities:
 
     def add(self, project_name, project_entity: ProjectEntity):
         self.all[project_name] = project_entity
+        self.notify(project_name)
 
     def remove(self, project_name):
         del self.all[project_name]
+        self.notify(project_name)
+
+    def subscribe(self, listener: Callable[[str], None]):
+        self.listeners.append(listener)
+
+    def notify(self, project_name):
+        for listener in self.listeners:
+            listener(project_name)
 
     @classmethod
     def iter_image_titles(cls, project_config, index, value):
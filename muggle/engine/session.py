@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
 import muggle
-from typing import Tuple, List, TypeVar
+from typing import Tuple, List, TypeVar, Dict, Optional
 from muggle.engine.project import ProjectEntities
 from muggle.engine.model import (
     ModelEntity, RuntimeEngineType, RuntimeManager, ModelManager, InputImage, InputImages, GifImage
 )
 from muggle.engine.base import ModelEngineType
+from muggle.engine.components.pipeline import Pipeline
 from collections import OrderedDict, namedtuple
 from muggle.engine.impl import *
 from muggle.logger import logger
@@ -16,49 +17,76 @@ project_entities: ProjectEntities = ProjectEntities()
 model_manager = ModelManager(project_entities)
 if not project_entities.all and not os.path.exists("compile_projects"):
     logger.info(f"当前尚未发现任何工程, 请将项目相关文件 [*projects|*logic] 置于根目录")
-if loaded_project_names := '|'.join(project_entities.all.keys()):
-    # model_manager.warm_up_task(getattr(globals()['BaseEngine'], 'utils_cls'))
-    logger.info(f"加载引擎 [{loaded_project_names}]")
 
 
 class ProjectSession:
 
+    sessions: Dict[str, "ProjectSession"] = {}
+
     def __init__(self, project_name: str):
         self.project_name = project_name
         self.project_entity = project_entities.get(self.project_name)
+        self._models: Optional[OrderedDict[str, ModelEntity]] = None
+        self._engine: Optional[OrderedDict[str, ModelEngineType]] = None
+
+    @classmethod
+    def get(cls, project_name: str) -> "ProjectSession":
+        if not (session := cls.sessions.get(project_name)):
+            session = cls.sessions.setdefault(project_name, cls(project_name))
+        return session
+
+    @classmethod
+    def invalidate(cls, project_name: str):
+        cls.sessions.pop(project_name, None)
+        Pipeline.remove(project_name)
 
     @property
     def models(self) -> OrderedDict[str, ModelEntity]:
-        return OrderedDict({
-            k: model_manager.from_project(**v)
-            for k, v in project_entities.get(self.project_name).model_params.items()
-        })
+        if self._models is None:
+            models = OrderedDict({
+                k: model_manager.from_project(**v)
+                for k, v in self.project_entity.model_params.items()
+            })
+            if None in models.values() and model_manager.lru.enabled:
+                model_manager.load_project(self.project_name, notify=False)
+                models = OrderedDict({
+                    k: model_manager.from_project(**v)
+                    for k, v in self.project_entity.model_params.items()
+                })
+            if None in models.values():
+                raise RuntimeError(f"项目 [{self.project_name}] 模型未加载")
+            self._models = models
+        return self._models
 
     @property
     def runtime(self) -> OrderedDict[str, RuntimeEngineType]:
-        return OrderedDict({
-            k: model_manager.from_project(**v).model_runtime
-            for k, v in project_entities.get(self.project_name).model_params.items()
-        })
+        return OrderedDict({k: v.model_runtime for k, v in self.models.items()})
 
     @property
     def engine(self) -> OrderedDict[str, ModelEngineType]:
-        return OrderedDict({
-            k: model_manager.from_project(**v).get_engine(globals(), self.project_entity)
-            for k, v in project_entities.get(self.project_name).model_params.items()
-        })
+        if self._engine is None:
+            engine = OrderedDict({
+                k: v.get_engine(globals(), self.project_entity) for k, v in self.models.items()
+            })
+            # 多模型项目开启流水线后, 各模型的推理调用由各自的阶段线程执行, 以限制单个模型的并发
+            if len(engine) > 1 and Pipeline.enabled(self.project_entity.cfg) and (
+                pipeline := Pipeline.create(self.project_name, self.project_entity.cfg)
+            ):
+                engine = OrderedDict({k: pipeline.wrap(k, v) for k, v in engine.items()})
+            self._engine = engine
+        return self._engine
 
     @property
     def default_engine(self) -> ModelEngineType:
-        return [_ for _ in self.engine.values()][0]
+        return next(iter(self.engine.values()))
 
     @classmethod
     def engine_from_project(cls, project_name, model_name=None):
-        project_entity = project_entities.get(project_name)
+        session = cls.get(project_name)
         engines = OrderedDict({
-            v.get('model_name'): model_manager.from_project(**v).get_engine(globals(), project_entity)
-            for k, v in project_entities.get(project_name).model_params.items()
+            v.get('model_name'): session.engine[k] for k, v in session.project_entity.model_params.items()
         })
         return engines.get(model_name) if model_name else engines
 
 
+project_entities.subscribe(ProjectSession.invalidate)
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
+import io
+import base64
+import hashlib
 import PIL.Image
 import PIL.GifImagePlugin
 import math
@@ -75,12 +78,111 @@ class ResponseBody(BaseModel):
     consume: float
 
 
-@dataclass
+class BatchRequestBody(BaseModel):
+    items: List[RequestBody] = []
+
+
+class BatchItemBody(BaseModel):
+    index: int
+    success: bool = True
+    code: int = 0
+    msg: str = ""
+    data: Union[str, int, List[int], List[str]] = None
+    score: Union[List[float], float] = 0
+
+
+class BatchResponseBody(BaseModel):
+    uuid: str = None
+    items: List[BatchItemBody] = []
+    consume: float
+
+
 class ImageEntity:
-    pil: ImageType
-    hash: str
-    raw_bytes: bytes
-    base64: str
+    """
+    图片实体: 只持有原始字节的 memoryview, 哈希/PIL 图像/numpy 数组在首次访问时计算并缓存,
+    缓存命中等只需要哈希的路径不会解码图片
+    """
+
+    def __init__(self, raw_bytes: Optional[bytes] = None, pil: ImageType = None, hash: Optional[str] = None):
+        self.buffer: Optional[memoryview] = memoryview(raw_bytes) if raw_bytes is not None else None
+        self._pil = pil
+        self._hash = hash
+        self._array = None
+
+    @property
+    def raw_bytes(self) -> Optional[memoryview]:
+        return self.buffer
+
+    @property
+    def hash(self) -> str:
+        if self._hash is None:
+            self._hash = hashlib.md5(self.buffer).hexdigest() if self.buffer is not None else ""
+        return self._hash
+
+    @property
+    def source(self) -> bytes:
+        # 完整的 bytes 对象可直接交给 BytesIO 共享内存, 切片视图才需要复制
+        return self.buffer.obj if isinstance(self.buffer.obj, bytes) and self.buffer.nbytes == len(
+            self.buffer.obj
+        ) else self.buffer.tobytes()
+
+    @property
+    def pil(self) -> ImageType:
+        if self._pil is None and self.buffer is not None:
+            from muggle.utils import Core
+            from muggle.metrics import metrics
+            with metrics.timer("decode"):
+                image = Core.image_progress(PIL.Image.open(io.BytesIO(self.source)))
+                if isinstance(image, PIL.Image.Image):
+                    image.load()
+            self._pil = image
+        elif isinstance(self._pil, PIL.GifImagePlugin.GifImageFile):
+            from muggle.utils import Core
+            self._pil = Core.image_progress(self._pil)
+        return self._pil
+
+    def frames(self, need_frames: Optional[List[int]] = None) -> List[np.ndarray]:
+        """ 按序号取 RGB (带透明通道时 RGBA) 帧数组: 尚未解码的 GIF 只解码到最后一个需要的帧, 已解码时直接从帧列表中选取 """
+        from muggle.gif import GifDecoder
+        from muggle.metrics import metrics
+        image = self._pil
+        if image is None and self.buffer is not None:
+            with metrics.timer("decode"):
+                image = PIL.Image.open(io.BytesIO(self.source))
+                if not GifDecoder.is_gif(image):
+                    image.load()
+                    self._pil = image
+        if GifDecoder.is_gif(image):
+            with metrics.timer("gif_frames"):
+                return GifDecoder.decode(image, need_frames)
+        images = image if isinstance(image, list) else [image]
+        if need_frames is not None:
+            images = [images[i] for i in need_frames]
+        return [np.asarray(_ if _.mode in ('RGB', 'RGBA') else _.convert('RGB')) for _ in images]
+
+    @pil.setter
+    def pil(self, image: ImageType):
+        self._pil = image
+        self._array = None
+
+    @property
+    def array(self) -> np.ndarray:
+        if self._array is None:
+            self._array = np.asarray(self.pil)
+        return self._array
+
+    @property
+    def base64(self) -> str:
+        return base64.b64encode(self.buffer).decode() if self.buffer is not None else ""
+
+    def __reduce__(self):
+        # memoryview 不能序列化, 传给进程池时退回 bytes
+        if self.buffer is not None:
+            return ImageEntity, (self.buffer.tobytes(), None, self._hash)
+        return ImageEntity, (None, self._pil, self._hash)
+
+    def __repr__(self):
+        return f"ImageEntity(hash={self.hash})"
 
 
 @dataclass
@@ -5,14 +5,22 @@ import os
 from muggle.logger import logger
 import uuid
 from concurrent.futures import ThreadPoolExecutor
-from typing import Union, TypeVar, Iterator
+from typing import Union, TypeVar, Iterator, TYPE_CHECKING
 from muggle.entity import APIType
-from fastapi import Request
-from fastapi.responses import JSONResponse
+
+if TYPE_CHECKING:
+    from fastapi import Request
 
 executor = ThreadPoolExecutor(5)
 
 
+def rebuild_exception(cls, message, code, current_uuid):
+    e = cls.__new__(cls)
+    BaseException.__init__(e, message)
+    e.message, e.code, e.current_uuid, e.request = message, code, current_uuid, None
+    return e
+
+
 class ServerException(BaseException):
 
     @property
@@ -25,7 +33,7 @@ class ServerException(BaseException):
             code: int,
             api_type: APIType = None,
             project_name: str = None,
-            request: Request = None,
+            request: 'Request' = None,
             remote_ip: str = None,
             is_print=True
     ):
@@ -41,7 +49,7 @@ class ServerException(BaseException):
         if self.request:
             ua: str = self.request.headers.get('user-agent')
             ua = ua if (not ua) or (not ua.startswith("Mozilla")) else "-"
-            log_text += f"IP [{self.request.client.host}] | "
+            log_text += f"IP [{self.request.client.host if self.request.client else None}] | "
             log_text += f"UA [{ua}] | "
         if not self.request and remote_ip:
             log_text += f"IP [{remote_ip}] | "
@@ -52,7 +60,12 @@ class ServerException(BaseException):
         if is_print:
             logger.error(log_text)
 
+    def __reduce__(self):
+        return rebuild_exception, (self.__class__, self.message, self.code, self.current_uuid)
+
     def response(self):
+        # SDK 场景不需要 fastapi, 仅在服务端生成响应时导入
+        from fastapi.responses import JSONResponse
         return JSONResponse(
             content={
                 "uuid": self.current_uuid,
@@ -73,7 +86,7 @@ class ImageException(ServerException):
             code: int,
             api_type: APIType = None,
             project_name: str = None,
-            request: Request = None
+            request: 'Request' = None
     ):
         super(ImageException, self).__init__(message, code, api_type, project_name, request)
 
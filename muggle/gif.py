@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import numpy as np
+import PIL.Image
+import PIL.GifImagePlugin
+from typing import List, Optional, Sequence
+
+GifImage = PIL.GifImagePlugin.GifImageFile
+
+
+class GifDecoder:
+    """
+    GIF 按需解码: 调用方事先给出需要的帧序号, 解码到最后一个需要的帧即停止;
+    帧间合成由 Pillow 在 seek 时完成, 这里只把需要的帧写入一块预分配的 [N, H, W, 3] 缓冲区, 不需要的帧不做任何转换;
+    带透明色的 GIF 写入 [N, H, W, 4] (RGBA) 缓冲区, 与原先逐帧 RGBA 合成一致, 透明区域由预处理补白
+    """
+
+    @classmethod
+    def is_gif(cls, image) -> bool:
+        return isinstance(image, GifImage)
+
+    @classmethod
+    def has_alpha(cls, im: PIL.Image.Image) -> bool:
+        return 'transparency' in im.info or im.mode in ('RGBA', 'LA', 'PA')
+
+    @classmethod
+    def palette(cls, im: PIL.Image.Image) -> Optional[np.ndarray]:
+        if not (palette := im.getpalette()):
+            return None
+        lut = np.zeros((256, 3), dtype=np.uint8)
+        colors = np.frombuffer(bytes(palette[:768]), dtype=np.uint8).reshape(-1, 3)
+        lut[:len(colors)] = colors
+        return lut
+
+    @classmethod
+    def write(cls, im: PIL.Image.Image, out: np.ndarray, lut: Optional[np.ndarray]):
+        """ 当前帧写入 out, 3 通道等价于 convert('RGB'), 4 通道等价于 convert('RGBA'), 但不创建中间图像 """
+        channels = out.shape[2]
+        if im.mode == 'P':
+            # 后续帧可能没有局部调色板, 沿用首帧的全局调色板
+            lut = cls.palette(im) if im.getpalette() else lut
+            transparency = im.info.get('transparency')
+            if lut is not None and (channels == 3 or transparency is None or isinstance(transparency, int)):
+                if channels == 4:
+                    rgba = np.full((256, 4), 255, dtype=np.uint8)
+                    rgba[:, :3] = lut
+                    if transparency is not None:
+                        rgba[transparency, 3] = 0
+                    lut = rgba
+                np.take(lut, np.asarray(im), axis=0, out=out)
+                return
+        if im.mode in ('L', 'RGB', 'RGBA') and 'transparency' not in im.info:
+            arr = np.asarray(im)
+            if arr.ndim == 2:
+                arr = arr[:, :, np.newaxis]
+            out[:, :, :3] = arr[:, :, :3]
+            if channels == 4:
+                out[:, :, 3] = arr[:, :, 3] if arr.shape[2] == 4 else 255
+            return
+        out[...] = np.asarray(im.convert('RGBA' if channels == 4 else 'RGB'))
+
+    @classmethod
+    def decode(cls, im: PIL.Image.Image, need_frames: Optional[Sequence[int]] = None) -> List[np.ndarray]:
+        """
+        按 need_frames 的顺序返回 [H, W, 3] (带透明色时 [H, W, 4]) uint8 帧 (序号从 0 开始, 可重复), 未指定时返回全部帧;
+        返回的数组是同一缓冲区的视图, 可直接交给预处理
+        """
+        # 负序号需要知道总帧数, 只能完整解码
+        selective = need_frames is not None and all(i >= 0 for i in need_frames)
+        wanted = sorted(set(need_frames)) if selective else None
+        slots = {index: slot for slot, index in enumerate(wanted)} if selective else {}
+        width, height = im.size
+        im.seek(0)
+        channels = 4 if cls.has_alpha(im) else 3
+        buffer = np.empty((len(wanted) if selective else 0, height, width, channels), dtype=np.uint8)
+        frames, lut = [], None
+        index = 0
+        while not selective or index <= wanted[-1]:
+            try:
+                im.seek(index)
+                im.load()
+            except EOFError:
+                break
+            except OSError:
+                # 截断的动图保留已解码的帧
+                if index == 0:
+                    raise
+                break
+            if index == 0:
+                lut = cls.palette(im)
+            if not selective:
+                frame = np.empty((height, width, channels), dtype=np.uint8)
+                cls.write(im, frame, lut)
+                frames.append(frame)
+            elif index in slots:
+                cls.write(im, buffer[slots[index]], lut)
+            index += 1
+        if not selective:
+            return frames if need_frames is None else [frames[i] for i in need_frames]
+        if (missing := [i for i in wanted if i >= index]):
+            raise IndexError(f"GIF 共 [{index}] 帧, 缺少第 {missing} 帧")
+        return [buffer[slots[i]] for i in need_frames]
+
+    @classmethod
+    def to_pil(cls, frames: List[np.ndarray]) -> List[PIL.Image.Image]:
+        return [PIL.Image.fromarray(_) for _ in frames]
@@ -10,4 +10,4 @@ if not os.path.exists(log_path):
 
 error_logfile = 'logs/critical-error.log'
 
-logger.add(error_logfile, filter=lambda x: 'ERROR' in x['message'])
\ No newline at end of file
+logger.add(error_logfile, filter=lambda x: 'ERROR' in x['message'], enqueue=True)
\ No newline at end of file
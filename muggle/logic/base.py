@@ -4,24 +4,48 @@ import PIL.Image
 import PIL.GifImagePlugin
 import numpy as np
 from abc import abstractmethod
-from typing import List, Union, Tuple
+from contextvars import ContextVar
+from typing import List, Union, Tuple, Optional
 from muggle.entity import Blocks, Block, Response, InputImage, Title, ImageEntity, ImageType
 from muggle.utils import Core
 from muggle.engine.session import ProjectSession
 from muggle.logic.utils import LogicAuxiliary
+from muggle.metrics import metrics
 
 
 class BaseLogic:
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, stage in [('process', 'logic'), ('dumps', 'dumps')]:
+            if name in cls.__dict__:
+                setattr(cls, name, metrics.instrument(stage, cls.metric_labels)(cls.__dict__[name]))
+
+    def metric_labels(self) -> dict:
+        return {"project": self.project_name}
+
     def __init__(self, project_name: str, param=None):
         self.project_name = project_name
         self.print_process = False
-        self.param = {} if param is None else param
-        self.session = ProjectSession(project_name=self.project_name)
+        self._param: ContextVar[Optional[dict]] = ContextVar(f"param:{project_name}", default=None)
+        self.param = param
+        self.session = ProjectSession.get(project_name=self.project_name)
         self.project_entity = self.session.project_entity
         self.project_config = self.project_entity.cfg
         self.auxiliary = LogicAuxiliary()
 
+    @property
+    def param(self) -> dict:
+        # 不能用 default={}: 未传入参数的上下文会共用同一个字典, 逻辑写入 param 会串到其他请求
+        if (param := self._param.get()) is None:
+            param = {}
+            self._param.set(param)
+        return param
+
+    @param.setter
+    def param(self, value):
+        self._param.set({} if value is None else value)
+
     @abstractmethod
     def process(self, image: InputImage, title: Title = None) -> Response:
         pass
@@ -30,8 +54,28 @@ class BaseLogic:
     def dumps(self, response: Response) -> tuple[str, float]:
         pass
 
-    def execute(self, image: ImageType, title: Title = None):
-        image = Core.image_progress(image)
-        image = ImageEntity(pil=image.copy(), hash="", raw_bytes=b"", base64="")
+    def batch_process(self, images: List[InputImage], titles: List[Title]) -> List[Response]:
+        return [self.process(image, title) for image, title in zip(images, titles)]
+
+    @classmethod
+    def chunked_predict(cls, engine, images: List[ImageType], batch_size: int) -> list:
+        predictions = []
+        for i in range(0, len(images), batch_size):
+            predictions += engine.batch_predict(images[i: i + batch_size])
+        return predictions
+
+    @property
+    def batch_size(self) -> int:
+        return max(int(self.project_config.get('batch_size', 32)), 1)
+
+    @classmethod
+    def is_single_frame(cls, images: List[InputImage]) -> bool:
+        return all(isinstance(image.pil, PIL.Image.Image) for image in images)
+
+    def execute(self, image: ImageType, title: Title = None, param=None):
+        if param is not None:
+            self.param = param
+        # GIF 在逻辑首次取用时才解码, 只用到部分帧的逻辑可以按需解码
+        image = ImageEntity(pil=image)
         response = self.process(image, title)
         return self.dumps(response)
\ No newline at end of file
@@ -15,6 +15,7 @@ from muggle.logic.base import BaseLogic, Response, Title
 from muggle.entity import Blocks, Block, BoundingBox, InputImage, ImageType
 from muggle.utils import Core
 from muggle.logic.utils import LogicAuxiliary
+from muggle.engine.components.corpus import CorpusIndex
 
 
 app_dir = os.path.dirname(muggle.__file__)
@@ -151,6 +152,28 @@ class BaseClickLogic(BaseLogic, ABC):
         blocks = Blocks.Archive.from_text(main_text, boxes_main)
         return BlockOrder.one_to_one(blocks, need_title)
 
+    def extract_boxes(self, image: ImageType, sub_name='det', sort=True, expect_area=None) -> list:
+        predictions = self.session.engine[sub_name].predict(image)
+        try:
+            if sort:
+                predictions = sorted(predictions, key=lambda t: t[0])
+            boxes = [list(bounding_box) for bounding_box in predictions]
+        except ValueError:
+            boxes = []
+        if expect_area:
+            boxes = [box for box in boxes if not self.in_box(box, expect_area)]
+        return boxes
+
+    def classify_targets(self, image: ImageType, boxes: list, sub_name='cls', **kwargs):
+        """
+        检测框直接交给分类引擎的 batch_predict_rois, 由原图数组批量裁剪缩放, 不再逐框生成 PIL 裁剪图
+        """
+        if self.param.get('debug'):
+            os.makedirs("img", exist_ok=True)
+            for idx, box in enumerate(boxes):
+                image.crop(self.std_box(box)).save(f"img/im_{idx}.png")
+        return self.session.engine[sub_name].batch_predict_rois(image, boxes, **kwargs)
+
     def extract_target(
             self,
             image: ImageType,
@@ -161,17 +184,7 @@ class BaseClickLogic(BaseLogic, ABC):
             contrast=None,
             sharpness=None
     ):
-        predictions = self.session.engine[sub_name].predict(image)
-
-        im_group, boxes = [], []
-        try:
-            if sort:
-                predictions = sorted(predictions, key=lambda t: t[0])
-            boxes = [
-                list(bounding_box) for bounding_box in predictions
-            ]
-        except ValueError:
-            boxes = []
+        im_group, boxes = [], self.extract_boxes(image, sub_name=sub_name, sort=sort)
 
         if split_area:
             ims_in, ims_out, boxes_in, boxes_out = [], [], [], []
@@ -215,18 +228,11 @@ class BaseClickLogic(BaseLogic, ABC):
         return list(im_group), list(boxes)
 
     @classmethod
-    def word_order(cls, lines, dictionary, label_map, outputs):
+    def word_order(cls, corpus: CorpusIndex, label_map, outputs):
         if len(outputs.shape) == 3:
             outputs = outputs.squeeze(1)
         target = ''.join([label_map[single] for single in np.argmax(outputs, axis=1)])
-        target = set(target)
-        result = (-1, "")
-
-        for index, i in enumerate(dictionary):
-            score = len(target & i) / len(target | i)
-            if score > result[0]:
-                result = (score, lines[index])
-        return result[1]
+        return corpus.best(set(target))
 
     @staticmethod
     def semantic_inference(text: str, inference_map: dict, result_group: list, boxes_group: list):
@@ -313,17 +319,17 @@ class ClickByTextTitleLogic(BaseClickLogic):
     def process(self, image: InputImage, title: Title = None) -> Response:
         title = list(title) if title else None
         # print(title)
-        target_ims, boxes = self.extract_target(image=image.pil)
+        boxes = self.extract_boxes(image=image.pil)
         # calc_score = self.project_config.get('calc_score') in [None, True]
         if title:
-            need_text, block_classifications = self.session.engine['cls'].batch_predict(
-                list(target_ims),
+            need_text, block_classifications = self.classify_targets(
+                image.pil, boxes,
                 need_title=title,
                 order_func=None,
             )
         else:
-            block_classifications = self.session.engine['cls'].batch_predict(
-                list(target_ims),
+            block_classifications = self.classify_targets(
+                image.pil, boxes,
                 order_func=None,
             )
 
@@ -366,9 +372,9 @@ class ClickBySemanticLogic(BaseClickLogic):
     """
 
     def process(self, image: InputImage, title: Title = None) -> Response:
-        target_ims, boxes = self.extract_target(image=image.pil)
-        block_classifications = self.session.engine['cls'].batch_predict(
-            list(target_ims),
+        boxes = self.extract_boxes(image=image.pil)
+        block_classifications = self.classify_targets(
+            image.pil, boxes,
             # need_title=title
         )
         title_desc = title
@@ -403,19 +409,19 @@ class ClickByOrderLogic(BaseClickLogic):
 
     def process(self, image: InputImage, title: Title = None) -> Response:
 
-        target_ims, boxes = self.extract_target(image=image.pil)
+        boxes = self.extract_boxes(image=image.pil)
 
         cls_engine = self.session.engine['cls']
-        lines, dictionary = cls_engine.model_entity.corpus
+        corpus = cls_engine.model_entity.corpus
         if self.param and 'raw_classifications' in self.param:
             order_func = None
         else:
             order_func = lambda label_map, outputs: self.word_order(
-                lines, dictionary, label_map=label_map, outputs=outputs
+                corpus, label_map=label_map, outputs=outputs
             )
 
-        need_title, block_classifications = cls_engine.batch_predict(
-            list(target_ims),
+        need_title, block_classifications = self.classify_targets(
+            image.pil, boxes,
             order_func=order_func,
         )
         if order_func:
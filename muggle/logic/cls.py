@@ -23,6 +23,11 @@ class ClsLogic(BaseClsLogic):
         predictions = self.session.default_engine.predict(image.pil)
         return predictions
 
+    def batch_process(self, images: List[InputImage], titles: List[Title]) -> List[Response]:
+        if not self.is_single_frame(images):
+            return super().batch_process(images, titles)
+        return self.chunked_predict(self.session.default_engine, [image.pil for image in images], self.batch_size)
+
 
 
 
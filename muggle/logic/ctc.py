@@ -6,7 +6,10 @@ import PIL.ImageEnhance
 import numpy as np
 from abc import ABC
 from itertools import groupby
+from typing import List
 from muggle.utils import Core
+from muggle.gif import GifDecoder
+from muggle.engine.components.ctc import CTCDecoder
 
 from muggle.logic.base import BaseLogic, Response, InputImage, Title, ImageEntity
 
@@ -25,6 +28,12 @@ class CTCLogic(BaseCTCLogic):
         self.project_config['join_tag'] = ''
         return self.session.default_engine.predict(image.pil)
 
+    def batch_process(self, images: List[InputImage], titles: List[Title]) -> List[Response]:
+        if not self.is_single_frame(images):
+            return super().batch_process(images, titles)
+        self.project_config['join_tag'] = ''
+        return self.chunked_predict(self.session.default_engine, [image.pil for image in images], self.batch_size)
+
 
 class GIFAllFramesCTCLogic(BaseCTCLogic):
 
@@ -41,19 +50,16 @@ class GIFAllFramesCTCLogic(BaseCTCLogic):
         return src[target_index]
 
     def process(self, images: InputImage, title: Title = None) -> Response:
+        """
+        ctc_vote: position (默认) 按位置取各帧置信度最高的字符;
+        mean 对各帧概率取平均后解码, 需要引擎提供 batch_outputs 返回原始输出
+        """
         self.project_config['join_tag'] = ''
-        concat_items = self.session.default_engine.batch_predict(images.pil)
-        need_items = [["", 0] for _ in concat_items[0]]
-        for idx in range(len(need_items)):
-
-            for items in concat_items:
-                try:
-                    if items[idx][1] > need_items[idx][1]:
-                        need_items[idx][1] = items[idx][1]
-                        need_items[idx][0] = items[idx][0]
-                except:
-                    continue
-        return need_items
+        engine = self.session.default_engine
+        frames = images.pil if isinstance(images.pil, list) else [images.pil]
+        if self.project_config.get('ctc_vote') == 'mean' and hasattr(engine, 'batch_outputs'):
+            return engine.utils.ctc.vote(engine.batch_outputs(frames))
+        return CTCDecoder.vote_items(engine.batch_predict(frames))
 
 
 class GIFBlendCTCLogic(BaseCTCLogic):
@@ -61,7 +67,9 @@ class GIFBlendCTCLogic(BaseCTCLogic):
     def process(self, image: InputImage, title: Title = None) -> Response:
         self.project_config['join_tag'] = ''
         need_frame = self.project_config.get('need_frame')
-        blend_im = Core.blend_frame(image, need_frame=need_frame)
+        # need_frame 为从 1 开始的帧号, 首帧总是参与混合, 只解码到最后一个需要的帧
+        frames = image.frames(None if need_frame is None else [0] + sorted({_ - 1 for _ in need_frame if _ > 1}))
+        blend_im = Core.blend_frame(GifDecoder.to_pil(frames), need_frame=range(2, len(frames) + 1))
         blend_im = PIL.ImageEnhance.Contrast(blend_im).enhance(2.5)
         items = self.session.default_engine.predict(blend_im)
         return items
@@ -72,7 +80,7 @@ class GIFConcatCTCLogic(BaseCTCLogic):
     def process(self, images: InputImage, title: Title = None) -> Response:
         self.project_config['join_tag'] = ''
         need_frame = self.project_config.get('need_frame')
-        need_ims = [images.pil[i] for i in need_frame]
+        need_ims = GifDecoder.to_pil(images.frames(need_frame))
         concat_items = []
         items = self.session.default_engine.batch_predict(need_ims)
         for item in items:
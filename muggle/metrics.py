@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import glob
+import json
+import time
+import bisect
+import functools
+import threading
+from typing import Iterable, Tuple, Dict, Callable, Optional
+from muggle.config import sys_args
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+RATIO_BUCKETS = (0, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[idx] += 1
+            self.sum += value
+            self.count += 1
+
+    def dump(self) -> dict:
+        with self.lock:
+            return {"counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, buckets = 0, {}
+        for le, c in zip(list(self.buckets) + ['+Inf'], counts):
+            cumulative += c
+            buckets[str(le)] = cumulative
+        return {
+            "buckets": buckets,
+            "sum": total,
+            "count": count,
+            "avg": (total / count) if count else 0
+        }
+
+
+class NullTimer:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Timer:
+
+    def __init__(self, registry: "MetricsRegistry", stage: str, labels: dict):
+        self.registry = registry
+        self.stage = stage
+        self.labels = labels
+        self.st = 0.
+
+    def __enter__(self):
+        self.st = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.registry.record(self.stage, (time.perf_counter() - self.st) * 1000, self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """
+    分阶段耗时统计: 按 阶段/项目/模型 记录毫秒直方图;
+    各工作进程定期将快照写入 metrics_dir, /metrics 汇总所有进程 (含已退出进程) 后按 Prometheus 文本格式输出
+    """
+
+    RETIRED_FILENAME = "retired.json"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.pid = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.after_fork)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(sys_args.get('metrics'))
+
+    @property
+    def metrics_dir(self) -> str:
+        return sys_args.get('metrics_dir')
+
+    def timer(self, stage: str, **labels):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, stage, labels)
+
+    def observe(self, stage: str, value: float, **labels):
+        if self.enabled:
+            self.record(stage, value, labels)
+
+    def record(self, stage: str, value: float, labels: dict):
+        if self.pid is None:
+            with self.lock:
+                self.ensure_started()
+        key = (stage, tuple(labels.items()))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def instrument(self, stage: str, labels_fn: Callable[[object], dict]):
+        """ 方法装饰器; 子类通过 super() 调用同名方法时只记录最外层 """
+        def decorator(method):
+            if getattr(method, '__instrumented__', False):
+                return method
+
+            @functools.wraps(method)
+            def wrapper(obj, *args, **kwargs):
+                if not self.enabled:
+                    return method(obj, *args, **kwargs)
+                active = self.local.__dict__.setdefault('active', set())
+                token = (stage, id(obj))
+                if token in active:
+                    return method(obj, *args, **kwargs)
+                active.add(token)
+                st = time.perf_counter()
+                try:
+                    return method(obj, *args, **kwargs)
+                finally:
+                    active.discard(token)
+                    self.record(stage, (time.perf_counter() - st) * 1000, labels_fn(obj))
+
+            wrapper.__instrumented__ = True
+            return wrapper
+        return decorator
+
+    def after_fork(self):
+        # fork 之后丢弃父进程的统计, 每个进程独立写入快照
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def ensure_started(self):
+        if self.pid is not None:
+            return
+        self.pid = os.getpid()
+        interval = float(sys_args.get('metrics_flush_interval') or 0)
+        if interval > 0:
+            threading.Thread(target=self.flush_loop, args=(interval, ), name="metrics-flush", daemon=True).start()
+
+    def flush_loop(self, interval: float):
+        pid = os.getpid()
+        while self.pid == pid:
+            time.sleep(interval)
+            self.flush()
+
+    def dump(self) -> Dict[str, dict]:
+        with self.lock:
+            items = list(self.histograms.items())
+        data = {}
+        for (stage, labels), histogram in items:
+            key = json.dumps([stage, {k: "" if v is None else str(v) for k, v in labels}], ensure_ascii=False, sort_keys=True)
+            self.merge(data, {key: histogram.dump()})
+        return data
+
+    def path(self, pid) -> str:
+        return os.path.join(self.metrics_dir, f"{pid}.json")
+
+    @classmethod
+    def read(cls, path) -> Dict[str, dict]:
+        try:
+            with open(path, "r", encoding="utf8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @classmethod
+    def write(cls, path, data: Dict[str, dict]):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def merge(cls, target: Dict[str, dict], source: Dict[str, dict]):
+        for key, item in source.items():
+            if key not in target:
+                target[key] = {"counts": list(item['counts']), "sum": item['sum'], "count": item['count']}
+                continue
+            merged = target[key]
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], item['counts'])]
+            merged['sum'] += item['sum']
+            merged['count'] += item['count']
+        return target
+
+    @classmethod
+    def pid_alive(cls, pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def locked(self, fn):
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        with open(os.path.join(self.metrics_dir, ".lock"), "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                return fn()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def flush(self):
+        if self.pid != os.getpid() or not self.histograms:
+            return
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            self.write(self.path(self.pid), self.dump())
+        except Exception:
+            pass
+
+    def retire(self):
+        """ 工作进程退出时将自身统计并入 retired.json, 保证汇总结果单调递增 """
+        if self.pid != os.getpid():
+            return
+
+        def fn():
+            retired_path = os.path.join(self.metrics_dir, self.RETIRED_FILENAME)
+            self.write(retired_path, self.merge(self.read(retired_path), self.dump()))
+            if os.path.exists(self.path(self.pid)):
+                os.remove(self.path(self.pid))
+
+        self.locked(fn)
+        self.pid = None
+
+    def collect(self) -> Dict[str, dict]:
+        self.flush()
+
+        def fn():
+            retired_path = os.path.join(self.metrics_dir, self.RETIRED_FILENAME)
+            retired = self.read(retired_path)
+            merged, changed = {}, False
+            for path in glob.glob(os.path.join(self.metrics_dir, "*.json")):
+                name = os.path.basename(path)[:-5]
+                if not name.isdigit():
+                    continue
+                data = self.read(path)
+                if int(name) != os.getpid() and not self.pid_alive(int(name)):
+                    # 异常退出的进程没有 retire, 由采集方代为归档
+                    self.merge(retired, data)
+                    os.remove(path)
+                    changed = True
+                    continue
+                self.merge(merged, data)
+            if changed:
+                self.write(retired_path, retired)
+            return self.merge(merged, retired)
+
+        merged = self.locked(fn)
+        if self.pid == os.getpid() and not os.path.exists(self.path(self.pid)):
+            self.merge(merged, self.dump())
+        return merged
+
+    @classmethod
+    def escape(cls, value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def render(self, name="muggle_stage_latency_ms") -> str:
+        lines = [
+            f"# HELP {name} Per-stage latency in milliseconds, aggregated across workers",
+            f"# TYPE {name} histogram",
+        ]
+        for key, item in sorted(self.collect().items()):
+            stage, labels = json.loads(key)
+            label_text = ",".join(f'{k}="{self.escape(v)}"' for k, v in [("stage", stage), *labels.items()])
+            cumulative = 0
+            for le, count in zip(list(self.buckets) + ['+Inf'], item['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{label_text}}} {item['sum']}")
+            lines.append(f"{name}_count{{{label_text}}} {item['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """ 服务启动时 (fork 之前) 清空上次运行遗留的快照 """
+        for path in glob.glob(os.path.join(self.metrics_dir, "*.json")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import json
+import glob
+import time
+import sqlite3
+import threading
+from typing import Any, Callable, Optional
+from muggle.logger import logger
+from muggle.config import sys_args
+
+# 加载回调: (key, value, expire_at) -> 是否继续加载
+LoadCallback = Callable[[str, Any, float], bool]
+LEGACY_CACHE_FILE = ".cache"
+
+
+def migrate_legacy_cache():
+    """
+    旧版结果缓存是工作目录下的 .cache 文件 (键只有图片MD5, 不再沿用), 与 .cache/ 目录同名;
+    由服务启动 (加载模型前) 与本地缓存后端创建时调用, 将其移走为 .cache.legacy
+    """
+    if not os.path.isfile(LEGACY_CACHE_FILE):
+        return
+    try:
+        os.replace(LEGACY_CACHE_FILE, f"{LEGACY_CACHE_FILE}.legacy")
+        logger.info(f"旧版缓存文件 [{LEGACY_CACHE_FILE}] 已移至 [{LEGACY_CACHE_FILE}.legacy]")
+    except FileNotFoundError:
+        pass
+
+
+class CacheBackend:
+    """
+    结果缓存的二级存储, MD5Cache 的进程内 LRU 作为一级缓存;
+    start 在每个进程首次访问时调用 (fork 之后), 需要在此处建立连接/句柄
+    """
+
+    name = ""
+    shared = False
+
+    def start(self):
+        pass
+
+    def get(self, key) -> Optional[Any]:
+        return None
+
+    def put(self, key, value, expire_at: float):
+        pass
+
+    def load(self, callback: LoadCallback) -> int:
+        return 0
+
+    def flush(self):
+        pass
+
+    @property
+    def stats(self) -> dict:
+        return {"backend": self.name, "shared": self.shared}
+
+
+class FileBackend(CacheBackend):
+    """
+    按进程追加写入的分段 JSONL 文件, 仅用于重启后恢复一级缓存, 不在进程间共享
+    """
+
+    name = "file"
+
+    def __init__(self, cache_dir, ttl: float, segment_bytes: int, max_segments: int):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.pid = None
+        self.writer = None
+        self.segment_index = 0
+        # 推理线程并发写入同一个分段文件, 轮转与写入需互斥
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.pid = os.getpid()
+        self.writer = None
+        self.segment_index = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def remove(cls, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def segments(self):
+        segments = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.jsonl")):
+            try:
+                segments.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+        return [path for _, path in sorted(segments)]
+
+    def put(self, key, value, expire_at):
+        line = json.dumps({"k": key, "v": value, "t": expire_at}, ensure_ascii=False) + "\n"
+        with self.lock:
+            try:
+                if self.writer is None or self.writer.tell() >= self.segment_bytes:
+                    self.rotate()
+                self.writer.write(line)
+                self.writer.flush()
+            except Exception as e:
+                # 丢弃出错的句柄, 下次写入时轮转到新分段
+                logger.warning(f"[MD5Cache] 缓存写入失败: {e}")
+                self.close()
+
+    def close(self):
+        writer, self.writer = self.writer, None
+        if writer:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    def rotate(self):
+        self.close()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.segment_index += 1
+        path = os.path.join(self.cache_dir, f"{int(time.time())}-{self.pid}-{self.segment_index}.jsonl")
+        self.writer = open(path, "a", encoding="utf8")
+        self.prune()
+
+    def prune(self) -> list:
+        """ 删除超出 cache_max_segments 的最旧分段及已过期的分段 (所有进程共用目录), 返回保留的分段 """
+        segments = self.segments()
+        now = time.time()
+        for path in segments[:-self.max_segments] if len(segments) > self.max_segments else []:
+            self.remove(path)
+        kept = []
+        for path in segments[-self.max_segments:]:
+            try:
+                if self.ttl > 0 and os.path.getmtime(path) + self.ttl < now:
+                    self.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            kept.append(path)
+        return kept
+
+    def load(self, callback: LoadCallback) -> int:
+        segments = self.prune()
+        now = time.time()
+        count = 0
+        # 由新到旧加载, 优先保留最近写入的结果
+        for path in reversed(segments):
+            try:
+                with open(path, "r", encoding="utf8") as f:
+                    lines = f.read().splitlines()
+            except FileNotFoundError:
+                continue
+            for line in reversed(lines):
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue
+                if item['t'] and item['t'] < now:
+                    continue
+                if not callback(item['k'], item['v'], item['t']):
+                    return count
+                count += 1
+        return count
+
+    def flush(self):
+        with self.lock:
+            if self.writer:
+                self.writer.flush()
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    本机共享: 所有工作进程读写同一个 WAL 模式的 SQLite 文件, 每个线程独立连接
+    """
+
+    name = "sqlite"
+    shared = True
+    PRUNE_INTERVAL = 1000
+
+    def __init__(self, path, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self.local = threading.local()
+        self.puts = 0
+
+    def start(self):
+        self.local = threading.local()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expire_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_updated ON cache (updated_at)")
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self.conn.execute(
+            "SELECT value FROM cache WHERE key = ? AND (expire_at = 0 OR expire_at > ?)", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, value, expire_at):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expire_at, updated_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expire_at, time.time())
+        )
+        self.puts += 1
+        if self.puts % self.PRUNE_INTERVAL == 0:
+            self.prune()
+
+    def prune(self):
+        conn = self.conn
+        conn.execute("DELETE FROM cache WHERE expire_at != 0 AND expire_at < ?", (time.time(), ))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size, )
+        )
+
+    @property
+    def stats(self) -> dict:
+        return {**super().stats, "path": self.path, "size": self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]}
+
+
+class RedisBackend(CacheBackend):
+    """
+    跨主机共享: 依赖 redis 客户端 (pip install redis), 兼容 Redis 协议的服务均可;
+    条目只按 cache_ttl 过期, 不受 cache_size 限制, 总量由 Redis 服务端的 maxmemory / maxmemory-policy 控制
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url, prefix="muggle:cache:", client=None):
+        self.url = url
+        self.prefix = prefix
+        self.client = client
+        self.injected = client is not None
+
+    def start(self):
+        if self.injected:
+            return
+        try:
+            import redis
+        except ImportError:
+            raise ModuleNotFoundError("缓存后端 [redis] 需要安装 redis: pip install redis")
+        # fork 之后不能复用父进程的连接池
+        self.client = redis.Redis.from_url(self.url)
+
+    def get(self, key):
+        raw = self.client.get(f"{self.prefix}{key}")
+        return json.loads(raw) if raw is not None else None
+
+    def put(self, key, value, expire_at):
+        ttl = int(expire_at - time.time()) if expire_at else None
+        if ttl is not None and ttl <= 0:
+            return
+        self.client.set(f"{self.prefix}{key}", json.dumps(value, ensure_ascii=False), ex=ttl)
+
+    @property
+    def stats(self) -> dict:
+        return {**super().stats, "url": self.url}
+
+
+def create_backend(name=None, ttl=None, max_size=None) -> CacheBackend:
+    name = name or sys_args.get('cache_backend')
+    ttl = float(ttl if ttl is not None else sys_args.get('cache_ttl'))
+    max_size = int(max_size or sys_args.get('cache_size'))
+    cache_dir = sys_args.get('cache_dir')
+    if name in (FileBackend.name, SQLiteBackend.name):
+        migrate_legacy_cache()
+    if name == FileBackend.name:
+        return FileBackend(
+            cache_dir, ttl, int(sys_args.get('cache_segment_bytes')), int(sys_args.get('cache_max_segments'))
+        )
+    if name == SQLiteBackend.name:
+        return SQLiteBackend(os.path.join(cache_dir, "cache.db"), max_size)
+    if name == RedisBackend.name:
+        return RedisBackend(sys_args.get('cache_url'))
+    raise ValueError(f"不支持的缓存后端 [{name}], 可选 file / sqlite / redis")
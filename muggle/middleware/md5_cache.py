@@ -1,51 +1,151 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
+import os
 import json
 import time
-import os.path
+import hashlib
 import threading
+from collections import OrderedDict
+from typing import Tuple, Any
 from muggle.logger import logger
+from muggle.config import sys_args
+from muggle.middleware.cache_backend import CacheBackend, create_backend
 
 
 class MD5Cache:
+    """
+    识别结果缓存: 进程内 LRU (容量上限 + TTL) 作为一级缓存, 键由 项目名/标题/附加参数/图片MD5 组成;
+    二级存储见 cache_backend, file 仅用于重启恢复, sqlite / redis 可在多个工作进程间共享
+    """
 
-    FILENAME = ".cache"
+    start_lock = threading.Lock()
 
-    def __init__(self):
-        self.cache_pool = globals().get("cache_from_file") if "cache_from_file" in globals() else {}
-        self.is_started = False
+    def __init__(self, max_size=None, ttl=None, backend: CacheBackend = None):
+        self.max_size = int(max_size or sys_args.get('cache_size'))
+        self.ttl = float(ttl if ttl is not None else sys_args.get('cache_ttl'))
+        self.backend = backend or create_backend(ttl=self.ttl, max_size=self.max_size)
+        self.cache_pool: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pid = None
+        self.lock = threading.Lock()
+        self.loaded = threading.Event()
 
-    def put(self, key, value):
-        self.cache_pool[key] = value
+    @classmethod
+    def key(cls, project_name, image, title=None, extra=None) -> str:
+        raw = json.dumps([project_name, cls.digest(title), extra, cls.digest(image)], ensure_ascii=False, default=str)
+        return f"{project_name}:{hashlib.md5(raw.encode('utf8')).hexdigest()}"
 
-    def get(self, key):
-        return self.cache_pool.get(key)
+    @classmethod
+    def digest(cls, value):
+        if isinstance(value, (list, tuple)):
+            return [cls.digest(_) for _ in value]
+        return getattr(value, 'hash', value)
 
-    def dumps(self):
-        logger.info("正在写入缓存文件")
-        with open(MD5Cache.FILENAME, "w", encoding="utf8") as f:
-            f.write(json.dumps(self.cache_pool, ensure_ascii=False))
-
-    def dumps_task(self):
-        if self.is_started:
+    def ensure_started(self):
+        if self.pid == os.getpid():
             return
-        self.is_started = True
+        with MD5Cache.start_lock:
+            if self.pid == os.getpid():
+                return
+            # fork 之后重新初始化锁与后端连接, 每个进程独立加载
+            self.lock = threading.Lock()
+            self.loaded = threading.Event()
+            try:
+                self.backend.start()
+            except Exception as e:
+                logger.warning(f"[MD5Cache] 缓存后端 [{self.backend.name}] 初始化失败, 仅使用进程内缓存: {e}")
+                self.backend = CacheBackend()
+            self.pid = os.getpid()
+            threading.Thread(target=self.load, name="md5-cache-loader", daemon=True).start()
+
+    def expire_at(self) -> float:
+        return time.time() + self.ttl if self.ttl > 0 else 0
 
-        def func():
-            while True:
-                try:
-                    self.dumps()
-                except KeyboardInterrupt:
-                    break
-                time.sleep(300)
+    def get(self, key):
+        self.ensure_started()
+        with self.lock:
+            item = self.cache_pool.get(key)
+            if item is not None and item[1] and item[1] < time.time():
+                del self.cache_pool[key]
+                item = None
+            if item is not None:
+                self.cache_pool.move_to_end(key)
+                self.hits += 1
+                return item[0]
+        value = None
+        if self.backend.shared:
+            try:
+                value = self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"[MD5Cache] 缓存后端 [{self.backend.name}] 读取失败: {e}")
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.backend_hits += 1
+            self.insert(key, value, self.expire_at())
+        return value
 
-        threading.Timer(interval=60, function=func).start()
+    def put(self, key, value):
+        self.ensure_started()
+        expire_at = self.expire_at()
+        with self.lock:
+            self.insert(key, value, expire_at)
+        try:
+            self.backend.put(key, value, expire_at)
+        except Exception as e:
+            logger.warning(f"[MD5Cache] 缓存后端 [{self.backend.name}] 写入失败: {e}")
 
+    def insert(self, key, value, expire_at, is_loading=False):
+        if is_loading and key in self.cache_pool:
+            return
+        self.cache_pool[key] = (value, expire_at)
+        # 加载的历史结果由新到旧排在队首, 新写入的结果排在队尾
+        self.cache_pool.move_to_end(key, last=not is_loading)
+        while len(self.cache_pool) > self.max_size:
+            self.cache_pool.popitem(last=False)
+            self.evictions += 1
 
-if os.path.exists(MD5Cache.FILENAME):
-    try:
-        cache_from_file = json.loads(open(MD5Cache.FILENAME, "r", encoding="utf8").read())
-    except:
-        cache_from_file = {}
+    def load_item(self, key, value, expire_at) -> bool:
+        with self.lock:
+            if len(self.cache_pool) >= self.max_size:
+                return False
+            self.insert(key, value, expire_at, is_loading=True)
+        return True
 
+    def load(self):
+        st = time.time()
+        try:
+            count = self.backend.load(self.load_item)
+            if count:
+                logger.info(f"[MD5Cache] 已加载缓存 [{count}] 条, 耗时 [{round((time.time() - st) * 1000, 2)} 毫秒]")
+        except Exception as e:
+            logger.warning(f"[MD5Cache] 缓存加载失败: {e}")
+        finally:
+            self.loaded.set()
+
+    def dumps(self):
+        self.backend.flush()
 
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.backend_hits + self.misses
+        try:
+            backend = self.backend.stats
+        except Exception as e:
+            backend = {"backend": self.backend.name, "error": str(e)}
+        return {
+            "size": len(self.cache_pool),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": ((self.hits + self.backend_hits) / total) if total else 0,
+            "loaded": self.loaded.is_set(),
+            "backend": backend,
+        }
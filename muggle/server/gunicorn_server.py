@@ -1,14 +1,36 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
+import gc
+import os
 import uvicorn
 import muggle.logger
 import logging
+from muggle.logger import logger
+from muggle.config import sys_args
+from muggle.constants import memory_usage
 from muggle.core.api.cli import cli_args
 
 
 from gunicorn.app.base import BaseApplication
 
 
+def pre_fork(server, worker):
+    # 冻结主进程中已有对象, 避免工作进程的 GC 触碰引用计数导致写时复制
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from muggle.engine.session import model_manager
+    runtime_manager = model_manager.runtime_manager
+    if runtime_manager.preload:
+        before = memory_usage()
+        runtime_manager.load_all()
+        logger.info(f"[Worker-{os.getpid()}] 共享模型会话已创建, 内存 [{before}] -> [{memory_usage()}]")
+    if sys_args['warm_up']:
+        from muggle.core.api.handler import Strategy
+        Strategy.warm_up_task()
+
+
 class GunicornServer(BaseApplication):
 
     def init(self, parser, opts, args):
@@ -23,6 +45,8 @@ class GunicornServer(BaseApplication):
             'max_requests': 1000,
             'timeout': 100,
             'keepalive': 1,
+            'pre_fork': pre_fork,
+            'post_fork': post_fork,
             # "logger_class": "loguru.GunicornLogger"
             # "preload": True
         }
@@ -15,7 +15,6 @@ from muggle.logger import logger
 import socket
 import numpy as np
 import PIL.Image
-import PIL.ImageSequence
 import PIL.GifImagePlugin
 import PIL.ImageFont
 import PIL.ImageDraw
@@ -23,6 +22,7 @@ import PIL.ImageEnhance
 from urllib import parse
 from typing import Union, Optional
 from muggle.entity import ImageEntity
+from muggle.gif import GifDecoder
 from functools import partial
 
 
@@ -73,12 +73,15 @@ class Core:
 
     @classmethod
     def filter_base64(cls, source: str):
-        return re.sub("data:image/.+?base64,", "", source, 1) if ',' in source else source
+        # data URI 前缀只会出现在开头, 无需扫描整段文本
+        return re.sub("data:image/.+?base64,", "", source, 1) if ',' in source[:64] else source
 
     @classmethod
     def image_progress(cls, image):
         if isinstance(image, PIL.GifImagePlugin.GifImageFile):
-            gif_frames = cls.gif_loader(image)
+            from muggle.metrics import metrics
+            with metrics.timer("gif_frames"):
+                gif_frames = cls.gif_loader(image)
             image = gif_frames if gif_frames else image.copy()
         return image
 
@@ -92,35 +95,20 @@ class Core:
     def text2image(cls, source: Union[str, ImageEntity]) -> ImageEntity:
         if isinstance(source, ImageEntity):
             return source
-        b64_text = cls.filter_base64(source)
         try:
-            img_bytes = base64.b64decode(cls.filter_base64(b64_text))
+            img_bytes = base64.b64decode(cls.filter_base64(source))
         except Exception:
             raise ValueError("Base64编码解析失败")
-        md5 = hashlib.md5(img_bytes).hexdigest()
-        with io.BytesIO(img_bytes) as data_stream:
-            image = PIL.Image.open(data_stream)
-            image = cls.image_progress(image)
-            return ImageEntity(pil=image.copy(), hash=md5, raw_bytes=img_bytes, base64=b64_text)
+        return ImageEntity(raw_bytes=img_bytes)
+
+    @classmethod
+    def bytes2entity(cls, img_bytes: bytes) -> ImageEntity:
+        """ 直接由图片字节构建, 二进制上传时不经过 base64 """
+        return ImageEntity(raw_bytes=img_bytes)
 
     @classmethod
     def gif_loader(cls, im: Union[PIL.GifImagePlugin.GifImageFile, PIL.Image.Image]):
-        p = im.getpalette()
-        last_frame = im.convert('RGBA')
-        all_frames = []
-        try:
-            for frame in PIL.ImageSequence.Iterator(im):
-                if not frame.getpalette() and p:
-                    frame.putpalette(p)
-                new_frame = PIL.Image.new('RGBA', frame.size)
-                if frame.tile and frame.tile[0][1][2:] != frame.size:
-                    new_frame.paste(last_frame)
-                new_frame.paste(frame, (0, 0), frame.convert('RGBA'))
-                all_frames.append(new_frame)
-                last_frame = new_frame
-        except:
-            all_frames = [frame.convert("RGB") for frame in PIL.ImageSequence.Iterator(im)]
-        return all_frames
+        return GifDecoder.to_pil(GifDecoder.decode(im))
 
     @classmethod
     def blend_frame(cls, image_objs, need_frame=None):
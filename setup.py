@@ -86,6 +86,9 @@ setup(
     ],
     data_files=data_files,
     install_requires=install_requires,
+    entry_points={
+        'console_scripts': ['muggle = muggle.__main__:main'],
+    },
     python_requires='>=3.9,<3.11',
     include_package_data=True,
     install_package_data=True,
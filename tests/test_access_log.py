@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import json
+import random
+import pytest
+from muggle.config import sys_args
+from muggle.entity import APIType
+from muggle.access_log import AccessLog
+
+
+@pytest.fixture
+def access_log(tmp_path, monkeypatch):
+    for key, value in {
+        "access_log_file": str(tmp_path / "access.log"),
+        "access_log_format": "text",
+        "access_log_console": False,
+        "access_log_sample": None,
+        "access_log_queue": 10000,
+        # 后台线程不参与, 由测试显式 flush
+        "access_log_flush_interval": 3600,
+        "access_log_max_bytes": 0,
+        "access_log_backups": 2,
+    }.items():
+        monkeypatch.setitem(sys_args, key, value)
+    log = AccessLog()
+    yield log
+    log.close()
+    log.pid = None
+
+
+def record(log, n, project_name="p"):
+    for i in range(n):
+        log.record(APIType.TEXT, "127.0.0.1", "ua", project_name, 1.5, (f"r{i}", 0.9), title=f"t{i}")
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf8") as f:
+        return f.read().splitlines()
+
+
+def test_text_and_json_lines(access_log, tmp_path, monkeypatch):
+    record(access_log, 2)
+    access_log.flush()
+    lines = read_lines(tmp_path / "access.log")
+    assert len(lines) == 2 and "[p]" in lines[0] and "[r0 - (0.9)]" in lines[0]
+    monkeypatch.setitem(sys_args, "access_log_format", "json")
+    access_log.record(APIType.TEXT, "127.0.0.1", None, "p", 1.234, ("abc", 0.5), title="t", cached=True)
+    access_log.flush()
+    item = json.loads(read_lines(tmp_path / "access.log")[-1])
+    assert item["data"] == "abc" and item["cached"] is True and item["ua"] is None and item["consume"] == 1.23
+    assert access_log.stats()["written"] == 3
+
+
+@pytest.mark.parametrize("sample, expected", [(None, 1000), (1, 1000), (0, 0)])
+def test_sampling_bounds(access_log, monkeypatch, sample, expected):
+    monkeypatch.setitem(sys_args, "access_log_sample", sample)
+    record(access_log, 1000)
+    assert len(access_log.queue) == expected
+
+
+def test_sampling_rate(access_log, monkeypatch):
+    monkeypatch.setitem(sys_args, "access_log_sample", 0.2)
+    random.seed(0)
+    record(access_log, 5000)
+    assert 850 < len(access_log.queue) < 1150
+
+
+def test_queue_full_drops(access_log, monkeypatch):
+    monkeypatch.setitem(sys_args, "access_log_queue", 5)
+    record(access_log, 8)
+    assert access_log.stats() == {"queued": 5, "written": 0, "dropped": 3}
+
+
+def test_rotation_keeps_backups(access_log, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys_args, "access_log_max_bytes", 2048)
+    for batch in range(30):
+        record(access_log, 5, project_name=f"p{batch}")
+        access_log.flush()
+    path = tmp_path / "access.log"
+    assert sorted(os.listdir(tmp_path)) == ["access.log", "access.log.1", "access.log.2", "access.log.lock"]
+    for name in ["access.log", "access.log.1", "access.log.2"]:
+        assert 0 < os.path.getsize(tmp_path / name) <= 2048
+    # 最新的记录在当前文件, 轮转文件中的记录按时间先后排列
+    assert "[p29]" in read_lines(path)[-1]
+    lines = read_lines(tmp_path / "access.log.2") + read_lines(tmp_path / "access.log.1") + read_lines(path)
+    batches = [int(line.split("[p")[1].split("]")[0]) for line in lines]
+    assert batches == sorted(batches)
+
+
+def test_rotation_without_backups(access_log, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys_args, "access_log_max_bytes", 512)
+    monkeypatch.setitem(sys_args, "access_log_backups", 0)
+    for _ in range(10):
+        record(access_log, 3)
+        access_log.flush()
+    assert sorted(os.listdir(tmp_path)) == ["access.log", "access.log.lock"]
+    assert os.path.getsize(tmp_path / "access.log") <= 512
+
+
+def test_reopen_after_external_rotation(access_log, tmp_path):
+    """ 其他进程轮转后 (inode 变化) 写入新文件, 不再追加到已轮转的文件 """
+    path = tmp_path / "access.log"
+    record(access_log, 1, project_name="before")
+    access_log.flush()
+    os.replace(path, tmp_path / "access.log.1")
+    record(access_log, 1, project_name="after")
+    access_log.flush()
+    assert "[before]" in read_lines(tmp_path / "access.log.1")[0] and len(read_lines(tmp_path / "access.log.1")) == 1
+    assert "[after]" in read_lines(path)[0] and len(read_lines(path)) == 1
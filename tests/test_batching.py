@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import sys
+import multiprocessing
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from muggle.engine.components.batching import BatchScheduler
+
+
+def double(x):
+    return [x * 2]
+
+
+def submit_in_child(scheduler, conn):
+    conn.send(scheduler.submit(np.ones((1, 3), dtype=np.float32))[0].tolist())
+    conn.close()
+
+
+def test_submit_merges_concurrent_requests():
+    scheduler = BatchScheduler(double, max_batch=8, max_wait_ms=20)
+    inputs = [np.full((1, 3), i, dtype=np.float32) for i in range(16)]
+    with ThreadPoolExecutor(8) as pool:
+        outputs = list(pool.map(lambda x: scheduler.submit(x)[0], inputs))
+    scheduler.close()
+    for x, y in zip(inputs, outputs):
+        np.testing.assert_array_equal(y, x * 2)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fork 仅在类 Unix 平台可用")
+def test_submit_after_fork():
+    """ 主进程中已启动批处理线程 (gunicorn preload), fork 出的子进程提交请求不能永久阻塞 """
+    scheduler = BatchScheduler(double, max_batch=8, max_wait_ms=1)
+    scheduler.submit(np.zeros((1, 3), dtype=np.float32))
+    ctx = multiprocessing.get_context("fork")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=submit_in_child, args=(scheduler, child_conn), daemon=True)
+    process.start()
+    assert parent_conn.poll(10), "子进程提交后未返回结果"
+    assert parent_conn.recv() == [[2., 2., 2.]]
+    process.join(10)
+    assert process.exitcode == 0
+    scheduler.close()
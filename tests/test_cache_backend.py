@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import json
+import time
+import os
+import sys
+import subprocess
+import threading
+import pytest
+from muggle.config import sys_args
+from muggle.middleware.cache_backend import RedisBackend, FileBackend, create_backend
+from muggle.middleware.md5_cache import MD5Cache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class BrokenRedis:
+    """ 模拟 Redis 服务不可用 """
+
+    def get(self, key):
+        raise ConnectionError("redis unavailable")
+
+    def set(self, *args, **kwargs):
+        raise ConnectionError("redis unavailable")
+
+
+def test_redis_get_put_ttl():
+    client = fakeredis.FakeRedis()
+    backend = RedisBackend("redis://stand-in", client=client)
+    backend.start()
+    backend.put("k1", ["abc", 0.9], time.time() + 100)
+    assert backend.get("k1") == ["abc", 0.9]
+    assert 0 < client.ttl(f"{backend.prefix}k1") <= 100
+    backend.put("k2", ["never"], 0)
+    assert client.ttl(f"{backend.prefix}k2") == -1
+    backend.put("k3", ["expired"], time.time() - 1)
+    assert backend.get("k3") is None
+    assert backend.get("missing") is None
+
+
+def test_redis_shared_between_caches():
+    client = fakeredis.FakeRedis()
+    writer = MD5Cache(max_size=10, ttl=60, backend=RedisBackend("redis://stand-in", client=client))
+    reader = MD5Cache(max_size=10, ttl=60, backend=RedisBackend("redis://stand-in", client=client))
+    writer.put("key", {"text": "abc"})
+    assert reader.get("key") == {"text": "abc"}
+    assert reader.backend_hits == 1
+
+
+def test_redis_outage_falls_back_to_memory():
+    cache = MD5Cache(max_size=10, ttl=60, backend=RedisBackend("redis://stand-in", client=BrokenRedis()))
+    cache.put("key", {"text": "abc"})
+    assert cache.get("key") == {"text": "abc"}
+    assert cache.get("other") is None
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_file_backend_concurrent_put(tmp_path):
+    backend = FileBackend(str(tmp_path), ttl=60, segment_bytes=2048, max_segments=1000)
+    backend.start()
+
+    def write(worker):
+        for i in range(200):
+            backend.put(f"{worker}-{i}", ["x" * 20, i], time.time() + 60)
+
+    threads = [threading.Thread(target=write, args=(_, )) for _ in range(8)]
+    [_.start() for _ in threads]
+    [_.join() for _ in threads]
+    backend.flush()
+    keys = []
+    for path in backend.segments():
+        with open(path, "r", encoding="utf8") as f:
+            keys += [json.loads(line)["k"] for line in f]
+    assert len(keys) == len(set(keys)) == 8 * 200
+
+
+def test_file_backend_rotate_prunes_segments(tmp_path):
+    backend = FileBackend(str(tmp_path), ttl=60, segment_bytes=64, max_segments=3)
+    backend.start()
+    for i in range(20):
+        backend.put(f"k{i}", ["x" * 64], time.time() + 60)
+    assert len(backend.segments()) <= 3
+
+
+def test_legacy_cache_moved_by_backend_not_config(tmp_path, monkeypatch):
+    """ 仅导入配置 (SDK / bench) 不能改动工作目录, 创建本地缓存后端时才移走旧版 .cache 文件 """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".cache").write_text("legacy")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", "import muggle.config"], check=True, env={**os.environ, "PYTHONPATH": root})
+    assert (tmp_path / ".cache").is_file()
+    monkeypatch.setitem(sys_args, "cache_dir", str(tmp_path / ".cache" / "results"))
+    backend = create_backend("file", ttl=60, max_size=10)
+    backend.start()
+    backend.put("k1", ["abc", 0.9], time.time() + 100)
+    assert len(backend.segments()) == 1
+    assert (tmp_path / ".cache.legacy").read_text() == "legacy"
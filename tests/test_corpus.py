@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import random
+import pytest
+from muggle.engine.components.corpus import CorpusIndex
+from muggle.bench.corpus import load_builtin, linear_scan, make_queries
+
+
+def scan_scores(lines, target):
+    return sorted(
+        ((len(target & set(line)) / len(target | set(line)), idx) for idx, line in enumerate(lines)),
+        key=lambda t: (-t[0], t[1])
+    )
+
+
+def random_corpus(rng, num, alphabet="abcdefghij"):
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))) for _ in range(num)]
+
+
+@pytest.fixture(scope="module")
+def builtin():
+    lines = load_builtin()
+    return lines, CorpusIndex(lines)
+
+
+def test_best_matches_linear_scan_builtin(builtin):
+    lines, index = builtin
+    dictionary = [set(_) for _ in lines]
+    for target in make_queries(lines, 100, seed=0):
+        assert index.best(target) == linear_scan(lines, dictionary, target)
+
+
+def test_best_matches_linear_scan_random():
+    """ 小字母表下重复行与同分情况很多, 同分取最靠前的行 """
+    rng = random.Random(0)
+    for _ in range(300):
+        lines = random_corpus(rng, rng.randint(1, 40))
+        index = CorpusIndex(lines)
+        target = set(rng.choice("abcdefghijxyz") for _ in range(rng.randint(1, 5)))
+        assert index.best(target) == linear_scan(lines, [set(_) for _ in lines], target)
+
+
+def test_top_k_matches_scan():
+    rng = random.Random(1)
+    for _ in range(100):
+        lines = list(dict.fromkeys(random_corpus(rng, 30)))
+        target = set(rng.choice("abcdefghij") for _ in range(3))
+        expected = [(score, lines[idx]) for score, idx in scan_scores(lines, target) if score > 0][:5]
+        assert CorpusIndex(lines).top_k(target, k=5) == expected
+
+
+def test_no_overlap_falls_back_to_first_line():
+    index = CorpusIndex(["abc", "def"])
+    assert index.best({"x"}) == linear_scan(["abc", "def"], [{"a", "b", "c"}, {"d", "e", "f"}], {"x"}) == "abc"
+    assert index.best(set()) == "abc"
+    assert CorpusIndex([]).best({"a"}) == ""
+
+
+def test_layered_index_matches_concatenated_scan():
+    rng = random.Random(2)
+    base = CorpusIndex(random_corpus(rng, 50))
+    for _ in range(100):
+        extra = random_corpus(rng, rng.randint(0, 10))
+        layered = CorpusIndex(extra, base=base)
+        lines = extra + base.lines
+        target = set(rng.choice("abcdefghij") for _ in range(rng.randint(1, 4)))
+        assert layered.best(target) == linear_scan(lines, [set(_) for _ in lines], target)
+        assert len(layered) == len(dict.fromkeys(extra)) + len(base)
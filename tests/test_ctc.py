@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import random
+import numpy as np
+import pytest
+from muggle.categories import CATEGORIES_MAP
+from muggle.bench.ctc import legacy_decode, make_outputs
+from muggle.engine.components.ctc import CTCDecoder
+
+CATEGORIES = ["", *"abcdefghijklmnopqrstuvwxyz0123456789"]
+
+
+def per_char_decode(probs, categories, blank=0):
+    """ 逐帧解码的参照实现: 连续相同类别合并为一个字符, 置信度取该段内的最大概率 """
+    items, last = [], blank
+    for p in probs:
+        index = int(p.argmax())
+        if index != blank and index == last:
+            items[-1] = (items[-1][0], max(items[-1][1], float(p[index])))
+        elif index != blank:
+            items.append((categories[index], float(p[index])))
+        last = index
+    return items or [("", 1.0)]
+
+
+def legacy_vote(concat_items):
+    """ 原 GIFAllFramesCTCLogic 的按位置投票 """
+    need_items = [["", 0] for _ in concat_items[0]]
+    for idx in range(len(need_items)):
+        for items in concat_items:
+            try:
+                if items[idx][1] > need_items[idx][1]:
+                    need_items[idx][1] = items[idx][1]
+                    need_items[idx][0] = items[idx][0]
+            except:
+                continue
+    return need_items
+
+
+def steps(*frames, categories=CATEGORIES):
+    """ 按帧构造概率: 每帧为 {字符: 概率}, 剩余概率归空白 """
+    probs = np.zeros((len(frames), len(categories)), dtype=np.float32)
+    for t, frame in enumerate(frames):
+        for char, p in frame.items():
+            probs[t, categories.index(char)] = p
+        probs[t, 0] = 1 - sum(frame.values())
+    return probs
+
+
+def text(items):
+    return "".join(c for c, _ in items)
+
+
+@pytest.mark.parametrize("charset, n, t, seed", [("AlphaNumeric", 32, 40, 0), ("Chinese3755", 8, 24, 1)])
+def test_greedy_matches_legacy(charset, n, t, seed):
+    categories = CATEGORIES_MAP[charset]
+    outputs = make_outputs(n, t, len(categories), seed)
+    actual = CTCDecoder(categories).decode(outputs, apply_softmax=False)
+    assert [text(_) for _ in actual] == [text(_) for _ in legacy_decode(outputs, categories)]
+    for probs, items in zip(outputs, actual):
+        expected = per_char_decode(probs, categories)
+        assert [c for c, _ in items] == [c for c, _ in expected]
+        np.testing.assert_allclose([s for _, s in items], [s for _, s in expected], rtol=1e-6)
+
+
+def test_greedy_repeats_blanks_confidence():
+    probs = steps({"a": 0.6}, {"a": 0.9}, {}, {"a": 0.7}, {"b": 0.8}, {"b": 0.5}, {}, {})
+    items = CTCDecoder(CATEGORIES).decode(probs, apply_softmax=False)[0]
+    assert text(items) == "aab"
+    np.testing.assert_allclose([s for _, s in items], [0.9, 0.7, 0.8], rtol=1e-6)
+    assert CTCDecoder(CATEGORIES).decode(steps({}, {}), apply_softmax=False) == [[("", 1.0)]]
+
+
+def test_greedy_softmax_detection():
+    logits = np.log(steps({"a": 0.9}, {}, {"b": 0.9}) + 1e-6) * 3
+    assert text(CTCDecoder(CATEGORIES).decode(logits)[0]) == "ab"
+
+
+def test_beam_without_constraints_matches_greedy():
+    outputs = make_outputs(8, 40, len(CATEGORIES), 2)
+    greedy = CTCDecoder(CATEGORIES).decode(outputs, apply_softmax=False)
+    beam = CTCDecoder(CATEGORIES, beam_width=10).decode(outputs, apply_softmax=False)
+    assert [text(_) for _ in beam] == [text(_) for _ in greedy]
+
+
+@pytest.mark.parametrize("beam_width", [1, 10])
+def test_charset_constraint(beam_width):
+    probs = steps({"a": 0.5, "4": 0.3}, {}, {"7": 0.6}, {}, {"o": 0.5, "0": 0.4})
+    assert text(CTCDecoder(CATEGORIES).decode(probs, apply_softmax=False)[0]) == "a7o"
+    decoder = CTCDecoder(CATEGORIES, charset="0123456789", beam_width=beam_width)
+    items = decoder.decode(probs, apply_softmax=False)[0]
+    assert text(items) == "470"
+    np.testing.assert_allclose([s for _, s in items], [0.3, 0.6, 0.4], rtol=1e-6)
+
+
+def test_length_constraint():
+    probs = steps({"a": 0.9}, {}, {"b": 0.9}, {"c": 0.3}, {"d": 0.9}, {})
+    assert text(CTCDecoder(CATEGORIES).decode(probs, apply_softmax=False)[0]) == "abd"
+    assert text(CTCDecoder(CATEGORIES, length=(4, 4), beam_width=10).decode(probs, apply_softmax=False)[0]) == "abcd"
+    probs = steps({"a": 0.9}, {}, {"b": 0.9}, {}, {"c": 0.9}, {}, {"d": 0.9})
+    assert len(CTCDecoder(CATEGORIES, length=(1, 3), beam_width=10).decode(probs, apply_softmax=False)[0]) <= 3
+
+
+def test_lexicon_constraint():
+    probs = steps({"a": 0.9}, {"b": 0.9}, {"1": 0.6, "7": 0.3}, {"c": 0.9})
+    assert text(CTCDecoder(CATEGORIES).decode(probs, apply_softmax=False)[0]) == "ab1c"
+    decoder = CTCDecoder(CATEGORIES, lexicon=["ab7c", "zzzz"], beam_width=10)
+    assert text(decoder.decode(probs, apply_softmax=False)[0]) == "ab7c"
+
+
+def test_lexicon_without_match_falls_back():
+    probs = steps({"a": 0.9}, {"b": 0.9})
+    items = CTCDecoder(CATEGORIES, lexicon=["xyz"], beam_width=10).decode(probs, apply_softmax=False)[0]
+    assert isinstance(items, list) and items
+
+
+def test_from_config():
+    decoder = CTCDecoder.from_config(CATEGORIES, {"ctc_charset": "Numeric", "ctc_length": 4})
+    assert decoder.constrained and (decoder.min_length, decoder.max_length) == (4, 4)
+    assert not CTCDecoder.from_config(CATEGORIES, {"ctc_charset": "Numeric"}).constrained
+
+
+def test_vote_items_matches_legacy():
+    rng = random.Random(0)
+    chars = ["", "a", "b", "c", "1"]
+    for _ in range(2000):
+        frames = [
+            [(rng.choice(chars), rng.choice([0, -0.5, 0.5, round(rng.random(), 2)])) for _ in range(rng.randint(0, 5))]
+            for _ in range(rng.randint(1, 4))
+        ]
+        assert CTCDecoder.vote_items(frames) == legacy_vote(frames), frames
+
+
+def test_vote_averages_frames():
+    frames = np.stack([
+        steps({"a": 0.6, "b": 0.4}, {}, {"c": 0.9}),
+        steps({"a": 0.2, "b": 0.7}, {}, {"c": 0.9}),
+        steps({"a": 0.2, "b": 0.7}, {}, {"c": 0.9}),
+    ])
+    assert text(CTCDecoder(CATEGORIES).vote(frames, apply_softmax=False)) == "bc"
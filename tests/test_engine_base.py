@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+from types import SimpleNamespace
+from muggle.engine.base import BaseEngine
+
+
+class AssignEngine(BaseEngine):
+    """ 扩展引擎沿用旧写法, 在构造时直接赋值 session / input_shape """
+
+    def __init__(self, runtime_engine, session=None, input_shape=None):
+        self.runtime_engine = runtime_engine
+        if session is not None:
+            self.session = session
+        if input_shape is not None:
+            self.input_shape = input_shape
+
+
+def test_defaults_follow_runtime_engine():
+    runtime = SimpleNamespace(session="runtime-session", input_shape=(1, 3, 64, 64))
+    engine = AssignEngine(runtime)
+    assert engine.session == "runtime-session"
+    assert engine.input_shape == (1, 3, 64, 64)
+    runtime.session = "reloaded-session"
+    assert engine.session == "reloaded-session"
+
+
+def test_assignment_overrides_runtime_engine():
+    runtime = SimpleNamespace(session="runtime-session", input_shape=(1, 3, 64, 64))
+    engine = AssignEngine(runtime, session="custom-session", input_shape=(1, 1, 32, 128))
+    assert engine.session == "custom-session"
+    assert engine.input_shape == (1, 1, 32, 128)
+    assert AssignEngine(runtime).session == "runtime-session"
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import io
+import pickle
+import hashlib
+import PIL.Image
+import numpy as np
+import pytest
+from muggle.entity import ImageEntity
+from muggle.middleware.cache_backend import CacheBackend
+from muggle.middleware.md5_cache import MD5Cache
+
+
+def png_bytes(color=(255, 0, 0), size=(8, 6)):
+    buffer = io.BytesIO()
+    PIL.Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def no_decode(monkeypatch):
+    """ 任何解码都视为失败 """
+    def open_image(*args, **kwargs):
+        raise AssertionError("图片不应被解码")
+    monkeypatch.setattr(PIL.Image, "open", open_image)
+
+
+def test_hash_without_decode(no_decode):
+    raw = png_bytes()
+    entity = ImageEntity(raw)
+    assert entity.hash == hashlib.md5(raw).hexdigest()
+    assert entity.base64 and bytes(entity.raw_bytes) == raw
+    assert entity._pil is None
+
+
+def test_cache_hit_without_decode(no_decode):
+    raw = png_bytes()
+    cache = MD5Cache(max_size=10, ttl=60, backend=CacheBackend())
+    cache.put(MD5Cache.key("p", ImageEntity(raw), title="t"), ["abc", 0.9])
+    entity = ImageEntity(raw)
+    assert cache.get(MD5Cache.key("p", entity, title="t")) == ["abc", 0.9]
+    assert cache.get(MD5Cache.key("p", ImageEntity(png_bytes((0, 0, 255))), title="t")) is None
+    assert entity._pil is None
+
+
+def test_decode_once():
+    entity = ImageEntity(png_bytes())
+    image = entity.pil
+    assert image.size == (8, 6) and entity.pil is image
+    np.testing.assert_array_equal(entity.array[0, 0], [255, 0, 0])
+    entity.pil = image.convert("L")
+    assert entity.array.shape == (6, 8)
+
+
+def test_source_shares_full_bytes():
+    raw = png_bytes()
+    assert ImageEntity(raw).source is raw
+    padded = b"xx" + raw
+    sliced = ImageEntity(memoryview(padded)[2:])
+    assert sliced.source == raw and sliced.hash == hashlib.md5(raw).hexdigest()
+
+
+def test_pickle_keeps_bytes_not_pixels():
+    raw = png_bytes()
+    entity = ImageEntity(raw)
+    entity.pil
+    restored = pickle.loads(pickle.dumps(entity))
+    assert bytes(restored.raw_bytes) == raw and restored._pil is None
+    assert restored.hash == entity.hash
+    assert restored.pil.size == (8, 6)
+
+
+def test_pickle_slice_and_pil_only():
+    raw = png_bytes()
+    restored = pickle.loads(pickle.dumps(ImageEntity(memoryview(b"xx" + raw)[2:])))
+    assert bytes(restored.raw_bytes) == raw
+    image = PIL.Image.new("RGB", (4, 4), (0, 255, 0))
+    restored = pickle.loads(pickle.dumps(ImageEntity(pil=image, hash="h")))
+    assert restored.raw_bytes is None and restored.hash == "h"
+    np.testing.assert_array_equal(restored.array, np.asarray(image))
+
+
+def test_frames_for_still_image():
+    entity = ImageEntity(png_bytes((0, 0, 255)))
+    frames = entity.frames()
+    assert len(frames) == 1 and frames[0].shape == (6, 8, 3)
+    np.testing.assert_array_equal(frames[0][0, 0], [0, 0, 255])
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import io
+import numpy as np
+import PIL.Image
+import pytest
+from muggle.gif import GifDecoder
+from muggle.utils import Core
+from muggle.bench.gif import legacy_gif_loader
+from muggle.engine.model import ModelEntity
+from muggle.engine.components.preprocess import ProcessUtils
+
+PALETTE = [0, 0, 0, 255, 0, 0, 0, 255, 0, 0, 0, 255, 200, 200, 0, 10, 10, 10] + [0] * (768 - 18)
+
+
+def make_gif(n_frames, disposal=1, full=True, transparent=True) -> bytes:
+    """ 索引 0 为透明背景 (调色板中为黑色), 每帧绘制一个色块, full=False 时后续帧只更新局部区域 """
+    frames = []
+    for k in range(n_frames):
+        arr = np.zeros((40, 60), dtype=np.uint8)
+        if full or k == 0:
+            arr[5:35, 5 + k * 3:25 + k * 3] = 1 + k % 5
+        else:
+            arr[10:20, 30:40] = 1 + k % 5
+        im = PIL.Image.fromarray(arr, 'P')
+        im.putpalette(PALETTE)
+        frames.append(im)
+    buf = io.BytesIO()
+    kwargs = {"transparency": 0} if transparent else {}
+    frames[0].save(buf, 'GIF', save_all=n_frames > 1, append_images=frames[1:], disposal=disposal, **kwargs)
+    return buf.getvalue()
+
+
+def pillow_frames(data, mode):
+    im = PIL.Image.open(io.BytesIO(data))
+    frames = []
+    for index in range(im.n_frames):
+        im.seek(index)
+        frames.append(np.asarray(im.convert(mode)))
+    return frames
+
+
+def open_gif(data):
+    return PIL.Image.open(io.BytesIO(data))
+
+
+@pytest.mark.parametrize("disposal", [0, 1, 2])
+def test_single_frame_transparent_matches_baseline(disposal):
+    data = make_gif(1, disposal)
+    expected = legacy_gif_loader(open_gif(data))
+    frames = GifDecoder.decode(open_gif(data))
+    assert [_.mode for _ in expected] == ['RGBA']
+    assert [_.mode for _ in Core.gif_loader(open_gif(data))] == ['RGBA']
+    np.testing.assert_array_equal(frames[0], np.asarray(expected[0]))
+
+
+def test_single_frame_transparent_model_input():
+    """ 透明区域送入模型时为白色, 而不是调色板中的黑色 """
+    data = make_gif(1)
+    utils = ProcessUtils(ModelEntity(cfg={}))
+    input_shape = (1, 3, 40, 60)
+    expected = utils.std_load_func(legacy_gif_loader(open_gif(data))[0], input_shape)
+    actual = utils.std_load_func(GifDecoder.to_pil(GifDecoder.decode(open_gif(data)))[0], input_shape)
+    np.testing.assert_array_equal(actual, expected)
+    np.testing.assert_array_equal(actual[:, 0, 0], utils.white[:, 0, 0])
+
+
+@pytest.mark.parametrize("disposal", [0, 1, 2])
+@pytest.mark.parametrize("full", [True, False])
+def test_multi_frame_keeps_alpha(disposal, full):
+    data = make_gif(3, disposal, full)
+    frames = GifDecoder.decode(open_gif(data))
+    expected = pillow_frames(data, 'RGBA')
+    assert len(frames) == len(expected) == 3
+    for frame, rgba, legacy in zip(frames, expected, legacy_gif_loader(open_gif(data))):
+        np.testing.assert_array_equal(frame, rgba)
+        assert (frame[:, :, 3] == 0).any()
+        # 不透明像素的颜色与原实现一致
+        opaque = frame[:, :, 3] == 255
+        np.testing.assert_array_equal(frame[opaque][:, :3], np.asarray(legacy.convert('RGB'))[opaque])
+
+
+def test_selective_decode_transparent():
+    data = make_gif(4, full=False)
+    frames = GifDecoder.decode(open_gif(data))
+    selected = GifDecoder.decode(open_gif(data), [3, 0, 3])
+    for index, frame in zip([3, 0, 3], selected):
+        np.testing.assert_array_equal(frame, frames[index])
+
+
+def test_opaque_gif_stays_rgb():
+    data = make_gif(3, transparent=False)
+    frames = GifDecoder.decode(open_gif(data))
+    assert all(_.shape == (40, 60, 3) for _ in frames)
+    for frame, rgb in zip(frames, pillow_frames(data, 'RGB')):
+        np.testing.assert_array_equal(frame, rgb)
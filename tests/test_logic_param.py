@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import asyncio
+import threading
+import contextvars
+from types import SimpleNamespace
+import pytest
+from muggle.logic.base import BaseLogic
+from muggle.core.sdk import SDK
+
+PROJECT_NAME = "param_test"
+
+
+class ParamLogic(BaseLogic):
+
+    def process(self, image, title=None):
+        return self.param
+
+    def dumps(self, predictions):
+        return predictions
+
+
+@pytest.fixture
+def logic(monkeypatch):
+    monkeypatch.setattr(
+        "muggle.logic.base.ProjectSession.get", lambda project_name: SimpleNamespace(project_entity=SimpleNamespace(cfg={}))
+    )
+    logic = ParamLogic(PROJECT_NAME)
+    monkeypatch.setitem(SDK.pipelines, PROJECT_NAME, logic)
+    return logic
+
+
+def test_threads_see_own_param(logic):
+    barrier = threading.Barrier(8)
+    seen = {}
+
+    def request(idx):
+        shared = SDK.get(PROJECT_NAME, {"id": idx})
+        # 所有线程都完成赋值后再读取, 共享的逻辑实例上不能互相覆盖
+        barrier.wait()
+        seen[idx] = shared.process(None)["id"]
+
+    threads = [threading.Thread(target=request, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == {idx: idx for idx in range(8)}
+
+
+def test_tasks_see_own_param(logic):
+    async def request(idx):
+        SDK.get(PROJECT_NAME, {"id": idx})
+        await asyncio.sleep(0)
+        return logic.param["id"]
+
+    async def main():
+        return await asyncio.gather(*[request(idx) for idx in range(8)])
+
+    assert asyncio.run(main()) == list(range(8))
+
+
+def test_unset_context_gets_own_dict(logic):
+    SDK.get(PROJECT_NAME, {"token": "a"})
+    # 未设置过 param 的上下文读取到的是空字典, 写入也不会影响其他上下文
+    first, second = contextvars.Context(), contextvars.Context()
+    assert first.run(lambda: logic.param) == {}
+    first.run(lambda: logic.param.update(token="b"))
+    assert second.run(lambda: logic.param) == {}
+    assert first.run(lambda: logic.param) == {"token": "b"}
+    assert logic.param == {"token": "a"}
+
+
+def test_none_param_resets(logic):
+    SDK.get(PROJECT_NAME, {"token": "a"})
+    assert SDK.get(PROJECT_NAME).param == {}
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import os
+import sys
+import json
+import multiprocessing
+import pytest
+from muggle.config import sys_args
+from muggle.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys_args, "metrics", True)
+    monkeypatch.setitem(sys_args, "metrics_dir", str(tmp_path))
+    monkeypatch.setitem(sys_args, "metrics_flush_interval", 0)
+    return MetricsRegistry(buckets=(1, 10, 100))
+
+
+def counts(collected, stage="infer", project="p"):
+    key = json.dumps([stage, {"project": project}], ensure_ascii=False, sort_keys=True)
+    item = collected.get(key)
+    return (item["counts"], item["count"]) if item else None
+
+
+def worker(registry, values, retire):
+    for value in values:
+        registry.observe("infer", value, project="p")
+    if retire:
+        registry.retire()
+    else:
+        # 模拟异常退出: 只留下定期写入的快照
+        registry.flush()
+        os._exit(0)
+
+
+def run_workers(registry, jobs):
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=worker, args=(registry, values, retire), daemon=True) for values, retire in jobs]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(10)
+        assert process.exitcode == 0
+
+
+def test_collect_local(registry):
+    for value in (0.5, 5, 50, 500):
+        registry.observe("infer", value, project="p")
+    registry.observe("decode", 2, project="p")
+    collected = registry.collect()
+    assert counts(collected) == ([1, 1, 1, 1], 4)
+    assert counts(collected, stage="decode") == ([0, 1, 0, 0], 1)
+    assert counts(registry.collect()) == ([1, 1, 1, 1], 4)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fork 仅在类 Unix 平台可用")
+def test_collect_merges_retired_and_crashed_workers(registry, tmp_path):
+    registry.observe("infer", 5, project="p")
+    run_workers(registry, [([0.5, 0.5], True), ([50], True), ([500, 500, 500], False)])
+    collected = registry.collect()
+    assert counts(collected) == ([2, 1, 1, 3], 7)
+    # 已退出进程的快照全部归档到 retired.json, 重复采集结果不变
+    assert sorted(_.name for _ in tmp_path.glob("*.json")) == sorted([f"{os.getpid()}.json", MetricsRegistry.RETIRED_FILENAME])
+    assert counts(registry.collect()) == ([2, 1, 1, 3], 7)
+    registry.observe("infer", 5, project="p")
+    assert counts(registry.collect()) == ([2, 2, 1, 3], 8)
+
+
+def test_live_worker_snapshot_not_retired(registry, tmp_path):
+    live_pid = os.getppid()
+    MetricsRegistry.write(str(tmp_path / f"{live_pid}.json"), {
+        json.dumps(["infer", {"project": "p"}], sort_keys=True): {"counts": [0, 0, 2, 0], "sum": 100, "count": 2}
+    })
+    registry.observe("infer", 5, project="p")
+    assert counts(registry.collect()) == ([0, 1, 2, 0], 3)
+    assert (tmp_path / f"{live_pid}.json").exists()
+    assert not (tmp_path / MetricsRegistry.RETIRED_FILENAME).exists()
+
+
+def test_retire_then_collect(registry, tmp_path):
+    registry.observe("infer", 5, project="p")
+    registry.flush()
+    registry.retire()
+    assert not (tmp_path / f"{os.getpid()}.json").exists()
+    assert counts(registry.collect()) == ([0, 1, 0, 0], 1)
+
+
+def test_render(registry):
+    registry.observe("infer", 5, project='a"b')
+    text = registry.render()
+    assert 'muggle_stage_latency_ms_bucket{stage="infer",project="a\\"b",le="10"} 1' in text
+    assert 'muggle_stage_latency_ms_bucket{stage="infer",project="a\\"b",le="1"} 0' in text
+    assert 'muggle_stage_latency_ms_count{stage="infer",project="a\\"b"} 1' in text
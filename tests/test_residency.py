@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import time
+import threading
+import pytest
+from muggle.config import sys_args
+from muggle.engine.components.residency import LRUResidency
+
+MB = 1024 ** 2
+
+
+class FakeProjects:
+
+    def __init__(self, names):
+        self.all = {name: object() for name in names}
+
+    def get(self, name):
+        return self.all.get(name)
+
+
+class FakeRuntime:
+
+    def __init__(self, model_manager):
+        self.model_manager = model_manager
+
+    def resident(self):
+        return [{"memory": MB, "size": 0} for state in self.model_manager.state.values() if state]
+
+
+class FakeModelManager:
+    """ 每个项目常驻 1MB; 卸载时先进入 releasing, 由测试控制何时真正释放 """
+
+    def __init__(self, names, loaded=()):
+        self.project_entities = FakeProjects(names)
+        self.runtime_manager = FakeRuntime(self)
+        self.state = {name: "loaded" for name in loaded}
+        self.loads = {name: 0 for name in names}
+        self.unloading = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def is_loaded(self, name):
+        return self.state.get(name) in ("loaded", "releasing")
+
+    def load_project(self, name):
+        time.sleep(0.01)
+        self.loads[name] += 1
+        self.state[name] = "loaded"
+
+    def unload_project(self, name):
+        self.state[name] = "releasing"
+        self.unloading.set()
+        assert self.release.wait(10)
+        self.state[name] = None
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setitem(sys_args, "lazy_load", True)
+
+    def set_budget(megabytes):
+        monkeypatch.setitem(sys_args, "memory_budget", megabytes)
+    return set_budget
+
+
+def test_acquire_waits_for_eviction(budget):
+    """ 请求到达时其项目正在被淘汰, 需等待卸载完成后重新加载, 不能使用正在释放的会话 """
+    budget(1.5)
+    model_manager = FakeModelManager(["a", "b"], loaded=["b"])
+    model_manager.release.clear()
+    residency = LRUResidency(model_manager)
+    loaded_a, seen = threading.Event(), {}
+
+    def request_a():
+        with residency.use("a"):
+            loaded_a.set()
+
+    def request_b():
+        with residency.use("b") as cold:
+            seen["state"], seen["cold"] = model_manager.state["b"], cold
+
+    thread_a = threading.Thread(target=request_a, daemon=True)
+    thread_a.start()
+    assert model_manager.unloading.wait(10)
+    thread_b = threading.Thread(target=request_b, daemon=True)
+    thread_b.start()
+    time.sleep(0.05)
+    assert not seen, "请求在项目卸载完成前就进入了处理"
+    model_manager.release.set()
+    thread_a.join(10)
+    thread_b.join(10)
+    assert loaded_a.is_set()
+    assert seen == {"state": "loaded", "cold": True}
+    assert model_manager.loads["b"] == 1 and residency.evictions >= 1
+
+
+def test_pinned_project_not_evicted(budget):
+    budget(1.5)
+    model_manager = FakeModelManager(["a", "b"])
+    residency = LRUResidency(model_manager)
+    with residency.use("a"):
+        with residency.use("b"):
+            assert model_manager.state == {"a": "loaded", "b": "loaded"}
+    assert residency.evictions == 0
+
+
+def test_evicts_least_recently_used(budget):
+    budget(3.5)
+    model_manager = FakeModelManager(["a", "b", "c", "d"])
+    residency = LRUResidency(model_manager)
+    for name in ["a", "b", "c", "a", "d"]:
+        with residency.use(name):
+            pass
+    assert {k for k, v in model_manager.state.items() if v} == {"a", "c", "d"}
+    assert residency.evictions == 1
+
+
+def test_concurrent_first_requests_load_once(budget):
+    budget(None)
+    model_manager = FakeModelManager(["a"])
+    residency = LRUResidency(model_manager)
+    results = []
+    barrier = threading.Barrier(8)
+
+    def request():
+        barrier.wait()
+        with residency.use("a") as cold:
+            results.append(cold)
+
+    threads = [threading.Thread(target=request, daemon=True) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert model_manager.loads["a"] == 1
+    assert sorted(results) == [False] * 7 + [True]
+    assert residency.pins["a"] == 0
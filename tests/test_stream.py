@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+import json
+import random
+import asyncio
+from types import SimpleNamespace
+import pytest
+from muggle.config import sys_args
+from starlette.requests import ClientDisconnect
+from muggle.exception import ServerException
+
+# 页面 (gradio) 与加密模型加载 (pycryptodome) 中间件与流式接口无关, 测试中不启用
+sys_args['enabled_module'][:] = [_ for _ in sys_args['enabled_module'] if _ not in ('Draw', 'Docs', 'MemoryLoader')]
+
+from muggle.core.api.stream import NDJSONStream
+
+
+class FakeRequest:
+    """ 按给定分块返回请求体 """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.headers = {}
+        self.client = None
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FakeExecutor:
+    """ 不执行推理, 直接以条目中的图片内容作为识别结果 """
+
+    workers = 2
+    is_process = False
+
+    async def run(self, fn, *args, **kwargs):
+        body = args[1]
+        return SimpleNamespace(uuid="-", data=body.image, score=[1.0], consume=0)
+
+
+def make_stream(chunks, line_limit=1024):
+    return NDJSONStream(FakeRequest(chunks), FakeExecutor(), inflight=2, line_limit=line_limit)
+
+
+async def collect(chunks, line_limit=1024):
+    return [line async for line in make_stream(chunks, line_limit).lines()]
+
+
+async def rows(chunks):
+    return [json.loads(line) async for line in make_stream(chunks)]
+
+
+def test_line_split_across_chunks():
+    assert asyncio.run(collect([b'{"a"', b': 1', b'}\n{"b": 2}\n'])) == [b'{"a": 1}', b'{"b": 2}']
+
+
+def test_multiple_lines_per_chunk():
+    assert asyncio.run(collect([b"a\nb\nc\n", b"d\ne\n"])) == [b"a", b"b", b"c", b"d", b"e"]
+
+
+def test_trailing_line_without_newline():
+    assert asyncio.run(collect([b"a\nb", b"c"])) == [b"a", b"bc"]
+
+
+def test_blank_lines():
+    assert asyncio.run(collect([b"\n\na\n", b"\n", b"b\n\n"])) == [b"", b"", b"a", b"", b"b", b""]
+
+
+def test_random_chunking_matches_split():
+    rng = random.Random(1)
+    for _ in range(500):
+        data = b"\n".join(bytes(rng.choice(b"ab{}") for _ in range(rng.randint(0, 8))) for _ in range(rng.randint(0, 6)))
+        if rng.random() < .5:
+            data += b"\n"
+        cuts = sorted(rng.sample(range(len(data) + 1), min(len(data), rng.randint(0, 5))))
+        chunks = [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+        expected = data.split(b"\n")
+        expected = expected[:-1] + ([expected[-1]] if expected[-1] else [])
+        assert asyncio.run(collect(chunks)) == expected, chunks
+
+
+def test_line_limit():
+    """ 限制的是尚未遇到换行的半行的缓冲长度 """
+    assert asyncio.run(collect([b"x" * 8, b"x" * 8 + b"\n"], line_limit=16)) == [b"x" * 16]
+    with pytest.raises(ServerException) as e:
+        asyncio.run(collect([b"x" * 8, b"x" * 8, b"x"], line_limit=16))
+    assert e.value.code == 413
+
+
+def test_line_limit_ends_stream_with_error_row():
+    result = {_["index"]: _ for _ in asyncio.run(rows([b'{"project_name": "p", "image": "i0"}\n', b"x" * 4096]))}
+    assert result[0]["success"] and result[0]["data"] == "i0"
+    assert result[-1]["code"] == 413
+
+
+def test_malformed_line_does_not_end_stream():
+    chunks = [
+        b'{"project_name": "p", "image": "i0"}\n',
+        b'{"project_name": \n',
+        b'\n{"project_name": "p"}\n',
+        b'{"project_name": "p", "image": "i3"}',
+    ]
+    result = sorted(asyncio.run(rows(chunks)), key=lambda _: _["index"])
+    assert [_["index"] for _ in result] == [0, 1, 2, 3]
+    assert [_["success"] for _ in result] == [True, False, False, True]
+    assert [_["code"] for _ in result] == [0, 400, 400, 0]
+    assert result[3]["data"] == "i3"
+
+
+class DisconnectRequest(FakeRequest):
+
+    async def stream(self):
+        yield b'{"project_name": "p", "image": "i0"}\n'
+        raise ClientDisconnect()
+
+
+def test_client_disconnect_ends_stream():
+    stream = NDJSONStream(DisconnectRequest([]), FakeExecutor(), inflight=2, line_limit=1024)
+
+    async def consume():
+        return [json.loads(line) async for line in stream]
+
+    assert all(_["index"] >= 0 for _ in asyncio.run(asyncio.wait_for(consume(), 10)))